@@ -0,0 +1,287 @@
+import asyncio
+import hashlib
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from telethon import errors, events, utils
+from telethon.tl.functions.upload import SaveFilePartRequest
+from telethon.tl.types import (
+    Document, DocumentAttributeFilename, DocumentAttributeVideo, InputFile, InputPeerChannel,
+    InputPeerChat, InputPeerUser, MessageMediaDocument
+)
+
+
+@dataclass
+class NetworkModel:
+    """Simulated network between the bot and Telegram"""
+    latency: float = 0.03  # seconds per request
+    bandwidth: float = 20 * 1024 * 1024  # bytes per second for uploads and downloads
+    flood_wait_rate: float = 0.0  # probability that a send hits a FloodWait
+    flood_wait_seconds: int = 1
+    seed: int = 1234
+
+    def transfer_time(self, size: int) -> float:
+        return self.latency + size / self.bandwidth
+
+
+class FakeMessage:
+    """The subset of telethon's Message the bot reads"""
+
+    def __init__(self, message_id: int, chat_id: int, text: str = '', document: Optional[Document] = None,
+                 sender_id: int = 1000, out: bool = False, grouped_id: Optional[int] = None):
+        self.id = message_id
+        self.chat_id = chat_id
+        self.sender_id = sender_id
+        self.text = text
+        self.message = text
+        self.document = document
+        self.media = MessageMediaDocument(document=document) if document else None
+        self.out = out
+        self.grouped_id = grouped_id
+
+    @property
+    def video(self) -> Optional[Document]:
+        if self.document and any(isinstance(attr, DocumentAttributeVideo) for attr in self.document.attributes):
+            return self.document
+        return None
+
+
+class FakeNewMessageEvent:
+    def __init__(self, message: FakeMessage):
+        self.message = message
+        self.chat_id = message.chat_id
+
+
+class FakeCallbackEvent:
+    def __init__(self, client: 'FakeTelegramClient', data: bytes, chat_id: int, message_id: int, sender_id: int = 1000):
+        self.client = client
+        self.data = data
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.sender_id = sender_id
+
+    async def answer(self, text: str = '') -> None:
+        await self.client._request('answer', self.chat_id)
+
+    async def get_message(self) -> Optional[FakeMessage]:
+        await self.client._request('get_message', self.chat_id)
+        return self.client.messages.get((self.chat_id, self.message_id))
+
+
+class FakeTelegramClient:
+    """In-process stand-in for TelegramClient.
+
+    Keeps every message it "sends", serves the bytes of documents created with
+    `make_document(content=...)`, and delays each request according to the network model,
+    optionally raising FloodWait on sends. Event handlers registered with `on()` are
+    called by `emit_new_message` and `emit_callback`.
+    """
+
+    def __init__(self, *args, network: Optional[NetworkModel] = None, **kwargs):
+        self.network = network or NetworkModel()
+        self.random = random.Random(self.network.seed)
+        self.handlers: List[Tuple[object, Callable[..., Awaitable[None]]]] = []
+        self.messages: Dict[Tuple[int, int], FakeMessage] = {}
+        self.contents: Dict[int, bytes] = {}
+        self.ids = itertools.count(1)
+        self.document_ids = itertools.count(10 ** 9)
+        self.sent: List[Tuple[float, FakeMessage, object]] = []  # (time, message, buttons)
+        self.requests: Dict[str, int] = {}
+        self.flood_waits = 0
+        self.on_send: Optional[Callable[[FakeMessage, object], None]] = None
+        self.disconnected: Optional[asyncio.Future] = None
+
+    # --- lifecycle ---
+
+    async def start(self, *args, **kwargs) -> 'FakeTelegramClient':
+        self.disconnected = asyncio.get_running_loop().create_future()
+        return self
+
+    async def run_until_disconnected(self) -> None:
+        await self.disconnected
+
+    async def disconnect(self) -> None:
+        if self.disconnected and not self.disconnected.done():
+            self.disconnected.set_result(None)
+
+    def on(self, event_builder):
+        def decorator(handler):
+            self.handlers.append((event_builder, handler))
+            return handler
+        return decorator
+
+    # --- synthetic traffic ---
+
+    def make_document(self, size: int, duration: float, file_name: Optional[str] = None,
+                      content: Optional[bytes] = None) -> Document:
+        document_id = next(self.document_ids)
+        attributes = [DocumentAttributeVideo(duration=duration, w=640, h=360, supports_streaming=True)]
+        if file_name:
+            attributes.append(DocumentAttributeFilename(file_name))
+        document = Document(id=document_id, access_hash=document_id * 7, file_reference=b'ref', date=None,
+                            mime_type='video/mp4', size=len(content) if content is not None else size,
+                            dc_id=2, attributes=attributes)
+        if content is not None:
+            self.contents[document_id] = content
+        return document
+
+    def post_video(self, chat_id: int, document: Document, text: str = '',
+                   grouped_id: Optional[int] = None) -> FakeMessage:
+        """Store a video message as if a user had posted it"""
+        message = FakeMessage(next(self.ids), chat_id, text, document, grouped_id=grouped_id)
+        self.messages[(chat_id, message.id)] = message
+        return message
+
+    async def emit_new_message(self, message: FakeMessage) -> None:
+        for builder, handler in self.handlers:
+            if not self._matches(builder, events.NewMessage):
+                continue
+            chats = None if isinstance(builder, type) else builder.chats
+            if chats and message.chat_id not in chats:
+                continue
+            await handler(FakeNewMessageEvent(message))
+
+    async def emit_callback(self, data: bytes, chat_id: int, message_id: int) -> None:
+        for builder, handler in self.handlers:
+            if self._matches(builder, events.CallbackQuery):
+                await handler(FakeCallbackEvent(self, data, chat_id, message_id))
+
+    # --- API surface used by the bot ---
+
+    async def get_input_entity(self, peer):
+        await self._request('resolve', None)
+        return self._input_peer(peer)
+
+    async def get_entity(self, peer):
+        return await self.get_input_entity(peer)
+
+    async def send_message(self, entity, message: str = '', *, reply_to=None, buttons=None, file=None, **kwargs):
+        chat_id = self._chat_id(entity)
+        await self._request('send_message', chat_id, flood=True)
+        return self._store_sent(chat_id, message, self._document_for(file), buttons)
+
+    async def send_file(self, entity, file, *, caption=None, **kwargs):
+        chat_id = self._chat_id(entity)
+        if isinstance(file, list):
+            await self._request('send_album', chat_id, flood=True)
+            captions = caption if isinstance(caption, list) else [caption or ''] * len(file)
+            return [self._store_sent(chat_id, text, self._document_for(item), None)
+                    for item, text in zip(file, captions)]
+        await self._request('send_file', chat_id, flood=True)
+        return self._store_sent(chat_id, caption or '', self._document_for(file), None)
+
+    async def delete_messages(self, entity, message_ids, **kwargs) -> None:
+        chat_id = self._chat_id(entity)
+        await self._request('delete_messages', chat_id)
+        for message_id in message_ids if isinstance(message_ids, list) else [message_ids]:
+            self.messages.pop((chat_id, message_id), None)
+
+    async def edit_message(self, entity, message_id: int, text: str = '', **kwargs) -> None:
+        await self._request('edit_message', self._chat_id(entity))
+
+    async def get_messages(self, entity, ids=None, **kwargs):
+        chat_id = self._chat_id(entity)
+        await self._request('get_messages', chat_id)
+        if isinstance(ids, list):
+            return [self.messages.get((chat_id, message_id)) for message_id in ids]
+        return self.messages.get((chat_id, ids))
+
+    async def iter_download(self, file, *, offset: int = 0, request_size: int = 128 * 1024,
+                            limit: Optional[int] = None, **kwargs):
+        content = self.contents[file.id]
+        position = offset
+        count = 0
+        while position < len(content) and (limit is None or count < limit):
+            chunk = content[position:position + request_size]
+            await asyncio.sleep(self.network.transfer_time(len(chunk)))
+            self._count('download_chunk')
+            yield chunk
+            position += len(chunk)
+            count += 1
+
+    async def download_file(self, file, out, **kwargs) -> None:
+        content = self.contents[file.id]
+        await asyncio.sleep(self.network.transfer_time(len(content)))
+        self._count('download_file')
+        with open(out, 'wb') as f:
+            f.write(content)
+
+    async def download_media(self, media, file, **kwargs) -> None:
+        await self.download_file(getattr(media, 'document', media), file)
+
+    async def upload_file(self, file, *, file_name: Optional[str] = None, file_size: Optional[int] = None, **kwargs):
+        if isinstance(file, str):
+            with open(file, 'rb') as f:
+                data = f.read()
+        else:
+            data = file.read()
+        await asyncio.sleep(self.network.transfer_time(len(data)))
+        self._count('upload_file')
+        document = self.make_document(len(data), 0, file_name, data)
+        # The uploaded bytes become the document sent with it
+        return InputFile(document.id, 1, file_name or 'file', hashlib.md5(data).hexdigest())
+
+    async def __call__(self, request):
+        if isinstance(request, SaveFilePartRequest):
+            await asyncio.sleep(self.network.transfer_time(len(request.bytes)))
+            self._count('save_file_part')
+            return True
+        raise NotImplementedError(f"{type(request).__name__} is not simulated")
+
+    # --- internals ---
+
+    async def _request(self, name: str, chat_id: Optional[int], flood: bool = False) -> None:
+        self._count(name)
+        await asyncio.sleep(self.network.latency)
+        if flood and self.network.flood_wait_rate and self.random.random() < self.network.flood_wait_rate:
+            self.flood_waits += 1
+            raise errors.FloodWaitError(request=None, capture=self.network.flood_wait_seconds)
+
+    def _count(self, name: str) -> None:
+        self.requests[name] = self.requests.get(name, 0) + 1
+
+    def _store_sent(self, chat_id: int, text: str, document: Optional[Document], buttons) -> FakeMessage:
+        message = FakeMessage(next(self.ids), chat_id, text or '', document, out=True)
+        self.messages[(chat_id, message.id)] = message
+        self.sent.append((time.perf_counter(), message, buttons))
+        if self.on_send:
+            self.on_send(message, buttons)
+        return message
+
+    def _document_for(self, file) -> Optional[Document]:
+        if file is None or isinstance(file, Document):
+            return file
+        if isinstance(file, MessageMediaDocument):
+            return file.document
+        if isinstance(file, InputFile):
+            content = self.contents.get(file.id, b'')
+            return Document(id=file.id, access_hash=file.id * 7, file_reference=b'ref', date=None,
+                            mime_type='video/mp4', size=len(content), dc_id=2, attributes=[])
+        # InputDocument or anything else referencing an existing document
+        return Document(id=getattr(file, 'id', 0), access_hash=getattr(file, 'access_hash', 0), file_reference=b'ref',
+                        date=None, mime_type='video/mp4', size=0, dc_id=2, attributes=[])
+
+    @staticmethod
+    def _matches(builder, event_type) -> bool:
+        # Handlers may be registered with the event class or with a configured instance
+        return builder is event_type or isinstance(builder, event_type)
+
+    @staticmethod
+    def _input_peer(peer):
+        if isinstance(peer, (InputPeerChannel, InputPeerChat, InputPeerUser)):
+            return peer
+        if isinstance(peer, str) and not peer.lstrip('-').isdigit():
+            return InputPeerUser(abs(hash(peer)) % 10 ** 9, 1)
+        peer_id = int(peer)
+        if peer_id < 0:
+            return InputPeerChannel(utils.resolve_id(peer_id)[0], 1)
+        return InputPeerUser(peer_id, 1)
+
+    def _chat_id(self, entity) -> int:
+        if isinstance(entity, (InputPeerChannel, InputPeerChat, InputPeerUser)):
+            return utils.get_peer_id(entity)
+        if isinstance(entity, str) and not entity.lstrip('-').isdigit():
+            return utils.get_peer_id(self._input_peer(entity))
+        return int(entity)
@@ -0,0 +1,19 @@
+import os
+import subprocess
+
+
+def generate_test_video(path: str, seconds: int = 30, size: str = '640x360') -> bytes:
+    """Encode a small synthetic MP4 (test pattern + tone) with ffmpeg and return its bytes"""
+    if not os.path.exists(path):
+        subprocess.run([
+            'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', 'lavfi', '-i', f'testsrc=size={size}:rate=25',
+            '-f', 'lavfi', '-i', 'sine=frequency=440',
+            '-t', str(seconds),
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '50',
+            '-c:a', 'aac', '-b:a', '64k',
+            '-movflags', '+faststart',
+            path
+        ], check=True)
+    with open(path, 'rb') as f:
+        return f.read()
@@ -0,0 +1,439 @@
+"""Load tests for the bot against an in-process Telegram stand-in.
+
+Usage (from the repository root):
+    python -m benchmarks.run                      # run and compare with the saved baseline
+    python -m benchmarks.run --save-baseline      # record the current numbers as the baseline
+    python -m benchmarks.run --scenarios trim --trims 16 --latency 0.08
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baselines.json')
+SCENARIOS = ('input_group', 'callback', 'service', 'trim', 'fingerprint')
+
+INPUT_GROUP_ID = -1001000000001
+DESTINATION_CHAT_ID = -1001000000002
+TRIM_DESTINATION_CHAT_ID = -1001000000003
+MB = 1024 * 1024
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    count: int
+    seconds: float
+    latencies: List[float] = field(repr=False)
+    errors: int = 0
+    flood_waits: int = 0
+    rss_growth_mb: float = 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'flood_waits': self.flood_waits,
+            'messages_per_second': round(self.count / self.seconds, 2) if self.seconds > 0 else 0.0,
+            'p50_ms': round(percentile(self.latencies, 50) * 1000, 1),
+            'p95_ms': round(percentile(self.latencies, 95) * 1000, 1),
+            'p99_ms': round(percentile(self.latencies, 99) * 1000, 1),
+            'rss_growth_mb': round(self.rss_growth_mb, 1),
+        }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def current_rss_bytes() -> int:
+    """Resident memory of the process right now (its peak so far where /proc isn't available)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # ru_maxrss is in kilobytes on Linux and macOS reports bytes; only the deltas matter here
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+class RssSampler:
+    """Peak resident memory above the starting point while a scenario runs.
+
+    The process-wide peak (ru_maxrss) only ever grows, so it would charge every scenario
+    with the memory of the ones before it; RSS is sampled from a thread instead.
+    """
+
+    INTERVAL = 0.005  # seconds between samples
+
+    def __init__(self):
+        self.start_bytes = 0
+        self.peak_bytes = 0
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'RssSampler':
+        self.start_bytes = self.peak_bytes = current_rss_bytes()
+        self.thread = threading.Thread(target=self._sample, name='rss-sampler', daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stopped.set()
+        self.thread.join()
+        self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+
+    def _sample(self) -> None:
+        while not self.stopped.wait(self.INTERVAL):
+            self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+
+    @property
+    def growth_mb(self) -> float:
+        return (self.peak_bytes - self.start_bytes) / MB
+
+
+def configure_environment(args: argparse.Namespace, workdir: str) -> None:
+    """Point the bot at throwaway state before any module reads Config"""
+    defaults = {
+        'API_ID': '1',
+        'API_HASH': 'benchmark',
+        'BOT_TOKEN': 'benchmark',
+        'LOG_LEVEL': 'WARNING',
+        'VIDEO_INPUT_GROUP_ID': str(INPUT_GROUP_ID),
+        'DESTINATION_CHAT_ID': str(DESTINATION_CHAT_ID),
+        'TRIM_DESTINATION_CHAT_IDS': str(TRIM_DESTINATION_CHAT_ID),
+        'DATA_DIR': os.path.join(workdir, 'data'),
+        'CATCHUP_ENABLED': 'false',
+        'METRICS_ENABLED': 'false',
+        'TRIM_CACHE_ENABLED': 'false',
+        # Synthetic documents carry no bytes or thumbnails to fingerprint
+        'FINGERPRINT_ENABLED': 'false',
+    }
+    if not args.real_limits:
+        # Measure the bot, not the outbound rate limits
+        defaults.update({
+            'OUTBOUND_GLOBAL_RATE': '100000',
+            'OUTBOUND_CHAT_RATE': '100000',
+            'OUTBOUND_GROUP_RATE_PER_MIN': '6000000',
+            'OUTBOUND_CHAT_BURST': '100000',
+        })
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    # Logs and sessions land in the scratch directory
+    os.chdir(workdir)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+
+def synthetic_sizes(count: int, rng: random.Random) -> List[int]:
+    """Mix of short and medium videos, roughly 3:1"""
+    return [
+        rng.randint(1, 45) * MB if rng.random() < 0.75 else rng.randint(60, 450) * MB
+        for _ in range(count)
+    ]
+
+
+async def wait_until(condition, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.005)
+    return True
+
+
+async def run_bot_scenarios(args, network, selected) -> List[ScenarioResult]:
+    """Drive main() end to end: input group burst, then a button press on every approval"""
+    from benchmarks.fake_telegram import FakeTelegramClient
+    import src.main as app
+
+    client = FakeTelegramClient(network=network)
+    app.TelegramClient = lambda *_, **__: client
+    main_task = asyncio.create_task(app.main())
+    if not await wait_until(lambda: client.disconnected is not None and len(client.handlers) >= 3, 30):
+        main_task.cancel()
+        raise RuntimeError("Bot did not finish starting up")
+
+    results = []
+    rng = random.Random(network.seed)
+    started_at: Dict[int, float] = {}
+    finished_at: Dict[int, float] = {}
+    approvals = []
+
+    def on_send(message, buttons):
+        if buttons and message.document is not None and message.document.id in started_at:
+            finished_at.setdefault(message.document.id, time.perf_counter())
+            approvals.append(message)
+
+    client.on_send = on_send
+    messages = [
+        client.post_video(INPUT_GROUP_ID, client.make_document(size, rng.randint(30, 600), f"video_{index}.mp4"))
+        for index, size in enumerate(synthetic_sizes(args.messages, rng))
+    ]
+
+    with RssSampler() as memory:
+        burst_started = time.perf_counter()
+        emits = []
+        for message in messages:
+            started_at[message.document.id] = time.perf_counter()
+            # Telethon runs each update's handlers in its own task
+            emits.append(asyncio.create_task(client.emit_new_message(message)))
+            if args.rate:
+                await asyncio.sleep(1 / args.rate)
+        await asyncio.gather(*emits)
+        completed = await wait_until(lambda: len(finished_at) >= len(messages), args.timeout)
+    elapsed = max(finished_at.values(), default=burst_started) - burst_started
+    results.append(ScenarioResult(
+        'input_group', len(finished_at), elapsed,
+        [finished_at[doc_id] - started_at[doc_id] for doc_id in finished_at],
+        errors=0 if completed else len(messages) - len(finished_at),
+        flood_waits=client.flood_waits, rss_growth_mb=memory.growth_mb
+    ))
+
+    if 'callback' in selected:
+        flood_waits = client.flood_waits
+        latencies = []
+        errors = 0
+
+        async def press(message):
+            nonlocal errors
+            pressed = time.perf_counter()
+            try:
+                await client.emit_callback(b'send', message.chat_id, message.id)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - pressed)
+
+        with RssSampler() as memory:
+            callbacks_started = time.perf_counter()
+            await asyncio.gather(*(press(message) for message in approvals))
+        results.append(ScenarioResult('callback', len(approvals), time.perf_counter() - callbacks_started,
+                                      latencies, errors, client.flood_waits - flood_waits, memory.growth_mb))
+
+    await client.disconnect()
+    await main_task
+    return [result for result in results if result.name in selected]
+
+
+def build_repository(network):
+    from benchmarks.fake_telegram import FakeTelegramClient
+    from src.infrastructure.media.transcode_scheduler import TranscodeScheduler
+    from src.infrastructure.telegram.outbound_scheduler import OutboundScheduler
+    from src.infrastructure.telegram.telegram_message_repository import TelegramMessageRepository
+
+    client = FakeTelegramClient(network=network)
+    return client, TelegramMessageRepository(client, TranscodeScheduler(), outbound=OutboundScheduler())
+
+
+async def run_service_scenario(args, network) -> ScenarioResult:
+    """VideoMessageHandlerService with the real use cases and repository, no queue in front"""
+    from src.application.services.activity_tracker import ActivityTracker
+    from src.application.services.video_message_handler import VideoMessageHandlerService
+    from src.application.services.video_router import VideoRouter
+    from src.config.config import Config
+    from src.domain.use_cases.handle_long_video import HandleLongVideoUseCase
+    from src.domain.use_cases.handle_medium_video import HandleMediumVideoUseCase
+    from src.domain.use_cases.handle_short_video import HandleShortVideoUseCase
+    from src.infrastructure.telegram.message_mapper import to_video_message
+
+    client, message_repo = build_repository(network)
+    handler = VideoMessageHandlerService(
+        HandleShortVideoUseCase(message_repo, Config.DESTINATION_CHAT_ID),
+        HandleMediumVideoUseCase(message_repo, Config.DESTINATION_CHAT_ID),
+        HandleLongVideoUseCase(message_repo, None),
+        activity_tracker=ActivityTracker()
+    )
+    rng = random.Random(network.seed + 1)
+    video_messages = [
+        to_video_message(client.post_video(INPUT_GROUP_ID, client.make_document(size, rng.randint(30, 600))))
+        for size in synthetic_sizes(args.messages, rng)
+    ]
+    router = VideoRouter()
+    for video_message in video_messages:
+        router.classify(video_message)
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def handle(video_message):
+        async with semaphore:
+            handled = time.perf_counter()
+            await handler.handle_video_message(video_message)
+            latencies.append(time.perf_counter() - handled)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(handle(video_message) for video_message in video_messages))
+    return ScenarioResult('service', len(latencies), time.perf_counter() - started, latencies,
+                          flood_waits=client.flood_waits)
+
+
+async def run_trim_scenario(args, network, workdir: str) -> ScenarioResult:
+    """send_clips (--clips outputs) on generated MP4s, exercising range download, ffmpeg and upload"""
+    from benchmarks.media import generate_test_video
+    from src.domain.entities.clip_spec import ClipSpec
+    from src.infrastructure.telegram.message_mapper import to_video_message
+
+    content = generate_test_video(os.path.join(workdir, f'sample_{args.trim_seconds}s.mp4'), args.trim_seconds)
+    client, message_repo = build_repository(network)
+    video_messages = [
+        to_video_message(client.post_video(INPUT_GROUP_ID, client.make_document(0, args.trim_seconds, None, content)))
+        for _ in range(args.trims)
+    ]
+    clip_specs = ClipSpec.parse_list(args.clips)
+    latencies = []
+    errors = 0
+
+    async def trim(video_message):
+        nonlocal errors
+        trimmed = time.perf_counter()
+        try:
+            await message_repo.send_clips(video_message, [TRIM_DESTINATION_CHAT_ID], clip_specs)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - trimmed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(trim(video_message) for video_message in video_messages))
+    return ScenarioResult('trim', len(latencies) - errors, time.perf_counter() - started, latencies, errors,
+                          client.flood_waits)
+
+
+def run_fingerprint_scenario(args) -> ScenarioResult:
+    """Near-duplicate lookups in the perceptual hash index holding --fingerprints videos"""
+    from src.config.config import Config
+    from src.infrastructure.persistence.hamming_index import MultiIndexHammingIndex
+
+    rng = random.Random(args.fingerprints)
+    index = MultiIndexHammingIndex(Config.FINGERPRINT_MAX_DISTANCE)
+    for document_id in range(args.fingerprints):
+        index.add(document_id, [rng.getrandbits(64) for _ in range(Config.FINGERPRINT_FRAMES)])
+
+    # Half the queries are copies of indexed videos with a few bits changed, half are new videos
+    queries = []
+    for _ in range(args.lookups):
+        if rng.random() < 0.5:
+            hashes = [value ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+                      for value in index.hashes[rng.randrange(args.fingerprints)]]
+        else:
+            hashes = [rng.getrandbits(64) for _ in range(Config.FINGERPRINT_FRAMES)]
+        queries.append(hashes)
+
+    latencies = []
+    started = time.perf_counter()
+    for hashes in queries:
+        looked_up = time.perf_counter()
+        index.match(hashes)
+        latencies.append(time.perf_counter() - looked_up)
+    return ScenarioResult('fingerprint', len(latencies), time.perf_counter() - started, latencies)
+
+
+async def run(args, workdir: str) -> Dict[str, Dict[str, float]]:
+    from benchmarks.fake_telegram import NetworkModel
+
+    network = NetworkModel(latency=args.latency, bandwidth=args.bandwidth_mb * MB,
+                           flood_wait_rate=args.flood_rate, flood_wait_seconds=args.flood_seconds)
+    selected = set(args.scenarios)
+    results: List[ScenarioResult] = []
+    if selected & {'input_group', 'callback'}:
+        results += await run_bot_scenarios(args, network, selected)
+    if 'service' in selected:
+        with RssSampler() as memory:
+            results.append(await run_service_scenario(args, network))
+        results[-1].rss_growth_mb = memory.growth_mb
+    if 'trim' in selected:
+        with RssSampler() as memory:
+            results.append(await run_trim_scenario(args, network, workdir))
+        results[-1].rss_growth_mb = memory.growth_mb
+    if 'fingerprint' in selected:
+        with RssSampler() as memory:
+            results.append(run_fingerprint_scenario(args))
+        results[-1].rss_growth_mb = memory.growth_mb
+    return {result.name: result.summary() for result in results}
+
+
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Regressions beyond the tolerance: lower throughput or higher latency / memory"""
+    regressions = []
+    for name, numbers in current.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if numbers['messages_per_second'] < reference['messages_per_second'] * (1 - tolerance):
+            regressions.append(f"{name}: {numbers['messages_per_second']} msg/s "
+                               f"(baseline {reference['messages_per_second']})")
+        for metric in ('p95_ms', 'p99_ms', 'rss_growth_mb'):
+            if numbers[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {numbers[metric]} (baseline {reference[metric]})")
+    return regressions
+
+
+def print_table(summary: Dict[str, Dict[str, float]]) -> None:
+    columns = ('count', 'errors', 'flood_waits', 'messages_per_second', 'p50_ms', 'p95_ms', 'p99_ms', 'rss_growth_mb')
+    print(f"{'scenario':<12}" + ''.join(f"{column:>21}" for column in columns))
+    for name, numbers in summary.items():
+        print(f"{name:<12}" + ''.join(f"{numbers[column]:>21}" for column in columns))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--messages', type=int, default=200, help='videos per burst')
+    parser.add_argument('--rate', type=float, default=0, help='messages per second in the burst (0 = all at once)')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent handler calls in the service scenario')
+    parser.add_argument('--trims', type=int, default=8, help='trim requests in the trim scenario')
+    parser.add_argument('--trim-seconds', type=int, default=30, help='length of the generated test video')
+    parser.add_argument('--clips', nargs='+', default=['video:10'],
+                        help='outputs of each trim request, in CLIP_OUTPUTS form (e.g. video:10 gif:4 thumbnail)')
+    parser.add_argument('--fingerprints', type=int, default=100000, help='videos in the fingerprint index')
+    parser.add_argument('--lookups', type=int, default=2000, help='lookups in the fingerprint scenario')
+    parser.add_argument('--latency', type=float, default=0.03, help='simulated seconds per Telegram request')
+    parser.add_argument('--bandwidth-mb', type=float, default=20, help='simulated transfer rate in MB/s')
+    parser.add_argument('--flood-rate', type=float, default=0.0, help='probability that a send hits a FloodWait')
+    parser.add_argument('--flood-seconds', type=int, default=1)
+    parser.add_argument('--real-limits', action='store_true', help='keep the configured outbound rate limits')
+    parser.add_argument('--timeout', type=float, default=300, help='seconds to wait for a burst to be processed')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    baseline_path = os.path.abspath(args.baseline)
+    with tempfile.TemporaryDirectory(prefix='peque_bench_') as workdir:
+        configure_environment(args, workdir)
+        summary = asyncio.run(run(args, workdir))
+        os.chdir(ROOT)
+
+    print_table(summary)
+    if args.save_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print("No baseline yet; run with --save-baseline to record one")
+        return 0
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        regressions = compare(summary, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+import time
+from typing import Optional, Tuple
+from src.domain.entities.video_event import VideoEvent
+from src.domain.entities.video_message import VideoMessage
+from src.domain.entities.video_stats import VideoStats
+from src.domain.repositories.event_store_repository import EventStoreRepository
+from src.config.config import Config
+
+
+class ActivityTracker:
+    """Records processing events into the event store and keeps live status in memory
+    (in-flight downloads, last error). Recording never interrupts video processing."""
+
+    def __init__(self, event_store: Optional[EventStoreRepository] = None):
+        self.event_store = event_store
+        self.downloads_in_flight = 0
+        self.last_error: Optional[Tuple[float, str]] = None
+        self.logger = Config.get_logger('application.activity_tracker')
+
+    async def record(self, event_type: str, video_message: Optional[VideoMessage] = None,
+                     category: Optional[str] = None, size_bytes: Optional[int] = None,
+                     detail: Optional[str] = None) -> None:
+        if not self.event_store:
+            return
+        event = VideoEvent(
+            event_type=event_type,
+            category=category if category is not None else (video_message.category if video_message else None),
+            size_bytes=size_bytes if size_bytes is not None else (video_message.video_size if video_message else 0),
+            document_id=video_message.document.id if video_message and video_message.document else None,
+            chat_id=video_message.chat_id if video_message else None,
+            message_id=video_message.message_id if video_message else None,
+            detail=detail
+        )
+        try:
+            await self.event_store.append(event)
+        except Exception as e:
+            self.logger.warning("Could not record '%s' event: %s", event_type, e)
+
+    def record_error(self, context: str, error: Exception) -> None:
+        self.last_error = (time.time(), f"{context}: {type(error).__name__} - {str(error)}")
+
+    def download_started(self) -> None:
+        self.downloads_in_flight += 1
+
+    def download_finished(self) -> None:
+        self.downloads_in_flight = max(0, self.downloads_in_flight - 1)
+
+    async def get_stats(self) -> Optional[VideoStats]:
+        if not self.event_store:
+            return None
+        return await self.event_store.get_stats()
@@ -0,0 +1,62 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+from src.domain.entities.video_message import VideoMessage
+from src.config.config import Config
+
+# Telegram albums hold at most 10 media
+MAX_ALBUM_SIZE = 10
+
+
+class AlbumCollector:
+    """Groups the videos of an album (same grouped_id) before they are processed.
+
+    Telegram delivers each album item as a separate message in quick succession. Items
+    are buffered until no new one arrives for the collect window (or the album is full)
+    and then handed over together, so the album is classified and approved once.
+    """
+
+    def __init__(self, on_album: Callable[[List[VideoMessage]], Awaitable[None]], window: Optional[float] = None):
+        self.on_album = on_album
+        self.window = window if window is not None else Config.ALBUM_COLLECT_WINDOW
+        self.albums: Dict[int, List[VideoMessage]] = {}
+        self.timers: Dict[int, asyncio.Task] = {}
+        self.logger = Config.get_logger('application.album_collector')
+
+    async def add(self, video_message: VideoMessage) -> None:
+        grouped_id = video_message.grouped_id
+        album = self.albums.setdefault(grouped_id, [])
+        album.append(video_message)
+        self.logger.debug("Collected message %s for album %s (%s so far)",
+                          video_message.message_id, grouped_id, len(album))
+
+        timer = self.timers.pop(grouped_id, None)
+        if timer:
+            timer.cancel()
+        if len(album) >= MAX_ALBUM_SIZE:
+            await self._flush(grouped_id)
+        else:
+            self.timers[grouped_id] = asyncio.create_task(self._flush_later(grouped_id))
+
+    async def stop(self) -> None:
+        """Hand over every album still being collected"""
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers.clear()
+        for grouped_id in list(self.albums):
+            await self._flush(grouped_id)
+
+    async def _flush_later(self, grouped_id: int) -> None:
+        await asyncio.sleep(self.window)
+        self.timers.pop(grouped_id, None)
+        await self._flush(grouped_id)
+
+    async def _flush(self, grouped_id: int) -> None:
+        album = self.albums.pop(grouped_id, None)
+        if not album:
+            return
+        album.sort(key=lambda video_message: video_message.message_id)
+        self.logger.info("Album %s complete with %s video(s)", grouped_id, len(album))
+        try:
+            await self.on_album(album)
+        except Exception as e:
+            self.logger.error("Failed to queue album %s: %s", grouped_id, e, exc_info=True)
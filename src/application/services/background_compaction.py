@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional
+from src.domain.entities.video_event import EVENT_COMPACTED
+from src.application.services.activity_tracker import ActivityTracker
+from src.infrastructure.media.video_compactor import MP4_EXTENSIONS, TMP_SUFFIX, VideoCompactor
+from src.infrastructure.metrics.registry import metrics
+from src.config.config import Config
+
+# Seconds between checks of whether the bot is still idle
+IDLE_POLL_INTERVAL = 5
+# Seconds before a video that couldn't be compacted for now (no free space, changed meanwhile) is queued again
+RETRY_DELAY = 15 * 60
+
+
+class BackgroundCompactionService:
+    """Compacts stored long videos in the background, only while the bot is idle.
+
+    Downloaded files are queued as they arrive, and on startup every stored video not yet
+    compacted is queued too. A job only starts once `is_busy` has reported no work for
+    COMPACT_IDLE_SECONDS in a row; if downloads, queued jobs or trims show up while it
+    runs, it is cancelled and queued again, so ingestion never waits on it. Processed
+    files are remembered in a small JSON file so they aren't looked at again.
+    """
+
+    def __init__(self, compactor: VideoCompactor, is_busy: Callable[[], bool], videos_dir: str,
+                 activity_tracker: Optional[ActivityTracker] = None, state_path: Optional[str] = None,
+                 idle_seconds: Optional[float] = None):
+        self.compactor = compactor
+        self.is_busy = is_busy
+        self.videos_dir = videos_dir
+        self.activity_tracker = activity_tracker or ActivityTracker()
+        self.state_path = state_path or Config.COMPACT_STATE_FILE
+        self.idle_seconds = idle_seconds if idle_seconds is not None else Config.COMPACT_IDLE_SECONDS
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.queued: set = set()
+        self.worker: Optional[asyncio.Task] = None
+        self.retries: Dict[str, asyncio.TimerHandle] = {}
+        self.lock = asyncio.Lock()
+        self.logger = Config.get_logger('application.background_compaction')
+        self.done: Dict[str, int] = self._load()  # file name -> size after compaction
+
+    async def start(self) -> None:
+        """Queue the stored videos still to compact and start the worker"""
+        if self.worker:
+            return
+        pending = await asyncio.to_thread(self._pending_files)
+        for file_path in pending:
+            self.submit(file_path)
+        self.worker = asyncio.create_task(self._run(), name="video-compaction")
+        self.logger.info("Background compaction started (%s, %s stored video(s) pending, idle after %ss)",
+                         self.compactor.mode, len(pending), self.idle_seconds)
+
+    async def stop(self) -> None:
+        if self.worker:
+            self.worker.cancel()
+            await asyncio.gather(self.worker, return_exceptions=True)
+            self.worker = None
+        for handle in self.retries.values():
+            handle.cancel()
+        self.retries.clear()
+
+    def submit(self, file_path: str) -> None:
+        """Queue a stored video; returns right away"""
+        if file_path in self.queued:
+            return
+        retry = self.retries.pop(file_path, None)
+        if retry:
+            retry.cancel()
+        self.queued.add(file_path)
+        self.queue.put_nowait(file_path)
+
+    async def _run(self) -> None:
+        while True:
+            file_path = await self.queue.get()
+            await self._wait_until_idle()
+            job = asyncio.create_task(self.compactor.compact(file_path))
+            while not job.done():
+                await asyncio.wait({job}, timeout=IDLE_POLL_INTERVAL)
+                if not job.done() and self.is_busy():
+                    self.logger.info("Bot busy again, postponing compaction of %s", file_path)
+                    job.cancel()
+                    await asyncio.gather(job, return_exceptions=True)
+                    self.queue.put_nowait(file_path)
+                    break
+            else:
+                self.queued.discard(file_path)
+                await self._finished(file_path, job)
+
+    async def _wait_until_idle(self) -> None:
+        idle_since = None
+        while True:
+            now = time.monotonic()
+            if self.is_busy():
+                idle_since = None
+            elif idle_since is None:
+                idle_since = now
+            elif now - idle_since >= self.idle_seconds:
+                return
+            await asyncio.sleep(min(IDLE_POLL_INTERVAL, self.idle_seconds) or IDLE_POLL_INTERVAL)
+
+    async def _finished(self, file_path: str, job: asyncio.Task) -> None:
+        try:
+            saved = job.result()
+        except FileNotFoundError:
+            self.logger.info("%s was removed before it could be compacted", file_path)
+            return
+        except Exception as e:
+            # Not retried: a file ffmpeg can't rewrite now won't be rewritable later either
+            self.logger.warning("Could not compact %s: %s", file_path, e)
+            saved = 0
+
+        if saved is None:
+            # Not attempted for now; only files that were really tried are remembered as done
+            self.logger.info("Compaction of %s postponed for %ss", file_path, RETRY_DELAY)
+            self.retries[file_path] = asyncio.get_running_loop().call_later(RETRY_DELAY, self._retry, file_path)
+            return
+        if saved:
+            metrics.inc('compacted_bytes_total', saved)
+            await self.activity_tracker.record(EVENT_COMPACTED, category='long', size_bytes=saved,
+                                               detail=os.path.basename(file_path))
+        try:
+            self.done[os.path.basename(file_path)] = os.path.getsize(file_path)
+        except OSError:
+            return
+        await self._save()
+
+    def _retry(self, file_path: str) -> None:
+        self.retries.pop(file_path, None)
+        self.submit(file_path)
+
+    def _pending_files(self) -> List[str]:
+        """Stored videos not compacted yet, oldest first; leftovers of an interrupted run are removed"""
+        try:
+            entries = [entry for entry in os.scandir(self.videos_dir) if entry.is_file()]
+        except FileNotFoundError:
+            return []
+        pending = []
+        for entry in entries:
+            if entry.name.endswith(TMP_SUFFIX):
+                os.remove(entry.path)
+            elif entry.name.lower().endswith(MP4_EXTENSIONS) and self.done.get(entry.name) != entry.stat().st_size:
+                pending.append(entry)
+        return [entry.path for entry in sorted(pending, key=lambda entry: entry.stat().st_mtime)]
+
+    async def _save(self) -> None:
+        def write(data: str) -> None:
+            os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+            tmp_path = self.state_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.state_path)
+
+        async with self.lock:
+            await asyncio.to_thread(write, json.dumps(self.done))
+
+    def _load(self) -> Dict[str, int]:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.logger.warning("Ignoring unreadable compaction state %s: %s", self.state_path, e)
+            return {}
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional, Set
+from src.domain.repositories.checkpoint_repository import CheckpointRepository
+from src.domain.repositories.message_repository import MessageRepository
+from src.config.config import Config
+
+
+class BacklogCatchUpService:
+    """Keeps a checkpoint of the input group and replays what was missed while offline.
+
+    The checkpoint is a watermark: the highest message id such that every message up to
+    it has been fully processed. Messages are marked in flight when ingested and done
+    when their job finishes, so a crash never skips a queued video. On startup every
+    message after the checkpoint is streamed in batches through the same ingest path.
+    """
+
+    def __init__(
+        self,
+        message_repository: MessageRepository,
+        checkpoint_repository: CheckpointRepository,
+        chat_id: int,
+        ingest: Callable[[Any], Awaitable[None]],
+        batch_size: Optional[int] = None,
+        rate: Optional[float] = None
+    ):
+        self.message_repository = message_repository
+        self.checkpoint_repository = checkpoint_repository
+        self.chat_id = chat_id
+        self.ingest = ingest
+        self.batch_size = batch_size or Config.CATCHUP_BATCH_SIZE
+        self.rate = rate or Config.CATCHUP_RATE
+        self.in_flight: Set[int] = set()
+        self.resumed: Set[int] = set()  # already queued again at startup, skipped by the replay
+        self.highest_seen = 0
+        self.saved: Optional[int] = None
+        self.catch_up_cursor: Optional[int] = None  # replay position while catching up
+        self.replay_id: Optional[int] = None  # message currently being replayed
+        self.first_live_id: Optional[int] = None  # first message delivered live during the catch-up
+        self.logger = Config.get_logger('application.backlog_catch_up')
+
+    async def load(self) -> None:
+        self.saved = await self.checkpoint_repository.get(self.chat_id)
+        self.highest_seen = self.saved or 0
+        # Hold the checkpoint until the backlog has been replayed
+        self.catch_up_cursor = self.saved
+
+    def begin(self, message_id: int) -> None:
+        """Mark a message as accepted but not processed yet"""
+        self.in_flight.add(message_id)
+        self.highest_seen = max(self.highest_seen, message_id)
+        if self.catch_up_cursor is not None and message_id != self.replay_id:
+            self.first_live_id = min(self.first_live_id or message_id, message_id)
+
+    def resume(self, message_id: int) -> None:
+        """Mark a message queued again outside the catch-up (an interrupted download) as in flight.
+        The replay skips it even after its job finished, so it is never queued twice."""
+        self.in_flight.add(message_id)
+        self.resumed.add(message_id)
+
+    def is_resumed(self, message_id: int) -> bool:
+        return message_id in self.resumed
+
+    async def complete(self, message_id: int) -> None:
+        """Mark a message as processed and advance the checkpoint if possible"""
+        self.in_flight.discard(message_id)
+        self.highest_seen = max(self.highest_seen, message_id)
+        await self._advance()
+
+    async def run(self) -> None:
+        """Replay every message posted after the checkpoint"""
+        if self.catch_up_cursor is None:
+            self.logger.info("No checkpoint for chat %s yet; starting from new messages", self.chat_id)
+            return
+
+        start_id = self.catch_up_cursor
+        self.logger.info("Catching up on chat %s from message %s", self.chat_id, start_id)
+        replayed = 0
+        started = time.monotonic()
+        try:
+            async for batch in self.message_repository.iter_messages_since(self.chat_id, start_id, self.batch_size):
+                batch_started = time.monotonic()
+                for message in batch:
+                    if self._reached_live(message.id):
+                        break
+                    self.replay_id = message.id
+                    await self.ingest(message)
+                    self.catch_up_cursor = message.id
+                    replayed += 1
+                if self._reached_live(batch[-1].id):
+                    # Live updates already delivered everything from here on
+                    break
+                self.logger.info("Catch-up: replayed %s message(s), up to message %s", replayed, self.catch_up_cursor)
+                # Bounded rate so a long outage doesn't flood the queues and the API at once
+                remaining = len(batch) / self.rate - (time.monotonic() - batch_started)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+        except Exception as e:
+            # The cursor stays in place so the rest is replayed after the next restart
+            self.logger.error("Catch-up of chat %s stopped at message %s: %s", self.chat_id, self.catch_up_cursor, e,
+                              exc_info=True)
+            return
+        self.catch_up_cursor = None
+        self.replay_id = None
+        await self._advance()
+        self.logger.info("Catch-up finished: %s message(s) in %.1fs", replayed, time.monotonic() - started)
+
+    def _reached_live(self, message_id: int) -> bool:
+        return self.first_live_id is not None and message_id >= self.first_live_id
+
+    async def _advance(self) -> None:
+        watermark = self.highest_seen
+        if self.in_flight:
+            watermark = min(watermark, min(self.in_flight) - 1)
+        if self.catch_up_cursor is not None:
+            # Live messages must not move the checkpoint past backlog not replayed yet
+            watermark = min(watermark, self.catch_up_cursor)
+        if self.saved is None or watermark > self.saved:
+            self.saved = watermark
+            try:
+                await self.checkpoint_repository.set(self.chat_id, watermark)
+            except Exception as e:
+                self.logger.warning("Could not save checkpoint %s for chat %s: %s", watermark, self.chat_id, e)
@@ -1,7 +1,15 @@
-from typing import Protocol
+import asyncio
+import os
+import shutil
+import time
+from typing import Callable, Dict, List, Optional, Protocol
 from telethon import TelegramClient
 from telethon.tl.custom import Message
 from src.config.config import Config
+from src.application.services.activity_tracker import ActivityTracker
+from src.infrastructure.filesystem.storage_manager import VIDEO_EXTENSIONS
+from src.infrastructure.telegram.outbound_scheduler import OutboundScheduler, PRIORITY_INTERACTIVE
+from src.infrastructure.telegram.peer_cache import PeerCache
 
 
 class MessageSender(Protocol):
@@ -12,40 +20,50 @@ class MessageSender(Protocol):
 
 class TelegramMessageSender:
     """Adapter for sending messages via Telegram"""
-    def __init__(self, client: TelegramClient):
+    def __init__(self, client: TelegramClient, outbound: Optional[OutboundScheduler] = None,
+                 peer_cache: Optional[PeerCache] = None):
         self.client = client
+        self.outbound = outbound or OutboundScheduler()
+        self.peer_cache = peer_cache
         self.logger = Config.get_logger('infrastructure.telegram_message_sender')
 
     async def send_message(self, chat_id: int, text: str) -> None:
-        self.logger.debug(f"Sending message to chat {chat_id}")
-        await self.client.send_message(chat_id, text)
-        self.logger.debug(f"Message sent successfully to chat {chat_id}")
+        self.logger.debug("Sending message to chat %s", chat_id)
+        peer = await self.peer_cache.resolve(chat_id) if self.peer_cache else chat_id
+        # Command replies are interactive and go ahead of queued bulk sends
+        await self.outbound.call(chat_id, lambda: self.client.send_message(peer, text),
+                                 PRIORITY_INTERACTIVE, 'command reply')
+        self.logger.debug("Message sent successfully to chat %s", chat_id)
 
 
 class CommandHandler:
     """Application service for handling bot commands"""
 
-    def __init__(self, message_sender: MessageSender):
+    def __init__(self, message_sender: MessageSender, activity_tracker: Optional[ActivityTracker] = None,
+                 queue_depths: Optional[Callable[[], Dict[str, int]]] = None, videos_dir: str = "/app/videos",
+                 routes: Optional[List[str]] = None):
         self.message_sender = message_sender
+        self.activity_tracker = activity_tracker
+        self.queue_depths = queue_depths
+        self.videos_dir = videos_dir
+        self.routes = routes or []  # descriptions of the routing rules, in order
         self.logger = Config.get_logger('application.command_handler')
 
     async def handle_start_command(self, message: Message) -> None:
         """Handle /start command"""
-        self.logger.info(f"Handling /start command from user {message.sender_id} in chat {message.chat_id}")
+        self.logger.info("Handling /start command from user %s in chat %s", message.sender_id, message.chat_id)
         welcome_text = (
             "🤖 ¡Hola! Soy Peque Bot\n\n"
-            "Puedo ayudarte a gestionar videos de diferentes duraciones:\n"
-            "• Videos cortos (< 30 segundos)\n"
-            "• Videos medianos (30 segundos - 5 minutos)\n"
-            "• Videos largos (> 5 minutos)\n\n"
-            "Envía /help para más información."
+            "Puedo ayudarte a gestionar videos según estas reglas:\n"
+            + ''.join(f"• {route}\n" for route in self.routes) +
+            "\nEnvía /help para más información."
         )
         await self.message_sender.send_message(message.chat_id, welcome_text)
-        self.logger.info(f"Start command response sent to user {message.sender_id}")
+        self.logger.info("Start command response sent to user %s", message.sender_id)
 
     async def handle_help_command(self, message: Message) -> None:
         """Handle /help command"""
-        self.logger.info(f"Handling /help command from user {message.sender_id} in chat {message.chat_id}")
+        self.logger.info("Handling /help command from user %s in chat %s", message.sender_id, message.chat_id)
         help_text = (
             "📋 **Comandos disponibles:**\n\n"
             "/start - Iniciar el bot\n"
@@ -59,41 +77,98 @@ class CommandHandler:
             "Simplemente envía un video a los grupos correspondientes."
         )
         await self.message_sender.send_message(message.chat_id, help_text)
-        self.logger.info(f"Help command response sent to user {message.sender_id}")
+        self.logger.info("Help command response sent to user %s", message.sender_id)
 
     async def handle_status_command(self, message: Message) -> None:
         """Handle /status command"""
-        self.logger.info(f"Handling /status command from user {message.sender_id} in chat {message.chat_id}")
+        self.logger.info("Handling /status command from user %s in chat %s", message.sender_id, message.chat_id)
+        queue_text = "--"
+        if self.queue_depths:
+            depths = self.queue_depths()
+            queue_text = (f"{sum(depths.values())} "
+                          f"(pequeños {depths.get('short', 0)} / medianos {depths.get('medium', 0)} / grandes {depths.get('long', 0)})")
+        downloads = self.activity_tracker.downloads_in_flight if self.activity_tracker else 0
+        last_error = self.activity_tracker.last_error if self.activity_tracker else None
+        last_error_text = (f"{time.strftime('%d/%m %H:%M', time.localtime(last_error[0]))} - {last_error[1][:200]}"
+                           if last_error else "Ninguno")
         status_text = (
             "✅ **Estado del Bot**\n\n"
             "• Bot: Activo\n"
-            "• Conexión: OK\n"
-            "• Procesamiento: Listo\n\n"
-            "¡Todo funcionando correctamente!"
+            f"• Videos en cola: {queue_text}\n"
+            f"• Descargas en curso: {downloads}\n"
+            f"• Disco {self.videos_dir}: {await self._disk_usage_text()}\n"
+            f"• Último error: {last_error_text}"
         )
         await self.message_sender.send_message(message.chat_id, status_text)
-        self.logger.info(f"Status command response sent to user {message.sender_id}")
+        self.logger.info("Status command response sent to user %s", message.sender_id)
 
     async def handle_stats_command(self, message: Message) -> None:
         """Handle /stats command"""
-        self.logger.info(f"Handling /stats command from user {message.sender_id} in chat {message.chat_id}")
-        stats_text = (
-            "📊 **Estadísticas**\n\n"
-            "• Videos procesados: --\n"
-            "• Videos pendientes: --\n"
-            "• Espacio usado: --\n\n"
-            "_Estadísticas próximamente_"
-        )
+        self.logger.info("Handling /stats command from user %s in chat %s", message.sender_id, message.chat_id)
+        stats = await self.activity_tracker.get_stats() if self.activity_tracker else None
+        if stats is None:
+            stats_text = (
+                "📊 **Estadísticas**\n\n"
+                "_El registro de eventos está desactivado_"
+            )
+        else:
+            totals, today = stats.totals, stats.today
+            stats_text = (
+                "📊 **Estadísticas**\n\n"
+                f"• Videos recibidos: {totals.get('received', 0)} (hoy {today.get('received', 0)}, "
+                f"esta hora {stats.this_hour.get('received', 0)})\n"
+                f"• Por tamaño: pequeños {stats.by_category.get('short', 0)} / medianos {stats.by_category.get('medium', 0)} / "
+                f"grandes {stats.by_category.get('long', 0)}\n"
+                f"• Aprobados: {totals.get('approved', 0)} (hoy {today.get('approved', 0)})\n"
+                f"• Borrados: {totals.get('deleted', 0)} (hoy {today.get('deleted', 0)})\n"
+                f"• Descargados: {totals.get('downloaded', 0)} (hoy {today.get('downloaded', 0)})\n"
+                f"• Recortados: {totals.get('trimmed', 0)} (hoy {today.get('trimmed', 0)})\n"
+                f"• Duplicados: {totals.get('duplicate', 0)}\n"
+                f"• Errores: {totals.get('failed', 0)} (hoy {today.get('failed', 0)})\n"
+                f"• Videos guardados ahora: {await self._stored_videos_text()}\n"
+                f"• Descargado en total: {self._format_bytes(stats.bytes_downloaded)}\n"
+                f"• Espacio ahorrado comprimiendo: {self._format_bytes(stats.bytes_saved)} "
+                f"({totals.get('compacted', 0)} videos)"
+            )
         await self.message_sender.send_message(message.chat_id, stats_text)
-        self.logger.info(f"Stats command response sent to user {message.sender_id}")
+        self.logger.info("Stats command response sent to user %s", message.sender_id)
 
     async def handle_unknown_command(self, message: Message) -> None:
         """Handle unknown commands"""
         command = message.text.split()[0] if message.text else "unknown"
-        self.logger.warning(f"Unknown command '{command}' from user {message.sender_id} in chat {message.chat_id}")
+        self.logger.warning("Unknown command '%s' from user %s in chat %s", command, message.sender_id, message.chat_id)
         unknown_text = (
             "❓ Comando no reconocido.\n\n"
             "Envía /help para ver los comandos disponibles."
         )
         await self.message_sender.send_message(message.chat_id, unknown_text)
-        self.logger.info(f"Unknown command response sent to user {message.sender_id}")
\ No newline at end of file
+        self.logger.info("Unknown command response sent to user %s", message.sender_id)
+
+    async def _disk_usage_text(self) -> str:
+        try:
+            usage = await asyncio.to_thread(shutil.disk_usage, self.videos_dir)
+        except OSError:
+            return "no disponible"
+        return (f"{self._format_bytes(usage.used)} usados de {self._format_bytes(usage.total)} "
+                f"({usage.free * 100 // usage.total}% libre)")
+
+    async def _stored_videos_text(self) -> str:
+        """Videos currently on disk; evictions and compaction are reflected, unlike the download total"""
+        def scan() -> List[int]:
+            with os.scandir(self.videos_dir) as entries:
+                return [entry.stat().st_size for entry in entries
+                        if entry.is_file() and entry.name.lower().endswith(VIDEO_EXTENSIONS)]
+
+        try:
+            sizes = await asyncio.to_thread(scan)
+        except OSError:
+            return "no disponible"
+        return f"{self._format_bytes(sum(sizes))} ({len(sizes)} videos)"
+
+    @staticmethod
+    def _format_bytes(size: int) -> str:
+        for unit in ('B', 'KB', 'MB', 'GB'):
+            if size < 1024:
+                return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+            size /= 1024
+        return f"{size:.1f} TB"
@@ -0,0 +1,54 @@
+import asyncio
+import time
+from typing import Optional
+from src.domain.entities.video_message import VideoMessage
+from src.domain.repositories.fingerprint_index_repository import FingerprintIndexRepository
+from src.infrastructure.metrics.registry import metrics
+from src.infrastructure.telegram.video_fingerprinter import VideoFingerprinter
+from src.config.config import Config
+
+
+class NearDuplicateDetector:
+    """Recognizes re-encoded or re-uploaded copies of known videos by how they look.
+
+    Exact dedup only knows document ids and size/duration keys, which change whenever a
+    video is re-encoded. Here each new video gets a perceptual fingerprint that is looked
+    up in the fingerprint index; videos without a close match are added to it.
+    Fingerprinting is best effort: any failure or timeout just means no match.
+    """
+
+    def __init__(self, fingerprinter: VideoFingerprinter, fingerprint_index: FingerprintIndexRepository,
+                 timeout: Optional[float] = None):
+        self.fingerprinter = fingerprinter
+        self.fingerprint_index = fingerprint_index
+        self.timeout = timeout or Config.FINGERPRINT_TIMEOUT
+        self.logger = Config.get_logger('application.near_duplicate_detector')
+
+    async def check(self, video_message: VideoMessage) -> Optional[int]:
+        """Document id of the known video this one is a near-duplicate of, or None"""
+        document_id = video_message.document.id
+        try:
+            with metrics.timer('fingerprint'):
+                hashes = await asyncio.wait_for(self.fingerprinter.fingerprint(video_message), self.timeout)
+        except Exception as e:
+            self.logger.warning("Could not fingerprint document %s: %s", document_id, e or type(e).__name__)
+            return None
+        if not hashes:
+            self.logger.debug("No usable frames to fingerprint document %s", document_id)
+            return None
+
+        started = time.perf_counter()
+        match = await self.fingerprint_index.find_similar(hashes)
+        self.logger.debug("Fingerprint lookup for document %s took %.3fms",
+                          document_id, (time.perf_counter() - started) * 1000)
+        if match and match[0] != document_id:
+            original_id, distance = match
+            self.logger.info("Document %s looks like document %s (%s differing bit(s))",
+                             document_id, original_id, distance)
+            return original_id
+
+        await self.fingerprint_index.add(document_id, hashes)
+        return None
+
+    async def forget(self, document_id: int) -> None:
+        await self.fingerprint_index.remove(document_id)
@@ -0,0 +1,145 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+from src.domain.entities.video_message import VideoMessage
+from src.application.services.video_message_handler import VideoMessageHandlerService
+from src.config.config import Config
+
+
+class VideoJobScheduler:
+    """Bounded background job queues between the input group event handler and the use cases.
+
+    Each video category (short/medium/long) has its own lane with a bounded queue and a
+    fixed number of workers, so slow long-video downloads never block quick approvals.
+    """
+
+    LANES = ('short', 'medium', 'long')
+
+    def __init__(
+        self,
+        handler_service: VideoMessageHandlerService,
+        workers_per_lane: Optional[Dict[str, int]] = None,
+        queue_size: Optional[int] = None,
+        on_job_done: Optional[Callable[[VideoMessage], Awaitable[None]]] = None
+    ):
+        self.handler_service = handler_service
+        self.on_job_done = on_job_done
+        self.workers_per_lane = workers_per_lane or {
+            'short': Config.SHORT_VIDEO_WORKERS,
+            'medium': Config.MEDIUM_VIDEO_WORKERS,
+            'long': Config.LONG_VIDEO_WORKERS,
+        }
+        self.queue_size = queue_size if queue_size is not None else Config.VIDEO_QUEUE_MAX_SIZE
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.workers: List[asyncio.Task] = []
+        self.logger = Config.get_logger('application.video_job_scheduler')
+
+    @staticmethod
+    def lane_for(video_message: VideoMessage) -> Optional[str]:
+        """Return the lane name for a video, or None if it doesn't match any category"""
+        return video_message.category
+
+    async def start(self) -> None:
+        """Create the lane queues and spawn the workers"""
+        if self.workers:
+            return
+        for lane in self.LANES:
+            self.queues[lane] = asyncio.Queue(maxsize=self.queue_size)
+            worker_count = max(1, self.workers_per_lane.get(lane, 1))
+            for index in range(worker_count):
+                task = asyncio.create_task(self._worker(lane, index), name=f"video-{lane}-worker-{index}")
+                self.workers.append(task)
+            self.logger.info("Lane '%s' started with %s worker(s), queue size %s", lane, worker_count, self.queue_size)
+
+    async def stop(self) -> None:
+        """Cancel all workers. Jobs still queued are dropped."""
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers.clear()
+        self.logger.info("Video job scheduler stopped")
+
+    async def enqueue(self, video_message: VideoMessage) -> bool:
+        """Queue a video for background processing.
+
+        Returns immediately while the lane has room; when the lane is full it waits
+        for a free slot, applying backpressure to the caller.
+        """
+        lane = self.lane_for(video_message)
+        if lane is None:
+            self.logger.warning("Video size %s bytes doesn't match any lane for message %s",
+                                video_message.video_size, video_message.message_id)
+            await self._job_done(video_message)
+            return False
+
+        queue = self.queues[lane]
+        if queue.full():
+            self.logger.warning("Lane '%s' is full (%s jobs), waiting for a free slot for message %s",
+                                lane, queue.qsize(), video_message.message_id)
+        await queue.put(video_message)
+        self.logger.debug("Message %s queued in lane '%s' (depth: %s)", video_message.message_id, lane, queue.qsize())
+        return True
+
+    async def enqueue_album(self, video_messages: List[VideoMessage]) -> bool:
+        """Queue an album as a single job.
+
+        Long videos are split off into the long lane (they are downloaded, not approved);
+        the rest of the album goes to the medium lane if any item is medium, else short.
+        """
+        album = []
+        for video_message in video_messages:
+            if self.lane_for(video_message) == 'long':
+                await self.enqueue(video_message)
+            elif self.lane_for(video_message) is not None:
+                album.append(video_message)
+            else:
+                await self._job_done(video_message)
+
+        if len(album) <= 1:
+            for video_message in album:
+                await self.enqueue(video_message)
+            return bool(album)
+
+        lane = 'medium' if any(self.lane_for(video_message) == 'medium' for video_message in album) else 'short'
+        queue = self.queues[lane]
+        if queue.full():
+            self.logger.warning("Lane '%s' is full (%s jobs), waiting for a free slot for album %s",
+                                lane, queue.qsize(), album[0].grouped_id)
+        await queue.put(album)
+        self.logger.debug("Album %s (%s videos) queued in lane '%s' (depth: %s)",
+                          album[0].grouped_id, len(album), lane, queue.qsize())
+        return True
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Current number of queued jobs per lane"""
+        return {lane: queue.qsize() for lane, queue in self.queues.items()}
+
+    async def _worker(self, lane: str, index: int) -> None:
+        queue = self.queues[lane]
+        while True:
+            job: Union[VideoMessage, List[VideoMessage]] = await queue.get()
+            description = f"album {job[0].grouped_id}" if isinstance(job, list) else f"message {job.message_id}"
+            try:
+                self.logger.debug("Worker %s-%s processing %s", lane, index, description)
+                if isinstance(job, list):
+                    await self.handler_service.handle_album(job)
+                else:
+                    await self.handler_service.handle_video_message(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error("Worker %s-%s failed to process %s: %s", lane, index, description, e,
+                                  exc_info=True)
+            finally:
+                queue.task_done()
+            # Not reached on cancellation: jobs interrupted by shutdown are not done
+            for video_message in (job if isinstance(job, list) else [job]):
+                await self._job_done(video_message)
+
+    async def _job_done(self, video_message: VideoMessage) -> None:
+        """Notify that a message left the pipeline, whether it was processed, failed or rejected"""
+        if not self.on_job_done:
+            return
+        try:
+            await self.on_job_done(video_message)
+        except Exception as e:
+            self.logger.warning("Job completion callback failed for message %s: %s", video_message.message_id, e)
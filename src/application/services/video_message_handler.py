@@ -1,7 +1,19 @@
+from src.domain.entities.video_event import (EVENT_CLASSIFIED, EVENT_DOWNLOADED, EVENT_DUPLICATE, EVENT_FAILED,
+                                             EVENT_RECEIVED)
+from src.domain.entities.indexed_video import IndexedVideo
 from src.domain.entities.video_message import VideoMessage
 from src.domain.use_cases.handle_short_video import HandleShortVideoUseCase
 from src.domain.use_cases.handle_medium_video import HandleMediumVideoUseCase
+from datetime import datetime
+from typing import List, Optional
 from src.domain.use_cases.handle_long_video import HandleLongVideoUseCase
+from src.domain.use_cases.handle_duplicate_video import HandleDuplicateVideoUseCase
+from src.domain.use_cases.handle_video_album import HandleVideoAlbumUseCase
+from src.domain.repositories.video_index_repository import VideoIndexRepository
+from src.application.services.activity_tracker import ActivityTracker
+from src.application.services.near_duplicate_detector import NearDuplicateDetector
+from src.application.services.background_compaction import BackgroundCompactionService
+from src.infrastructure.metrics.registry import metrics
 from src.config.config import Config
 
 class VideoMessageHandlerService:
@@ -9,38 +21,163 @@ class VideoMessageHandlerService:
         self,
         handle_short_video_use_case: HandleShortVideoUseCase,
         handle_medium_video_use_case: HandleMediumVideoUseCase,
-        handle_long_video_use_case: HandleLongVideoUseCase
+        handle_long_video_use_case: HandleLongVideoUseCase,
+        video_index_repository: Optional[VideoIndexRepository] = None,
+        handle_duplicate_video_use_case: Optional[HandleDuplicateVideoUseCase] = None,
+        handle_video_album_use_case: Optional[HandleVideoAlbumUseCase] = None,
+        activity_tracker: Optional[ActivityTracker] = None,
+        near_duplicate_detector: Optional[NearDuplicateDetector] = None,
+        background_compaction: Optional[BackgroundCompactionService] = None
     ):
         self.handle_short_video_use_case = handle_short_video_use_case
         self.handle_medium_video_use_case = handle_medium_video_use_case
         self.handle_long_video_use_case = handle_long_video_use_case
+        self.video_index_repository = video_index_repository
+        self.handle_duplicate_video_use_case = handle_duplicate_video_use_case
+        self.handle_video_album_use_case = handle_video_album_use_case
+        self.activity_tracker = activity_tracker or ActivityTracker()
+        self.near_duplicate_detector = near_duplicate_detector
+        self.background_compaction = background_compaction
         self.logger = Config.get_logger('application.video_message_handler')
 
     async def handle_video_message(self, video_message: VideoMessage) -> None:
-        self.logger.info(f"Processing video message: ID={video_message.message_id}, "
-                        f"Chat={video_message.chat_id}, "
-                        f"Duration={video_message.video_duration}s, "
-                        f"Size={video_message.video_size} bytes")
+        self.logger.info("Processing video message: ID=%s, Chat=%s, Duration=%ss, Size=%s bytes",
+                         video_message.message_id, video_message.chat_id,
+                         video_message.video_duration, video_message.video_size)
+        await self.activity_tracker.record(EVENT_RECEIVED, video_message)
+
+        with metrics.timer('classify'):
+            duplicate = await self._is_duplicate(video_message)
+        if duplicate:
+            return
+        await self._route(video_message)
+
+    async def _route(self, video_message: VideoMessage) -> None:
+        if video_message.category:
+            await self.activity_tracker.record(EVENT_CLASSIFIED, video_message)
 
         try:
             if video_message.is_short_video:
-                self.logger.info(f"Routing to short video handler (duration: {video_message.video_duration}s)")
-                await self.handle_short_video_use_case.execute(video_message)
-                self.logger.info(f"Short video processing completed for message {video_message.message_id}")
+                self.logger.info("Routing to short video handler (duration: %ss)", video_message.video_duration)
+                with metrics.timer('process_short'):
+                    await self.handle_short_video_use_case.execute(video_message)
+                self.logger.info("Short video processing completed for message %s", video_message.message_id)
 
             elif video_message.is_medium_video:
-                self.logger.info(f"Routing to medium video handler (duration: {video_message.video_duration}s)")
-                await self.handle_medium_video_use_case.execute(video_message)
-                self.logger.info(f"Medium video processing completed for message {video_message.message_id}")
+                self.logger.info("Routing to medium video handler (duration: %ss)", video_message.video_duration)
+                with metrics.timer('process_medium'):
+                    await self.handle_medium_video_use_case.execute(video_message)
+                self.logger.info("Medium video processing completed for message %s", video_message.message_id)
 
             elif video_message.is_long_video:
-                self.logger.info(f"Routing to long video handler (duration: {video_message.video_duration}s)")
-                await self.handle_long_video_use_case.execute(video_message)
-                self.logger.info(f"Long video processing completed for message {video_message.message_id}")
+                self.logger.info("Routing to long video handler (duration: %ss)", video_message.video_duration)
+                self.activity_tracker.download_started()
+                try:
+                    with metrics.timer('process_long'):
+                        file_path = await self.handle_long_video_use_case.execute(video_message)
+                finally:
+                    self.activity_tracker.download_finished()
+                if file_path:
+                    await self.activity_tracker.record(EVENT_DOWNLOADED, video_message)
+                if file_path and self.video_index_repository:
+                    await self.video_index_repository.set_file_path(video_message.document.id, file_path)
+                if file_path and self.background_compaction:
+                    self.background_compaction.submit(file_path)
+                self.logger.info("Long video processing completed for message %s", video_message.message_id)
 
             else:
-                self.logger.warning(f"Video duration {video_message.video_duration}s doesn't match any category for message {video_message.message_id}")
+                self.logger.warning("Video duration %ss doesn't match any category for message %s",
+                                    video_message.video_duration, video_message.message_id)
+                return
+            metrics.inc('videos_total', category=video_message.category, outcome='processed')
+
+        except Exception as e:
+            metrics.inc('videos_total', category=video_message.category, outcome='failed')
+            self.logger.error("Error processing video message %s: %s", video_message.message_id, e, exc_info=True)
+            self.activity_tracker.record_error(f"Video {video_message.message_id}", e)
+            await self.activity_tracker.record(EVENT_FAILED, video_message, detail=type(e).__name__)
+            # Let a later copy of the same video be processed again
+            await self._forget(video_message)
+            raise
 
+    async def handle_album(self, video_messages: List[VideoMessage]) -> None:
+        """Process the short/medium videos of an album as a single approval"""
+        album_id = video_messages[0].grouped_id
+        self.logger.info("Processing album %s with %s video(s)", album_id, len(video_messages))
+        for video_message in video_messages:
+            await self.activity_tracker.record(EVENT_RECEIVED, video_message)
+
+        with metrics.timer('classify'):
+            album = [video_message for video_message in video_messages if not await self._is_duplicate(video_message)]
+        if len(album) <= 1 or not self.handle_video_album_use_case:
+            for video_message in album:
+                await self._route(video_message)
+            return
+
+        for video_message in album:
+            await self.activity_tracker.record(EVENT_CLASSIFIED, video_message)
+        try:
+            with metrics.timer('process_album'):
+                await self.handle_video_album_use_case.execute(album)
+            metrics.inc('videos_total', len(album), category='album', outcome='processed')
+            self.logger.info("Album %s processing completed (%s videos)", album_id, len(album))
         except Exception as e:
-            self.logger.error(f"Error processing video message {video_message.message_id}: {str(e)}", exc_info=True)
-            raise
\ No newline at end of file
+            self.logger.error("Error processing album %s: %s", album_id, e, exc_info=True)
+            self.activity_tracker.record_error(f"Album {album_id}", e)
+            for video_message in album:
+                await self.activity_tracker.record(EVENT_FAILED, video_message, detail=type(e).__name__)
+            for video_message in album:
+                await self._forget(video_message)
+            raise
+
+    async def _is_duplicate(self, video_message: VideoMessage) -> bool:
+        """Check the index before routing; known videos are short-circuited to the duplicate handler.
+        New videos are registered right away so concurrent copies are also detected, then
+        compared by fingerprint against known videos to catch re-encoded copies. Those are
+        only flagged: a perceptual match may rest on a single thumbnail, so the reviewer decides."""
+        if not self.video_index_repository:
+            return False
+
+        original = await self.video_index_repository.find(video_message)
+        if original is None:
+            await self.video_index_repository.register(video_message, video_message.category)
+            similar = await self._find_near_duplicate(video_message)
+            if similar is not None:
+                self._flag_near_duplicate(video_message, similar)
+            return False
+
+        if original.chat_id == video_message.chat_id and original.message_id == video_message.message_id:
+            # Same message processed again (e.g. a resumed download), not a duplicate
+            return False
+
+        await self.video_index_repository.mark_seen(original.document_id)
+        metrics.inc('videos_total', category=video_message.category, outcome='duplicate')
+        await self.activity_tracker.record(EVENT_DUPLICATE, video_message)
+        if self.handle_duplicate_video_use_case:
+            await self.handle_duplicate_video_use_case.execute(video_message, original)
+        else:
+            self.logger.info("Skipping duplicate video message %s (document %s)",
+                             video_message.message_id, original.document_id)
+        return True
+
+    async def _find_near_duplicate(self, video_message: VideoMessage) -> Optional[IndexedVideo]:
+        """Known video that looks the same as this new one (e.g. a re-encoded copy), if any"""
+        if not self.near_duplicate_detector:
+            return None
+        original_id = await self.near_duplicate_detector.check(video_message)
+        if original_id is None:
+            return None
+        return await self.video_index_repository.get(original_id)
+
+    def _flag_near_duplicate(self, video_message: VideoMessage, similar: IndexedVideo) -> None:
+        first_seen = datetime.fromtimestamp(similar.first_seen).strftime('%Y-%m-%d %H:%M')
+        name = f" ({similar.file_name})" if similar.file_name else ""
+        video_message.duplicate_warning = f"🔁 Posible duplicado de un video recibido el {first_seen}{name}"
+        self.logger.info("Message %s flagged as a possible duplicate of document %s",
+                         video_message.message_id, similar.document_id)
+
+    async def _forget(self, video_message: VideoMessage) -> None:
+        if self.video_index_repository:
+            await self.video_index_repository.remove(video_message.document.id)
+        if self.near_duplicate_detector:
+            await self.near_duplicate_detector.forget(video_message.document.id)
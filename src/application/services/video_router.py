@@ -0,0 +1,80 @@
+import fnmatch
+import json
+import re
+from typing import Callable, List, Optional, Tuple
+from src.domain.entities.routing_rule import RoutingRule
+from src.domain.entities.video_message import VideoMessage
+from src.config.config import Config
+
+Check = Callable[[VideoMessage], bool]
+
+
+class VideoRouter:
+    """Decides the route (short/medium/long) of each incoming video.
+
+    The configured rules are compiled once into an ordered decision table whose rows only
+    hold the checks their rule sets. A video is classified once, at ingest, by the first
+    row it satisfies, and the route is stored on the VideoMessage so queues and use cases
+    read it instead of classifying again.
+    """
+
+    def __init__(self, rules: Optional[List[RoutingRule]] = None):
+        self.rules = rules if rules is not None else self.load_rules()
+        self.table: List[Tuple[Check, str]] = [(self._compile(rule), rule.route) for rule in self.rules]
+        self.logger = Config.get_logger('application.video_router')
+        for position, rule in enumerate(self.rules, 1):
+            self.logger.info("Routing rule %s: %s", position, rule.describe())
+
+    @staticmethod
+    def load_rules() -> List[RoutingRule]:
+        """Rules from ROUTING_RULES (JSON) or ROUTING_RULES_FILE, or the size limits when neither is set"""
+        source = Config.ROUTING_RULES
+        if not source and Config.ROUTING_RULES_FILE:
+            with open(Config.ROUTING_RULES_FILE, 'r', encoding='utf-8') as f:
+                source = f.read()
+        if not source:
+            return [
+                RoutingRule('short', max_size=Config.SHORT_VIDEO_MAX_BYTES),
+                RoutingRule('medium', min_size=Config.SHORT_VIDEO_MAX_BYTES, max_size=Config.MEDIUM_VIDEO_MAX_BYTES),
+                RoutingRule('long', min_size=Config.MEDIUM_VIDEO_MAX_BYTES),
+            ]
+        rules = json.loads(source)
+        if not isinstance(rules, list):
+            raise ValueError("Routing rules must be a JSON list of rules")
+        return [RoutingRule.from_dict(rule) for rule in rules]
+
+    def classify(self, video_message: VideoMessage) -> Optional[str]:
+        """Store and return the route of the first matching rule (None if no rule matches)"""
+        video_message.category = next((route for check, route in self.table if check(video_message)), None)
+        return video_message.category
+
+    def describe(self) -> List[str]:
+        return [rule.describe() for rule in self.rules]
+
+    @staticmethod
+    def _compile(rule: RoutingRule) -> Check:
+        checks: List[Check] = []
+        if rule.min_size is not None:
+            checks.append(lambda video_message, limit=rule.min_size: video_message.video_size >= limit)
+        if rule.max_size is not None:
+            checks.append(lambda video_message, limit=rule.max_size: video_message.video_size < limit)
+        if rule.min_duration is not None:
+            checks.append(lambda video_message, limit=rule.min_duration: video_message.video_duration >= limit)
+        if rule.max_duration is not None:
+            checks.append(lambda video_message, limit=rule.max_duration: video_message.video_duration < limit)
+        if rule.mime_types:
+            mime_types = frozenset(rule.mime_types)
+            checks.append(lambda video_message: (getattr(video_message.document, 'mime_type', None) or '').lower()
+                          in mime_types)
+        if rule.file_name_pattern:
+            match_name = re.compile(fnmatch.translate(rule.file_name_pattern), re.IGNORECASE).match
+            checks.append(lambda video_message: bool(video_message.file_name and match_name(video_message.file_name)))
+        if rule.chat_ids:
+            chat_ids = frozenset(rule.chat_ids)
+            checks.append(lambda video_message: video_message.chat_id in chat_ids)
+
+        if not checks:
+            return lambda video_message: True
+        if len(checks) == 1:
+            return checks[0]
+        return lambda video_message: all(check(video_message) for check in checks)
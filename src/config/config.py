@@ -1,11 +1,32 @@
 from dotenv import load_dotenv
 import os
+import atexit
+import copy
 import logging
+import logging.handlers
+import queue
 import sys
 from pathlib import Path
+from typing import Optional
+from src.config.json_formatter import JsonFormatter
 
 load_dotenv()
 
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves tracebacks and formatter output to the listener thread.
+
+    The message itself is still rendered on the logging thread in prepare().
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message now so later changes to mutable args don't leak into it
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
 class Config:
     API_ID = os.getenv('API_ID')
     API_HASH = os.getenv('API_HASH')
@@ -13,11 +34,145 @@ class Config:
 
     VIDEO_INPUT_GROUP_ID = os.getenv('VIDEO_INPUT_GROUP_ID')
     DESTINATION_CHAT_ID = os.getenv('DESTINATION_CHAT_ID')
+    # Chats that receive the clips made with the trim button (comma separated)
+    TRIM_DESTINATION_CHAT_IDS = [chat_id.strip() for chat_id in os.getenv('TRIM_DESTINATION_CHAT_IDS', '-1002834323493').split(',')
+                                 if chat_id.strip()]
+
+    # Trim mode: 'copy' cuts on the nearest keyframe without re-encoding, 'reencode' uses libx264/aac
+    TRIM_MODE = os.getenv('TRIM_MODE', 'copy').lower()
+    # Seconds around the requested start searched for keyframes in 'copy' mode
+    TRIM_KEYFRAME_WINDOW = float(os.getenv('TRIM_KEYFRAME_WINDOW', '5'))
+    # Range-only downloads for trims: fetch just the MP4 index and the window's samples
+    TRIM_RANGE_DOWNLOAD = os.getenv('TRIM_RANGE_DOWNLOAD', 'true').lower() == 'true'
+    TRIM_RANGE_MERGE_GAP = int(os.getenv('TRIM_RANGE_MERGE_GAP_KB', '256')) * 1024
+    TRIM_RANGE_MAX_RATIO = float(os.getenv('TRIM_RANGE_MAX_RATIO', '0.5'))
+    # Pipe downloads straight into ffmpeg and upload the clip while it's encoded
+    TRIM_STREAMING = os.getenv('TRIM_STREAMING', 'true').lower() == 'true'
+    # Outputs of the trim button, all rendered from one decode: kind[:seconds][@percent] with kind
+    # 'video', 'gif' or 'thumbnail', e.g. "video:10,video:30,gif:4,thumbnail@50"
+    CLIP_OUTPUTS = [spec.strip() for spec in os.getenv('CLIP_OUTPUTS', 'video:10').split(',') if spec.strip()]
+
+    # Concurrent sends when fanning out one upload to several chats
+    FANOUT_CONCURRENCY = int(os.getenv('FANOUT_CONCURRENCY', '4'))
+
+    # ffmpeg admission control: 0 = derive from the CPU core count
+    FFMPEG_MAX_PROCESSES = int(os.getenv('FFMPEG_MAX_PROCESSES', '0'))
+    FFMPEG_THREADS_PER_JOB = int(os.getenv('FFMPEG_THREADS_PER_JOB', '0'))
+
+    # Persistent state (indexes, journals) directory
+    DATA_DIR = os.getenv('DATA_DIR', 'data')
+
+    # Dedup index of already processed videos
+    VIDEO_INDEX_ENABLED = os.getenv('VIDEO_INDEX_ENABLED', 'true').lower() == 'true'
+    VIDEO_INDEX_DB = os.path.join(DATA_DIR, 'video_index.sqlite3')
+
+    # Perceptual near-duplicate detection: frames sampled when a video has no thumbnail,
+    # bytes streamed to sample them, differing bits (of 64) still counted as the same video
+    FINGERPRINT_ENABLED = os.getenv('FINGERPRINT_ENABLED', 'true').lower() == 'true'
+    FINGERPRINT_FRAMES = int(os.getenv('FINGERPRINT_FRAMES', '4'))
+    FINGERPRINT_MAX_BYTES = int(os.getenv('FINGERPRINT_MAX_MB', '8')) * (1024 * 1024)
+    FINGERPRINT_MAX_DISTANCE = int(os.getenv('FINGERPRINT_MAX_DISTANCE', '6'))
+    FINGERPRINT_TIMEOUT = float(os.getenv('FINGERPRINT_TIMEOUT', '20'))
+    FINGERPRINT_DB = os.path.join(DATA_DIR, 'fingerprints.sqlite3')
+
+    # Append-only event log with rollups backing /stats
+    EVENT_STORE_ENABLED = os.getenv('EVENT_STORE_ENABLED', 'true').lower() == 'true'
+    EVENT_STORE_DB = os.path.join(DATA_DIR, 'events.sqlite3')
+
+    # Cache of trimmed clips and their uploaded Telegram media
+    TRIM_CACHE_ENABLED = os.getenv('TRIM_CACHE_ENABLED', 'true').lower() == 'true'
+    TRIM_CACHE_DIR = os.path.join(DATA_DIR, 'trim_cache')
+    TRIM_CACHE_MAX_BYTES = int(os.getenv('TRIM_CACHE_MAX_MB', '500')) * (1024 * 1024)
+    TRIM_CACHE_MAX_ENTRIES = int(os.getenv('TRIM_CACHE_MAX_ENTRIES', '5000'))  # clips remembered, with or without file
+
+    # Approval messages awaiting a button press (TTL in hours, 0 = never expire)
+    PENDING_APPROVAL_TTL = int(os.getenv('PENDING_APPROVAL_TTL_HOURS', '168')) * 3600
+    PENDING_APPROVAL_MAX_ENTRIES = int(os.getenv('PENDING_APPROVAL_MAX_ENTRIES', '10000'))
+    PENDING_APPROVAL_PERSIST = os.getenv('PENDING_APPROVAL_PERSIST', 'true').lower() == 'true'
+    PENDING_APPROVAL_FILE = os.path.join(DATA_DIR, 'pending_approvals.json')
 
     # Video size limits in MB (converted to bytes internally)
     SHORT_VIDEO_MAX_BYTES = int(os.getenv('SHORT_VIDEO_MAX_MB', '50')) * (1024 * 1024)
     MEDIUM_VIDEO_MAX_BYTES = int(os.getenv('MEDIUM_VIDEO_MAX_MB', '500')) * (1024 * 1024)
 
+    # Routing rules as a JSON list (inline or in a file), evaluated in order; when unset,
+    # videos are routed by the size limits above
+    ROUTING_RULES = os.getenv('ROUTING_RULES', '').strip()
+    ROUTING_RULES_FILE = os.getenv('ROUTING_RULES_FILE', '').strip()
+
+    # Background job queue: workers per lane and max queued jobs per lane
+    SHORT_VIDEO_WORKERS = int(os.getenv('SHORT_VIDEO_WORKERS', '4'))
+    MEDIUM_VIDEO_WORKERS = int(os.getenv('MEDIUM_VIDEO_WORKERS', '2'))
+    LONG_VIDEO_WORKERS = int(os.getenv('LONG_VIDEO_WORKERS', '1'))
+    VIDEO_QUEUE_MAX_SIZE = int(os.getenv('VIDEO_QUEUE_MAX_SIZE', '100'))
+
+    # Album batching: videos sharing a grouped_id are collected for this many seconds
+    ALBUM_BATCHING_ENABLED = os.getenv('ALBUM_BATCHING_ENABLED', 'true').lower() == 'true'
+    ALBUM_COLLECT_WINDOW = float(os.getenv('ALBUM_COLLECT_WINDOW', '1.5'))
+
+    # Outbound rate limits: global and private chats per second, groups/channels per minute
+    OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', '25'))
+    OUTBOUND_CHAT_RATE = float(os.getenv('OUTBOUND_CHAT_RATE', '1'))
+    OUTBOUND_GROUP_RATE_PER_MIN = float(os.getenv('OUTBOUND_GROUP_RATE_PER_MIN', '20'))
+    OUTBOUND_CHAT_BURST = int(os.getenv('OUTBOUND_CHAT_BURST', '5'))
+    # FloodWaits up to this many seconds are waited out and retried; longer ones fail
+    OUTBOUND_MAX_FLOOD_WAIT = int(os.getenv('OUTBOUND_MAX_FLOOD_WAIT', '900'))
+
+    # Metrics: Prometheus text endpoint on a local port (disabled by default)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '9464'))
+
+    # Resolved input peers of the configured chats, reused across restarts
+    PEER_CACHE_FILE = os.path.join(DATA_DIR, 'peer_cache.json')
+
+    # Startup catch-up of messages posted while the bot was down
+    CATCHUP_ENABLED = os.getenv('CATCHUP_ENABLED', 'true').lower() == 'true'
+    CATCHUP_BATCH_SIZE = int(os.getenv('CATCHUP_BATCH_SIZE', '100'))
+    CATCHUP_RATE = float(os.getenv('CATCHUP_RATE', '5'))  # messages per second
+    CATCHUP_CHECKPOINT_FILE = os.path.join(DATA_DIR, 'checkpoints.json')
+
+    # Disk space for downloaded videos: quota (0 = no quota), free space always kept,
+    # eviction order when space runs short ('lru', 'age' or 'none') and never-evicted file patterns
+    STORAGE_QUOTA_BYTES = int(os.getenv('STORAGE_QUOTA_MB', '0')) * (1024 * 1024)
+    STORAGE_MIN_FREE_BYTES = int(os.getenv('STORAGE_MIN_FREE_MB', '1024')) * (1024 * 1024)
+    STORAGE_EVICTION = os.getenv('STORAGE_EVICTION', 'none').lower()
+    STORAGE_PINNED_PATTERNS = [pattern.strip() for pattern in os.getenv('STORAGE_PINNED_PATTERNS', '').split(',')
+                               if pattern.strip()]
+
+    # Background compaction of stored videos: 'off', 'faststart' (remux only) or 'transcode'
+    # (re-encode the video at COMPACT_CRF), run once the bot has been idle COMPACT_IDLE_SECONDS
+    COMPACT_MODE = os.getenv('COMPACT_MODE', 'off').lower()
+    COMPACT_ENCODER = os.getenv('COMPACT_ENCODER', 'libx265')
+    COMPACT_CRF = int(os.getenv('COMPACT_CRF', '28'))
+    COMPACT_PRESET = os.getenv('COMPACT_PRESET', 'medium')
+    COMPACT_THREADS = int(os.getenv('COMPACT_THREADS', '0'))  # 0 = thread budget of the transcode scheduler
+    COMPACT_IDLE_SECONDS = float(os.getenv('COMPACT_IDLE_SECONDS', '60'))
+    COMPACT_MIN_SAVINGS = float(os.getenv('COMPACT_MIN_SAVINGS_PERCENT', '10')) / 100
+    COMPACT_STATE_FILE = os.path.join(DATA_DIR, 'compaction.json')
+
+    # Contact-sheet preview replied after a long video is stored: PREVIEW_FRAMES evenly spaced
+    # frames, PREVIEW_TILE_WIDTH px wide, tiled PREVIEW_COLUMNS per row, extracted PREVIEW_WORKERS at a time
+    PREVIEW_ENABLED = os.getenv('PREVIEW_ENABLED', 'true').lower() == 'true'
+    PREVIEW_FRAMES = int(os.getenv('PREVIEW_FRAMES', '16'))
+    PREVIEW_COLUMNS = int(os.getenv('PREVIEW_COLUMNS', '4'))
+    PREVIEW_TILE_WIDTH = int(os.getenv('PREVIEW_TILE_WIDTH', '320'))
+    PREVIEW_WORKERS = int(os.getenv('PREVIEW_WORKERS', '2'))
+
+    # Parallel downloads: connections to the file's DC and part size (KB)
+    DOWNLOAD_CONNECTIONS = int(os.getenv('DOWNLOAD_CONNECTIONS', '4'))
+    DOWNLOAD_PART_SIZE = int(os.getenv('DOWNLOAD_PART_SIZE_KB', '512')) * 1024
+    # Completed parts between journal writes for resumable downloads
+    DOWNLOAD_JOURNAL_FLUSH_PARTS = int(os.getenv('DOWNLOAD_JOURNAL_FLUSH_PARTS', '16'))
+
+    # Logging: 'text' or 'json' lines, rotation by size (MB) or by time when LOG_ROTATE_WHEN is set
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_MB', '10')) * (1024 * 1024)
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', '')  # e.g. 'midnight', 'H'
+
+    _log_listener: Optional[logging.handlers.QueueListener] = None
+
     @staticmethod
     def check_video_group_ids(video_group_id: str) -> int:
         try:
@@ -38,17 +193,72 @@ class Config:
         """Log the configured chat IDs for monitoring and debugging"""
         logger.info("=== Chat Configuration ===")
         logger.info(f"Log Level: {os.getenv('LOG_LEVEL', 'INFO')}")
+        rotation = f"every {Config.LOG_ROTATE_WHEN}" if Config.LOG_ROTATE_WHEN else f"at {Config.LOG_MAX_BYTES // (1024*1024)} MB"
+        logger.info(f"Log Format: {Config.LOG_FORMAT}, rotated {rotation} ({Config.LOG_BACKUP_COUNT} backups)")
         logger.info(f"Video Input Group ID: {Config.VIDEO_INPUT_GROUP_ID}")
         logger.info(f"Destination Chat ID: {Config.DESTINATION_CHAT_ID}")
+        logger.info(f"Trim Destination Chat IDs: {', '.join(Config.TRIM_DESTINATION_CHAT_IDS) or 'None'}")
         logger.info(f"Bot Token: {'*' * len(Config.BOT_TOKEN) if Config.BOT_TOKEN else 'Not Set'}")
         logger.info("=== Video Size Limits ===")
         logger.info(f"Short Video Max: {Config.SHORT_VIDEO_MAX_BYTES // (1024*1024)} MB ({Config.SHORT_VIDEO_MAX_BYTES} bytes)")
         logger.info(f"Medium Video Max: {Config.MEDIUM_VIDEO_MAX_BYTES // (1024*1024)} MB ({Config.MEDIUM_VIDEO_MAX_BYTES} bytes)")
+        logger.info(f"Routing Rules: {'ROUTING_RULES' if Config.ROUTING_RULES else Config.ROUTING_RULES_FILE or 'size limits'}")
+        logger.info("=== Job Queue ===")
+        logger.info(f"Workers (short/medium/long): {Config.SHORT_VIDEO_WORKERS}/{Config.MEDIUM_VIDEO_WORKERS}/{Config.LONG_VIDEO_WORKERS}")
+        logger.info(f"Queue Max Size per lane: {Config.VIDEO_QUEUE_MAX_SIZE}")
+        logger.info(f"Catch-up: {'enabled' if Config.CATCHUP_ENABLED else 'disabled'} "
+                    f"(batches of {Config.CATCHUP_BATCH_SIZE}, {Config.CATCHUP_RATE} msg/s)")
+        logger.info(f"Album Batching: {'enabled' if Config.ALBUM_BATCHING_ENABLED else 'disabled'} "
+                    f"(window {Config.ALBUM_COLLECT_WINDOW}s)")
+        logger.info("=== Outbound Requests ===")
+        logger.info(f"Rate Limits: {Config.OUTBOUND_GLOBAL_RATE}/s global, {Config.OUTBOUND_CHAT_RATE}/s per private chat, "
+                    f"{Config.OUTBOUND_GROUP_RATE_PER_MIN}/min per group (burst {Config.OUTBOUND_CHAT_BURST})")
+        logger.info(f"Max Flood Wait: {Config.OUTBOUND_MAX_FLOOD_WAIT}s")
+        logger.info("=== Metrics ===")
+        logger.info(f"Metrics Endpoint: {f'http://{Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics' if Config.METRICS_ENABLED else 'disabled'}")
+        logger.info("=== Persistence ===")
+        logger.info(f"Data Dir: {Config.DATA_DIR}")
+        logger.info(f"Peer Cache: {Config.PEER_CACHE_FILE}")
+        logger.info(f"Video Index: {'enabled' if Config.VIDEO_INDEX_ENABLED else 'disabled'} ({Config.VIDEO_INDEX_DB})")
+        logger.info(f"Fingerprints: {'enabled' if Config.FINGERPRINT_ENABLED else 'disabled'} ({Config.FINGERPRINT_DB}, "
+                    f"{Config.FINGERPRINT_FRAMES} frames from the first {Config.FINGERPRINT_MAX_BYTES // (1024*1024)} MB, "
+                    f"max distance {Config.FINGERPRINT_MAX_DISTANCE})")
+        logger.info(f"Event Store: {'enabled' if Config.EVENT_STORE_ENABLED else 'disabled'} ({Config.EVENT_STORE_DB})")
+        logger.info(f"Trim Cache: {'enabled' if Config.TRIM_CACHE_ENABLED else 'disabled'} "
+                    f"({Config.TRIM_CACHE_DIR}, max {Config.TRIM_CACHE_MAX_BYTES // (1024*1024)} MB, "
+                    f"{Config.TRIM_CACHE_MAX_ENTRIES} clips)")
+        logger.info(f"Pending Approvals: max {Config.PENDING_APPROVAL_MAX_ENTRIES}, TTL {Config.PENDING_APPROVAL_TTL // 3600} h, "
+                    f"{'persisted to ' + Config.PENDING_APPROVAL_FILE if Config.PENDING_APPROVAL_PERSIST else 'in memory only'}")
+        logger.info("=== Trimming ===")
+        logger.info(f"Trim Mode: {Config.TRIM_MODE}")
+        logger.info(f"Trim Range Download: {'enabled' if Config.TRIM_RANGE_DOWNLOAD else 'disabled'}")
+        logger.info(f"Trim Streaming: {'enabled' if Config.TRIM_STREAMING else 'disabled'}")
+        logger.info(f"Clip Outputs: {', '.join(Config.CLIP_OUTPUTS)}")
+        logger.info("=== Downloads ===")
+        logger.info(f"Download Connections: {Config.DOWNLOAD_CONNECTIONS}")
+        logger.info(f"Download Part Size: {Config.DOWNLOAD_PART_SIZE // 1024} KB")
+        logger.info("=== Storage ===")
+        logger.info(f"Storage Quota: {f'{Config.STORAGE_QUOTA_BYTES // (1024*1024)} MB' if Config.STORAGE_QUOTA_BYTES else 'none'}, "
+                    f"min free {Config.STORAGE_MIN_FREE_BYTES // (1024*1024)} MB")
+        logger.info(f"Storage Eviction: {Config.STORAGE_EVICTION} "
+                    f"(pinned: {', '.join(Config.STORAGE_PINNED_PATTERNS) or 'none'})")
+        logger.info(f"Compaction: {Config.COMPACT_MODE}"
+                    + (f" ({Config.COMPACT_ENCODER} CRF {Config.COMPACT_CRF} preset {Config.COMPACT_PRESET}, "
+                       f"{Config.COMPACT_THREADS or 'scheduler'} threads, idle {Config.COMPACT_IDLE_SECONDS:g}s, "
+                       f"min savings {Config.COMPACT_MIN_SAVINGS:.0%})" if Config.COMPACT_MODE != 'off' else ""))
+        logger.info(f"Preview: {Config.PREVIEW_ENABLED}"
+                    + (f" ({Config.PREVIEW_FRAMES} frames, {Config.PREVIEW_COLUMNS} columns, "
+                       f"{Config.PREVIEW_TILE_WIDTH}px tiles, {Config.PREVIEW_WORKERS} workers)"
+                       if Config.PREVIEW_ENABLED else ""))
         logger.info("==========================")
 
     @staticmethod
     def setup_logging(level: str = None) -> logging.Logger:
-        """Configure and return the main application logger"""
+        """Configure and return the main application logger.
+
+        Records are handed to a queue and written by a background listener thread, so
+        console and file I/O never block the event loop.
+        """
 
         # Get log level from environment variable if not provided
         if level is None:
@@ -63,30 +273,58 @@ class Config:
         logger.setLevel(getattr(logging, level.upper(), logging.INFO))
 
         # Remove existing handlers to avoid duplicates
+        Config.shutdown_logging()
         logger.handlers.clear()
 
         # Console handler
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(getattr(logging, level.upper(), logging.INFO))
 
-        # File handler
-        file_handler = logging.FileHandler(logs_dir / 'peque_bot.log', encoding='utf-8')
+        # File handler, rotated so the log doesn't grow forever
+        log_file = logs_dir / 'peque_bot.log'
+        if Config.LOG_ROTATE_WHEN:
+            file_handler = logging.handlers.TimedRotatingFileHandler(
+                log_file, when=Config.LOG_ROTATE_WHEN, backupCount=Config.LOG_BACKUP_COUNT, encoding='utf-8'
+            )
+        else:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=Config.LOG_MAX_BYTES, backupCount=Config.LOG_BACKUP_COUNT, encoding='utf-8'
+            )
         file_handler.setLevel(logging.DEBUG)
 
         # Formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        if Config.LOG_FORMAT == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            )
         console_handler.setFormatter(formatter)
         file_handler.setFormatter(formatter)
 
-        # Add handlers
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+        # Only the queue handler runs on the caller's thread; the listener does the writing
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(_DeferredQueueHandler(log_queue))
+        Config._log_listener = logging.handlers.QueueListener(
+            log_queue, console_handler, file_handler, respect_handler_level=True
+        )
+        Config._log_listener.start()
+        atexit.register(Config.shutdown_logging)
 
         return logger
 
+    @staticmethod
+    def shutdown_logging() -> None:
+        """Flush queued records and stop the background log writer"""
+        listener = Config._log_listener
+        if listener is None:
+            return
+        Config._log_listener = None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
     @staticmethod
     def get_logger(name: str) -> logging.Logger:
         """Get a logger for a specific module"""
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from typing import List
+
+# Output formats a clip can be rendered to
+CLIP_VIDEO = 'video'
+CLIP_GIF = 'gif'
+CLIP_THUMBNAIL = 'thumbnail'
+CLIP_KINDS = (CLIP_VIDEO, CLIP_GIF, CLIP_THUMBNAIL)
+
+DEFAULT_DURATIONS = {CLIP_VIDEO: 10, CLIP_GIF: 5, CLIP_THUMBNAIL: 0}
+FILE_SUFFIXES = {CLIP_VIDEO: '.mp4', CLIP_GIF: '.gif', CLIP_THUMBNAIL: '.jpg'}
+
+
+@dataclass(frozen=True)
+class ClipSpec:
+    """One output cut from a video: an MP4 clip, an animated GIF or a still frame.
+
+    `position` is where the output is centred, as a fraction of the video (0.5 = middle);
+    the window is shifted to stay inside the video.
+    """
+    kind: str = CLIP_VIDEO
+    duration: float = DEFAULT_DURATIONS[CLIP_VIDEO]  # seconds, always 0 for thumbnails
+    position: float = 0.5
+
+    def __post_init__(self):
+        if self.kind not in CLIP_KINDS:
+            raise ValueError(f"Invalid clip kind '{self.kind}', expected one of {CLIP_KINDS}")
+        if self.kind == CLIP_THUMBNAIL:
+            # A still frame has no duration; keeps start_time centred and cache keys stable
+            object.__setattr__(self, 'duration', DEFAULT_DURATIONS[CLIP_THUMBNAIL])
+        if self.kind != CLIP_THUMBNAIL and self.duration <= 0:
+            raise ValueError(f"Clip duration must be positive, got {self.duration}")
+        if not 0 <= self.position <= 1:
+            raise ValueError(f"Clip position must be between 0 and 1, got {self.position}")
+
+    @classmethod
+    def parse(cls, text: str) -> 'ClipSpec':
+        """Build a spec from its configuration form `kind[:seconds][@percent]`, e.g. `gif:4@25`"""
+        text, _, percent = text.strip().partition('@')
+        kind, _, seconds = text.partition(':')
+        kind = kind.strip().lower()
+        if kind not in CLIP_KINDS:
+            raise ValueError(f"Invalid clip kind '{kind}', expected one of {CLIP_KINDS}")
+        duration = float(seconds) if seconds else DEFAULT_DURATIONS[kind]
+        return cls(
+            kind=kind,
+            # Whole seconds stay ints so cache keys match those of plain trims
+            duration=int(duration) if float(duration).is_integer() else duration,
+            position=float(percent) / 100 if percent else 0.5
+        )
+
+    @classmethod
+    def parse_list(cls, items: List[str]) -> List['ClipSpec']:
+        return [cls.parse(item) for item in items]
+
+    @property
+    def length(self) -> float:
+        """Seconds of the source the output needs; a still frame needs one frame's worth"""
+        return self.duration if self.kind != CLIP_THUMBNAIL else 1
+
+    @property
+    def suffix(self) -> str:
+        return FILE_SUFFIXES[self.kind]
+
+    def start_time(self, video_duration: float) -> int:
+        """Whole second the output starts at within a video of video_duration seconds"""
+        start = min(video_duration - self.length, video_duration * self.position - self.duration / 2)
+        return max(0, int(start))
+
+    def caption(self) -> str:
+        """Spanish caption sent with the output"""
+        if self.kind == CLIP_THUMBNAIL:
+            return "🖼️ Fotograma del centro" if self.position == 0.5 else f"🖼️ Fotograma al {self.position:.0%}"
+        where = "desde el centro" if self.position == 0.5 else f"desde el {self.position:.0%}"
+        if self.kind == CLIP_GIF:
+            return f"🎞️ GIF ({self.duration:g}s {where})"
+        return f"🎬 Video recortado ({self.duration:g}s {where})"
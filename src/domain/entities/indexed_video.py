@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass
+class IndexedVideo:
+    document_id: int
+    content_key: str  # size/duration fingerprint used when the document id differs
+    chat_id: int
+    message_id: int
+    category: Optional[str]
+    first_seen: float  # unix timestamp
+    seen_count: int = 1
+    file_name: Optional[str] = None
+    file_path: Optional[str] = None  # Set once a long video is stored on disk
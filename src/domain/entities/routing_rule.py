@@ -0,0 +1,63 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# Routes with a lane and a use case behind them
+ROUTES = ('short', 'medium', 'long')
+
+MB = 1024 * 1024
+ROUTE_NAMES = {'short': 'Videos cortos', 'medium': 'Videos medianos', 'long': 'Videos largos'}
+RULE_KEYS = {'route', 'min_size_mb', 'max_size_mb', 'min_duration', 'max_duration', 'mime_types', 'file_name', 'chats'}
+
+
+@dataclass(frozen=True)
+class RoutingRule:
+    """One row of the routing table: a video takes `route` when it meets every condition set.
+    Minimums are inclusive and maximums exclusive."""
+    route: str
+    min_size: Optional[int] = None  # bytes
+    max_size: Optional[int] = None  # bytes
+    min_duration: Optional[float] = None  # seconds
+    max_duration: Optional[float] = None  # seconds
+    mime_types: Tuple[str, ...] = ()
+    file_name_pattern: Optional[str] = None  # glob, case-insensitive
+    chat_ids: Tuple[int, ...] = ()
+
+    def __post_init__(self):
+        if self.route not in ROUTES:
+            raise ValueError(f"Invalid route '{self.route}', expected one of {ROUTES}")
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'RoutingRule':
+        """Build a rule from its configuration form, e.g. {"route": "long", "min_duration": 600}"""
+        unknown = set(data) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"Unknown routing rule keys {sorted(unknown)}, expected some of {sorted(RULE_KEYS)}")
+        return cls(
+            route=data.get('route'),
+            min_size=int(data['min_size_mb'] * MB) if data.get('min_size_mb') is not None else None,
+            max_size=int(data['max_size_mb'] * MB) if data.get('max_size_mb') is not None else None,
+            min_duration=data.get('min_duration'),
+            max_duration=data.get('max_duration'),
+            mime_types=tuple(mime_type.lower() for mime_type in data.get('mime_types') or ()),
+            file_name_pattern=data.get('file_name'),
+            chat_ids=tuple(int(chat_id) for chat_id in data.get('chats') or ())
+        )
+
+    def describe(self) -> str:
+        """Spanish summary of the rule for logs and /start"""
+        conditions = []
+        if self.min_size is not None:
+            conditions.append(f"≥ {self.min_size // MB} MB")
+        if self.max_size is not None:
+            conditions.append(f"< {self.max_size // MB} MB")
+        if self.min_duration is not None:
+            conditions.append(f"≥ {self.min_duration:g} s")
+        if self.max_duration is not None:
+            conditions.append(f"< {self.max_duration:g} s")
+        if self.mime_types:
+            conditions.append(f"tipo {', '.join(self.mime_types)}")
+        if self.file_name_pattern:
+            conditions.append(f"nombre {self.file_name_pattern}")
+        if self.chat_ids:
+            conditions.append(f"chat {', '.join(str(chat_id) for chat_id in self.chat_ids)}")
+        return f"{ROUTE_NAMES[self.route]} ({', '.join(conditions) or 'resto'})"
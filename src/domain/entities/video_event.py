@@ -0,0 +1,25 @@
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Event types recorded over the life of a video
+EVENT_RECEIVED = 'received'
+EVENT_CLASSIFIED = 'classified'
+EVENT_DUPLICATE = 'duplicate'
+EVENT_APPROVED = 'approved'
+EVENT_DELETED = 'deleted'
+EVENT_DOWNLOADED = 'downloaded'
+EVENT_TRIMMED = 'trimmed'
+EVENT_FAILED = 'failed'
+EVENT_COMPACTED = 'compacted'  # size_bytes holds the bytes saved
+
+@dataclass
+class VideoEvent:
+    event_type: str
+    category: Optional[str] = None  # 'short', 'medium', 'long', 'album' or None
+    size_bytes: int = 0
+    document_id: Optional[int] = None
+    chat_id: Optional[int] = None
+    message_id: Optional[int] = None
+    detail: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
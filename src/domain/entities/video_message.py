@@ -1,8 +1,7 @@
 from dataclasses import dataclass
 from typing import Optional
-from src.config.config import Config
 
-@dataclass
+@dataclass(slots=True)
 class VideoMessage:
     message_id: int
     chat_id: int
@@ -11,18 +10,23 @@ class VideoMessage:
     document: any  # Telegram document object
     caption: Optional[str] = None
     file_name: Optional[str] = None  # Optional: Name of the file
+    grouped_id: Optional[int] = None  # Album the message belongs to, if any
+    category: Optional[str] = None  # route set once at ingest by VideoRouter: 'short', 'medium', 'long' or None
+    duplicate_warning: Optional[str] = None  # Shown to the reviewer when it looks like a known video
 
     @property
     def is_short_video(self) -> bool:
-        """Videos pequeños: menos del límite configurado"""
-        return self.video_size < Config.SHORT_VIDEO_MAX_BYTES
+        return self.category == 'short'
 
     @property
     def is_medium_video(self) -> bool:
-        """Videos medianos: entre los límites configurados"""
-        return Config.SHORT_VIDEO_MAX_BYTES <= self.video_size < Config.MEDIUM_VIDEO_MAX_BYTES
+        return self.category == 'medium'
 
     @property
     def is_long_video(self) -> bool:
-        """Videos largos: más del límite configurado"""
-        return self.video_size >= Config.MEDIUM_VIDEO_MAX_BYTES
\ No newline at end of file
+        return self.category == 'long'
+
+    @property
+    def content_key(self) -> str:
+        """Huella de tamaño y duración para reconocer re-subidas con otro document id"""
+        return f"{self.video_size}:{self.video_duration}"
\ No newline at end of file
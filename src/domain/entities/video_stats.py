@@ -0,0 +1,12 @@
+from dataclasses import dataclass, field
+from typing import Dict
+
+@dataclass
+class VideoStats:
+    """Rolled-up event counts: all time, today and the current clock hour"""
+    totals: Dict[str, int] = field(default_factory=dict)  # event type -> count
+    today: Dict[str, int] = field(default_factory=dict)
+    this_hour: Dict[str, int] = field(default_factory=dict)
+    by_category: Dict[str, int] = field(default_factory=dict)  # category -> classified videos
+    bytes_downloaded: int = 0  # bytes of every video ever downloaded, including ones since evicted
+    bytes_saved: int = 0  # bytes saved by compacting stored videos
@@ -0,0 +1,3 @@
+class InsufficientStorageError(Exception):
+    """Raised when a video can't be stored without exceeding the disk quota or free space"""
+    pass
@@ -0,0 +1,12 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+class CheckpointRepository(ABC):
+    @abstractmethod
+    async def get(self, chat_id: int) -> Optional[int]:
+        """Last message id fully processed in a chat, or None if there is no checkpoint yet"""
+        pass
+
+    @abstractmethod
+    async def set(self, chat_id: int, message_id: int) -> None:
+        pass
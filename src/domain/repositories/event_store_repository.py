@@ -0,0 +1,14 @@
+from abc import ABC, abstractmethod
+from src.domain.entities.video_event import VideoEvent
+from src.domain.entities.video_stats import VideoStats
+
+class EventStoreRepository(ABC):
+    @abstractmethod
+    async def append(self, event: VideoEvent) -> None:
+        """Append an event and update its rollups"""
+        pass
+
+    @abstractmethod
+    async def get_stats(self) -> VideoStats:
+        """Read the rolled-up statistics without scanning the event history"""
+        pass
@@ -0,0 +1,16 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+class FingerprintIndexRepository(ABC):
+    @abstractmethod
+    async def find_similar(self, hashes: List[int]) -> Optional[Tuple[int, int]]:
+        """Document id and Hamming distance of the closest known video, or None if nothing is close enough"""
+        pass
+
+    @abstractmethod
+    async def add(self, document_id: int, hashes: List[int]) -> None:
+        pass
+
+    @abstractmethod
+    async def remove(self, document_id: int) -> None:
+        pass
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
+from src.domain.entities.clip_spec import ClipSpec
 from src.domain.entities.video_message import VideoMessage
 
 class MessageRepository(ABC):
@@ -7,6 +8,11 @@ class MessageRepository(ABC):
     async def get_messages_from_group(self, group_id: int) -> List[VideoMessage]:
         pass
 
+    @abstractmethod
+    def iter_messages_since(self, group_id: int, min_id: int, batch_size: int) -> AsyncIterator[list]:
+        """Yield batches of the raw messages posted after min_id, oldest first"""
+        pass
+
     @abstractmethod
     async def forward_message(self, message: VideoMessage, destination_chat_id: str) -> None:
         pass
@@ -19,10 +25,18 @@ class MessageRepository(ABC):
     async def send_medium_video_with_buttons(self, message: VideoMessage, destination_chat_id: str, alert_text: str) -> None:
         pass
 
+    @abstractmethod
+    async def send_album_with_buttons(self, messages: List[VideoMessage], destination_chat_id: str, alert_text: str) -> None:
+        pass
+
     @abstractmethod
     async def delete_message(self, message: VideoMessage) -> None:
         pass
 
+    @abstractmethod
+    async def delete_messages(self, messages: List[VideoMessage]) -> None:
+        pass
+
     @abstractmethod
     async def edit_message_caption(self, message: VideoMessage, new_caption: str) -> None:
         pass
@@ -32,9 +46,14 @@ class MessageRepository(ABC):
         pass
 
     @abstractmethod
-    async def send_reply(self, chat_id: int, text: str, reply_to_message_id: int) -> None:
+    async def send_reply(self, chat_id: int, text: str, reply_to_message_id: int, file=None) -> None:
         pass
 
     @abstractmethod
     async def trim_and_send_video(self, message: VideoMessage, destination_chat_id: list[int], trim_duration: int = 10) -> None:
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def send_clips(self, message: VideoMessage, destination_chat_id: list[int], specs: List[ClipSpec]) -> None:
+        """Produce every output described by specs from one pass over the video and send them all"""
+        pass
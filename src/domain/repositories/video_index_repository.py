@@ -0,0 +1,35 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+from src.domain.entities.indexed_video import IndexedVideo
+from src.domain.entities.video_message import VideoMessage
+
+class VideoIndexRepository(ABC):
+    @abstractmethod
+    async def find(self, video_message: VideoMessage) -> Optional[IndexedVideo]:
+        """Find a known video by document id, falling back to its content key"""
+        pass
+
+    @abstractmethod
+    async def get(self, document_id: int) -> Optional[IndexedVideo]:
+        pass
+
+    @abstractmethod
+    async def register(self, video_message: VideoMessage, category: str) -> None:
+        pass
+
+    @abstractmethod
+    async def mark_seen(self, document_id: int) -> None:
+        pass
+
+    @abstractmethod
+    async def set_file_path(self, document_id: int, file_path: str) -> None:
+        pass
+
+    @abstractmethod
+    async def remove(self, document_id: int) -> None:
+        pass
+
+    @abstractmethod
+    async def forget_file(self, file_path: str) -> None:
+        """Clear the stored file path of the videos saved at file_path, once it is deleted"""
+        pass
@@ -1,8 +1,19 @@
 from abc import ABC, abstractmethod
+from typing import List, Optional
 from src.domain.entities.video_message import VideoMessage
 
 class VideoRepository(ABC):
     @abstractmethod
     async def download_video(self, video_message: VideoMessage, destination_dir: str) -> str:
         """Download video and return the file path"""
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def get_interrupted_downloads(self, destination_dir: str) -> List[VideoMessage]:
+        """Return the videos whose download was interrupted and can be resumed"""
+        pass
+
+    @abstractmethod
+    async def create_preview(self, file_path: str) -> Optional[str]:
+        """Return the path of a contact-sheet image of a stored video (None if it can't be made)"""
+        pass
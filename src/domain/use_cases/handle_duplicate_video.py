@@ -0,0 +1,42 @@
+import os
+from datetime import datetime
+from typing import Optional
+from src.domain.entities.indexed_video import IndexedVideo
+from src.domain.entities.video_message import VideoMessage
+from src.domain.repositories.message_repository import MessageRepository
+from src.domain.repositories.video_repository import VideoRepository
+from src.config.config import Config
+
+class HandleDuplicateVideoUseCase:
+    def __init__(self, message_repository: MessageRepository, video_repository: Optional[VideoRepository] = None):
+        self.message_repository = message_repository
+        self.video_repository = video_repository
+        self.logger = Config.get_logger('domain.use_cases.handle_duplicate_video')
+
+    async def execute(self, video_message: VideoMessage, original: IndexedVideo) -> None:
+        self.logger.info("Message %s is a duplicate of document %s (seen %s time(s), first in message %s)",
+                         video_message.message_id, original.document_id, original.seen_count, original.message_id)
+        first_seen = datetime.fromtimestamp(original.first_seen).strftime('%Y-%m-%d %H:%M')
+        preview_path = None
+        if original.file_path and os.path.exists(original.file_path):
+            reply_text = f"♻️ Video duplicado, ya descargado:\n📁 {original.file_path}"
+            preview_path = await self._preview(original.file_path)
+        else:
+            reply_text = f"♻️ Video duplicado de otro recibido el {first_seen}, no se procesa de nuevo."
+        try:
+            await self.message_repository.send_reply(video_message.chat_id, reply_text, video_message.message_id,
+                                                     file=preview_path)
+        except Exception as e:
+            self.logger.error("Failed to reply to duplicate video message %s: %s",
+                              video_message.message_id, e, exc_info=True)
+            raise
+
+    async def _preview(self, file_path: str) -> Optional[str]:
+        """Contact sheet of the stored original, usually already cached by its download"""
+        if not self.video_repository:
+            return None
+        try:
+            return await self.video_repository.create_preview(file_path)
+        except Exception as e:
+            self.logger.warning("Could not get preview of %s: %s", file_path, e)
+            return None
@@ -1,4 +1,6 @@
+from typing import Optional
 from src.domain.entities.video_message import VideoMessage
+from src.domain.exceptions import InsufficientStorageError
 from src.domain.repositories.message_repository import MessageRepository
 from src.domain.repositories.video_repository import VideoRepository
 from src.config.config import Config
@@ -10,29 +12,55 @@ class HandleLongVideoUseCase:
         self.videos_dir = "/app/videos"
         self.logger = Config.get_logger('domain.use_cases.handle_long_video')
 
-    async def execute(self, video_message: VideoMessage) -> None:
-        self.logger.debug(f"Executing long video use case for message {video_message.message_id}")
+    async def execute(self, video_message: VideoMessage) -> Optional[str]:
+        """Download the video and return the stored file path"""
+        self.logger.debug("Executing long video use case for message %s", video_message.message_id)
 
         if video_message.is_long_video:
-            self.logger.info(f"Downloading long video message {video_message.message_id} "
-                           f"from chat {video_message.chat_id} to directory {self.videos_dir}")
+            self.logger.info("Downloading long video message %s from chat %s to directory %s",
+                             video_message.message_id, video_message.chat_id, self.videos_dir)
             try:
                 # enviamos una respuesta al mensaje original indicando descarga en progreso
                 downloading_text = "⬇️ Descargando archivo, por favor espera..."
+                if video_message.duplicate_warning:
+                    downloading_text = f"{video_message.duplicate_warning}\n{downloading_text}"
                 await self.message_repository.send_reply(video_message.chat_id, downloading_text, video_message.message_id)
-                self.logger.info(f"Reply sent for video {video_message.message_id} with downloading status")
+                self.logger.info("Reply sent for video %s with downloading status", video_message.message_id)
 
                 file_path = await self.video_repository.download_video(video_message, self.videos_dir)
-                self.logger.info(f"Long video message {video_message.message_id} downloaded successfully to {file_path}")
+                self.logger.info("Long video message %s downloaded successfully to %s",
+                                 video_message.message_id, file_path)
 
                 # Send confirmation reply
                 confirmation_text = f"✅ Archivo descargado exitosamente:\n📁 {file_path}"
                 await self.message_repository.send_reply(video_message.chat_id, confirmation_text, video_message.message_id)
-                self.logger.info(f"Confirmation reply sent for long video {video_message.message_id}")
+                self.logger.info("Confirmation reply sent for long video %s", video_message.message_id)
 
+                await self._send_preview(video_message, file_path)
+                return file_path
+
+            except InsufficientStorageError as e:
+                self.logger.error("No space to store long video message %s: %s", video_message.message_id, e)
+                no_space_text = "❌ No hay espacio suficiente en disco para descargar el archivo"
+                await self.message_repository.send_reply(video_message.chat_id, no_space_text, video_message.message_id)
+                raise
             except Exception as e:
-                self.logger.error(f"Failed to process long video message {video_message.message_id}: {str(e)}", exc_info=True)
+                self.logger.error("Failed to process long video message %s: %s",
+                                  video_message.message_id, e, exc_info=True)
                 raise
         else:
-            self.logger.warning(f"Message {video_message.message_id} is not a long video "
-                              f"(duration: {video_message.video_duration}s)")
\ No newline at end of file
+            self.logger.warning("Message %s is not a long video (duration: %ss)",
+                                video_message.message_id, video_message.video_duration)
+        return None
+
+    async def _send_preview(self, video_message: VideoMessage, file_path: str) -> None:
+        """Reply with a contact sheet of the stored video; the download counts as done either way"""
+        try:
+            preview_path = await self.video_repository.create_preview(file_path)
+            if not preview_path:
+                return
+            await self.message_repository.send_reply(video_message.chat_id, "🖼️ Vista previa del video",
+                                                     video_message.message_id, file=preview_path)
+            self.logger.info("Preview reply sent for long video %s", video_message.message_id)
+        except Exception as e:
+            self.logger.warning("Could not send preview of long video %s: %s", video_message.message_id, e)
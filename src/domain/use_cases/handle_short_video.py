@@ -9,19 +9,20 @@ class HandleShortVideoUseCase:
         self.logger = Config.get_logger('domain.use_cases.handle_short_video')
 
     async def execute(self, video_message: VideoMessage) -> None:
-        self.logger.debug(f"Executing short video use case for message {video_message.message_id}")
+        self.logger.debug("Executing short video use case for message %s", video_message.message_id)
 
         if video_message.is_short_video:
-            self.logger.info(f"Sending short video message {video_message.message_id} "
-                           f"from chat {video_message.chat_id} to origin chat {video_message.chat_id} with approval buttons")
+            self.logger.info("Sending short video message %s from chat %s to origin chat %s with approval buttons",
+                             video_message.message_id, video_message.chat_id, video_message.chat_id)
             try:
                 await self.message_repository.send_message_with_buttons(video_message, video_message.chat_id, "✅ Este video es corto. ¿Deseas enviarlo al chat de destino?")
-                self.logger.info(f"Short video message {video_message.message_id} sent with buttons successfully")
+                self.logger.info("Short video message %s sent with buttons successfully", video_message.message_id)
                 # borrar el mensaje original
                 await self.message_repository.delete_message(video_message)
             except Exception as e:
-                self.logger.error(f"Failed to send short video message {video_message.message_id} with buttons: {str(e)}", exc_info=True)
+                self.logger.error("Failed to send short video message %s with buttons: %s",
+                                  video_message.message_id, e, exc_info=True)
                 raise
         else:
-            self.logger.warning(f"Message {video_message.message_id} is not a short video "
-                              f"(duration: {video_message.video_duration}s)")
\ No newline at end of file
+            self.logger.warning("Message %s is not a short video (duration: %ss)",
+                                video_message.message_id, video_message.video_duration)
\ No newline at end of file
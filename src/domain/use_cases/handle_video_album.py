@@ -0,0 +1,30 @@
+from typing import List
+from src.domain.entities.video_message import VideoMessage
+from src.domain.repositories.message_repository import MessageRepository
+from src.config.config import Config
+
+class HandleVideoAlbumUseCase:
+    def __init__(self, message_repository: MessageRepository):
+        self.message_repository = message_repository
+        self.logger = Config.get_logger('domain.use_cases.handle_video_album')
+
+    async def execute(self, video_messages: List[VideoMessage]) -> None:
+        album_id = video_messages[0].grouped_id
+        self.logger.debug("Executing video album use case for album %s (%s videos)", album_id, len(video_messages))
+
+        chat_id = video_messages[0].chat_id
+        if any(video_message.is_medium_video for video_message in video_messages):
+            alert_text = f"⚠️ Álbum de {len(video_messages)} videos con alguno de tamaño medio. ¿Deseas enviarlo al chat de destino?"
+        else:
+            alert_text = f"✅ Álbum de {len(video_messages)} videos cortos. ¿Deseas enviarlo al chat de destino?"
+
+        self.logger.info("Sending album %s from chat %s to origin chat %s with approval buttons",
+                         album_id, chat_id, chat_id)
+        try:
+            await self.message_repository.send_album_with_buttons(video_messages, chat_id, alert_text)
+            self.logger.info("Album %s sent with buttons successfully", album_id)
+            # borrar los mensajes originales en una sola llamada
+            await self.message_repository.delete_messages(video_messages)
+        except Exception as e:
+            self.logger.error("Failed to send album %s with buttons: %s", album_id, e, exc_info=True)
+            raise
@@ -0,0 +1,157 @@
+import asyncio
+import glob
+import json
+import os
+from typing import List, Optional, Set
+from src.domain.entities.video_message import VideoMessage
+from src.config.config import Config
+from src.infrastructure.telegram.document_handles import document_to_handle
+
+
+class DownloadJournal:
+    """On-disk progress journal for a partial download.
+
+    Lives next to the `.part` file and records the document reference, the message the
+    download belongs to and the byte ranges already written, so an interrupted download
+    can resume only the missing ranges after a restart.
+    """
+
+    PART_SUFFIX = '.part'
+    JOURNAL_SUFFIX = '.part.journal'
+    VERSION = 1
+
+    def __init__(self, path: str, data: dict):
+        self.path = path
+        self.data = data
+        self.part_size = data['part_size']
+        self.completed_parts: Set[int] = self._ranges_to_parts(data.get('completed', []))
+        self.pending_flush = 0
+        self.lock = asyncio.Lock()
+        self.logger = Config.get_logger('infrastructure.download_journal')
+
+    @classmethod
+    def journal_path(cls, file_path: str) -> str:
+        return file_path + cls.JOURNAL_SUFFIX
+
+    @classmethod
+    def part_path(cls, file_path: str) -> str:
+        return file_path + cls.PART_SUFFIX
+
+    @classmethod
+    def create(cls, file_path: str, video_message: VideoMessage, part_size: int) -> 'DownloadJournal':
+        document = video_message.document
+        data = {
+            'version': cls.VERSION,
+            'file_path': file_path,
+            'part_size': part_size,
+            'document': document_to_handle(document, video_message.video_duration, video_message.file_name),
+            'message': {
+                'message_id': video_message.message_id,
+                'chat_id': video_message.chat_id,
+                'video_duration': video_message.video_duration,
+                'caption': video_message.caption,
+                'file_name': video_message.file_name,
+            },
+            'completed': [],
+        }
+        journal = cls(cls.journal_path(file_path), data)
+        journal.flush()
+        return journal
+
+    @classmethod
+    def load(cls, path: str) -> Optional['DownloadJournal']:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != cls.VERSION:
+                return None
+            return cls(path, data)
+        except (OSError, ValueError, KeyError) as e:
+            Config.get_logger('infrastructure.download_journal').warning("Ignoring unreadable journal %s: %s", path, e)
+            return None
+
+    @classmethod
+    def find_all(cls, directory: str) -> List['DownloadJournal']:
+        """Load every journal left in a directory by interrupted downloads"""
+        journals = []
+        for path in sorted(glob.glob(os.path.join(glob.escape(directory), '*' + cls.JOURNAL_SUFFIX))):
+            journal = cls.load(path)
+            if journal:
+                journals.append(journal)
+        return journals
+
+    @property
+    def file_path(self) -> str:
+        return self.data['file_path']
+
+    @property
+    def document_id(self) -> int:
+        return self.data['document']['id']
+
+    @property
+    def size(self) -> int:
+        return self.data['document']['size']
+
+    def matches(self, document, part_size: int) -> bool:
+        """Whether this journal describes the same document downloaded with the same part layout"""
+        return self.document_id == document.id and self.size == document.size and self.part_size == part_size
+
+    def mark_done(self, part: int) -> bool:
+        """Record a completed part. Returns True when the journal should be flushed."""
+        self.completed_parts.add(part)
+        self.pending_flush += 1
+        return self.pending_flush >= Config.DOWNLOAD_JOURNAL_FLUSH_PARTS
+
+    def flush(self) -> None:
+        """Atomically rewrite the journal with the current completed ranges"""
+        self.pending_flush = 0
+        self._write(self._snapshot())
+
+    async def save(self) -> None:
+        """Flush from the event loop without blocking it.
+
+        The ranges are snapshotted on the loop, where parts are marked done, and writes are
+        serialized so concurrent saves never share the tmp file or replace a newer state.
+        """
+        self.pending_flush = 0
+        async with self.lock:
+            await asyncio.to_thread(self._write, self._snapshot())
+
+    def _snapshot(self) -> str:
+        self.data['completed'] = self._parts_to_ranges(self.completed_parts)
+        return json.dumps(self.data)
+
+    def _write(self, data: str) -> None:
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _parts_to_ranges(self, parts: Set[int]) -> List[List[int]]:
+        ranges: List[List[int]] = []
+        for part in sorted(parts):
+            start = part * self.part_size
+            end = min(start + self.part_size, self.size)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = end
+            else:
+                ranges.append([start, end])
+        return ranges
+
+    def _ranges_to_parts(self, ranges: List[List[int]]) -> Set[int]:
+        parts = set()
+        for start, end in ranges:
+            # Only parts fully covered by a recorded range count as done
+            first = (start + self.part_size - 1) // self.part_size
+            part = first
+            while part * self.part_size < end:
+                if min((part + 1) * self.part_size, self.size) <= end:
+                    parts.add(part)
+                part += 1
+        return parts
@@ -1,40 +1,73 @@
 import os
+import time
+from typing import List, Optional
 from telethon import TelegramClient
 from src.domain.entities.video_message import VideoMessage
 from src.domain.repositories.video_repository import VideoRepository
+from src.infrastructure.telegram.parallel_downloader import ParallelDownloader
+from src.infrastructure.filesystem.download_journal import DownloadJournal
+from src.infrastructure.filesystem.storage_manager import VIDEO_EXTENSIONS, StorageManager
+from src.infrastructure.media.contact_sheet import ContactSheetGenerator
+from src.infrastructure.telegram.document_handles import handle_to_document
+from src.infrastructure.metrics.registry import metrics
 from src.config.config import Config
 
 class FilesystemVideoRepository(VideoRepository):
-    def __init__(self, client: TelegramClient):
+    def __init__(self, client: TelegramClient, storage: Optional[StorageManager] = None,
+                 preview_generator: Optional[ContactSheetGenerator] = None):
         self.client = client
+        self.storage = storage or StorageManager()
+        self.preview_generator = preview_generator
+        self.downloader = ParallelDownloader(client)
         self.logger = Config.get_logger('infrastructure.filesystem_video_repository')
 
     async def download_video(self, video_message: VideoMessage, destination_dir: str) -> str:
-        self.logger.debug(f"Starting download of video {video_message.document.id} to directory {destination_dir}")
+        self.logger.debug("Starting download of video %s to directory %s", video_message.document.id, destination_dir)
 
         try:
             # Ensure destination directory exists
             os.makedirs(destination_dir, exist_ok=True)
-            self.logger.debug(f"Ensured destination directory exists: {destination_dir}")
+            self.logger.debug("Ensured destination directory exists: %s", destination_dir)
 
             # Generate filename: use file_name if available, otherwise use document ID
             base_filename = video_message.file_name or f"{video_message.document.id}"
             # Ensure it has .mp4 extension if not present
-            if not base_filename.lower().endswith(('.mp4', '.avi', '.mkv', '.mov', '.webm')):
+            if not base_filename.lower().endswith(VIDEO_EXTENSIONS):
                 base_filename += '.mp4'
 
             file_path = os.path.join(destination_dir, base_filename)
-            self.logger.info(f"Downloading video '{base_filename}' (ID: {video_message.document.id}) to {file_path}")
+            self.logger.info("Downloading video '%s' (ID: %s) to %s",
+                             base_filename, video_message.document.id, file_path)
 
-            # Download the video
-            await self.client.download_media(video_message.document, file_path)
+            # Download into a .part file tracked by a journal so restarts resume missing ranges
+            part_path = DownloadJournal.part_path(file_path)
+            journal = DownloadJournal.load(DownloadJournal.journal_path(file_path))
+            if journal and journal.matches(video_message.document, self.downloader.part_size) and os.path.exists(part_path):
+                self.logger.info("Resuming download of '%s': %s part(s) already on disk",
+                                 base_filename, len(journal.completed_parts))
+            else:
+                journal = DownloadJournal.create(file_path, video_message, self.downloader.part_size)
+
+            # Check and reserve the space still needed, then download over several parallel connections
+            async with self.storage.reserve(file_path, video_message.document.size):
+                resumed_bytes = len(journal.completed_parts) * self.downloader.part_size
+                download_started = time.perf_counter()
+                with metrics.timer('download'):
+                    # Long transfers can outlive the file reference; the original message is fetched again then
+                    await self.downloader.download(video_message.document, part_path, journal,
+                                                   refresh_document=lambda: self._refresh_document(journal))
+                metrics.record_transfer('download', max(0, video_message.document.size - resumed_bytes),
+                                        time.perf_counter() - download_started)
+            # Only complete files ever carry the final name
+            os.replace(part_path, file_path)
+            journal.remove()
 
             # Verify file was created and get size
             if os.path.exists(file_path):
                 file_size = os.path.getsize(file_path)
                 filename_display = video_message.file_name or f"ID_{video_message.document.id}.mp4"
-                self.logger.info(f"Video '{filename_display}' downloaded successfully. "
-                               f"File size: {file_size} bytes, Path: {file_path}")
+                self.logger.info("Video '%s' downloaded successfully. File size: %s bytes, Path: %s",
+                                 filename_display, file_size, file_path)
             else:
                 raise FileNotFoundError(f"Downloaded file not found at {file_path}")
 
@@ -42,5 +75,49 @@ class FilesystemVideoRepository(VideoRepository):
 
         except Exception as e:
             filename_display = video_message.file_name or f"ID_{video_message.document.id}"
-            self.logger.error(f"Failed to download video '{filename_display}' (ID: {video_message.document.id}) to {destination_dir}: {str(e)}", exc_info=True)
-            raise
\ No newline at end of file
+            self.logger.error("Failed to download video '%s' (ID: %s) to %s: %s",
+                              filename_display, video_message.document.id, destination_dir, e, exc_info=True)
+            raise
+
+    async def get_interrupted_downloads(self, destination_dir: str) -> List[VideoMessage]:
+        """Rebuild the video messages of downloads left unfinished in destination_dir"""
+        if not os.path.isdir(destination_dir):
+            return []
+
+        video_messages = []
+        for journal in DownloadJournal.find_all(destination_dir):
+            message_info = journal.data['message']
+            document = await self._refresh_document(journal)
+            video_messages.append(VideoMessage(
+                message_id=message_info['message_id'],
+                chat_id=message_info['chat_id'],
+                video_duration=message_info['video_duration'],
+                video_size=journal.size,
+                document=document,
+                caption=message_info['caption'],
+                file_name=message_info['file_name'],
+                category='long'  # only long videos are downloaded
+            ))
+            self.logger.info("Found interrupted download of document %s (%s part(s) done) at %s",
+                             journal.document_id, len(journal.completed_parts), journal.file_path)
+        return video_messages
+
+    async def create_preview(self, file_path: str) -> Optional[str]:
+        """Contact sheet of a stored video, reused from its cache file when the video is unchanged"""
+        if not self.preview_generator or not os.path.exists(file_path):
+            return None
+        return await self.preview_generator.generate(file_path)
+
+    async def _refresh_document(self, journal: DownloadJournal):
+        """Fetch the original message again for a fresh file reference, falling back to the journal copy"""
+        message_info = journal.data['message']
+        try:
+            message = await self.client.get_messages(message_info['chat_id'], ids=message_info['message_id'])
+            if message and message.document and message.document.id == journal.document_id:
+                return message.document
+            self.logger.warning("Original message %s no longer holds document %s, using journal reference",
+                                message_info['message_id'], journal.document_id)
+        except Exception as e:
+            self.logger.warning("Could not refresh document %s: %s", journal.document_id, e)
+
+        return handle_to_document(journal.data['document'])
@@ -0,0 +1,153 @@
+import asyncio
+import contextlib
+import fnmatch
+import os
+import shutil
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from src.domain.exceptions import InsufficientStorageError
+from src.infrastructure.filesystem.download_journal import DownloadJournal
+from src.infrastructure.media.contact_sheet import PREVIEW_SUFFIX
+from src.infrastructure.metrics.registry import metrics
+from src.config.config import Config
+
+EVICTION_LRU = 'lru'
+EVICTION_AGE = 'age'
+EVICTION_NONE = 'none'
+
+# Extensions of the stored videos (downloads without one are saved as .mp4)
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.webm')
+# Download bookkeeping files are never evicted
+TRANSIENT_SUFFIXES = (DownloadJournal.PART_SUFFIX, DownloadJournal.JOURNAL_SUFFIX, '.tmp')
+
+
+class StorageManager:
+    """Admission control for the disk space used by downloaded videos.
+
+    Before a download starts, checks the bytes still missing against the free space
+    (minus a safety margin) and the optional quota of the videos directory. Space
+    promised to downloads in progress is reserved so concurrent downloads can't
+    overcommit the disk. When space runs short, stored videos are evicted least
+    recently used or oldest first, each together with its preview; videos matching a
+    pinned pattern are never evicted. on_evicted is awaited with the path of every
+    evicted video, so indexes pointing at it can forget it.
+    """
+
+    def __init__(self, quota_bytes: Optional[int] = None, min_free_bytes: Optional[int] = None,
+                 eviction: Optional[str] = None, pinned_patterns: Optional[List[str]] = None,
+                 on_evicted: Optional[Callable[[str], Awaitable]] = None):
+        self.quota_bytes = quota_bytes if quota_bytes is not None else Config.STORAGE_QUOTA_BYTES
+        self.min_free_bytes = min_free_bytes if min_free_bytes is not None else Config.STORAGE_MIN_FREE_BYTES
+        self.eviction = eviction or Config.STORAGE_EVICTION
+        self.pinned_patterns = pinned_patterns if pinned_patterns is not None else Config.STORAGE_PINNED_PATTERNS
+        self.on_evicted = on_evicted
+        self.reservations: Dict[str, int] = {}  # .part path -> expected size
+        self.lock = asyncio.Lock()
+        self.logger = Config.get_logger('infrastructure.storage_manager')
+
+    @asynccontextmanager
+    async def reserve(self, file_path: str, size: int) -> AsyncIterator[None]:
+        """Make room for a download of `size` bytes into `file_path` and hold it until done"""
+        part_path = DownloadJournal.part_path(file_path)
+        async with self.lock:
+            evicted: List[str] = []
+            try:
+                # The thread gets a snapshot: finishing downloads drop their reservation on the loop meanwhile
+                await asyncio.to_thread(self._make_room, os.path.dirname(file_path) or '.', part_path, size,
+                                        dict(self.reservations), evicted)
+            finally:
+                await self._notify_evicted(evicted)
+            self.reservations[part_path] = size
+        try:
+            yield
+        finally:
+            self.reservations.pop(part_path, None)
+
+    async def _notify_evicted(self, paths: List[str]) -> None:
+        if self.on_evicted is None:
+            return
+        for path in paths:
+            try:
+                await self.on_evicted(path)
+            except Exception as e:
+                self.logger.warning("Could not report the eviction of %s: %s", path, e)
+
+    def _make_room(self, directory: str, part_path: str, size: int, reservations: Dict[str, int],
+                   evicted: List[str]) -> None:
+        needed = max(0, size - self._allocated(part_path))
+        outstanding = sum(max(0, expected - self._allocated(path)) for path, expected in reservations.items())
+        shortfall = needed + outstanding + self.min_free_bytes - shutil.disk_usage(directory).free
+        if self.quota_bytes:
+            used = sum(allocated for _, allocated, _ in self._files(directory, include_transient=True))
+            shortfall = max(shortfall, used + outstanding + needed - self.quota_bytes)
+        if shortfall <= 0:
+            return
+
+        self.logger.info("Need %s more bytes in %s for a %s byte download", shortfall, directory, size)
+        candidates = self._eviction_candidates(directory) if self.eviction != EVICTION_NONE else []
+        # Don't evict anything unless it frees enough space for the download
+        if sum(allocated for _, allocated in candidates) >= shortfall:
+            for path, allocated in candidates:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    continue
+                # The preview is only worth keeping next to its video
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(path + PREVIEW_SUFFIX)
+                evicted.append(path)
+                shortfall -= allocated
+                metrics.inc('evicted_bytes_total', allocated)
+                self.logger.info("Evicted %s (%s bytes, policy %s)", path, allocated, self.eviction)
+                if shortfall <= 0:
+                    return
+
+        raise InsufficientStorageError(
+            f"Not enough space in {directory} for {size} bytes ({shortfall} bytes short)"
+        )
+
+    def _eviction_candidates(self, directory: str) -> List[Tuple[str, int]]:
+        """Stored videos in eviction order, each with the bytes it frees along with its preview"""
+        files = [
+            (path, allocated + self._allocated(path + PREVIEW_SUFFIX), stat)
+            for path, allocated, stat in self._files(directory)
+            if path.lower().endswith(VIDEO_EXTENSIONS) and not self._is_pinned(os.path.basename(path))
+        ]
+        if self.eviction == EVICTION_AGE:
+            files.sort(key=lambda item: item[2].st_mtime)
+        else:
+            # Least recently used: last read or written, whichever is later
+            files.sort(key=lambda item: max(item[2].st_atime, item[2].st_mtime))
+        return [(path, allocated) for path, allocated, _ in files]
+
+    def _files(self, directory: str, include_transient: bool = False):
+        """Files in the directory with their allocated size; only complete videos unless include_transient"""
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return []
+        files = []
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            if not include_transient and entry.name.endswith(TRANSIENT_SUFFIXES):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            files.append((entry.path, self._blocks(stat), stat))
+        return files
+
+    def _is_pinned(self, file_name: str) -> bool:
+        return any(fnmatch.fnmatch(file_name, pattern) for pattern in self.pinned_patterns)
+
+    @classmethod
+    def _allocated(cls, path: str) -> int:
+        # Partial downloads are sparse files, so count the blocks actually written
+        try:
+            return cls._blocks(os.stat(path))
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _blocks(stat: os.stat_result) -> int:
+        blocks = getattr(stat, 'st_blocks', None)
+        return blocks * 512 if blocks is not None else stat.st_size
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import math
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+from src.config.config import Config
+from src.infrastructure.media.transcode_scheduler import PRIORITY_BACKGROUND, TranscodeScheduler
+from src.infrastructure.metrics.registry import metrics
+
+# The contact sheet of `video.mp4` is cached as `video.mp4.preview.jpg`
+PREVIEW_SUFFIX = '.preview.jpg'
+TILE_PADDING = 4  # pixels between and around tiles
+
+
+class ContactSheetGenerator:
+    """Builds a single-image preview of a stored video: N evenly spaced frames in a grid.
+
+    Each frame is taken with its own ffmpeg run that seeks the input to the timestamp and
+    decodes only the keyframe found there, so a multi-GB video is never decoded in full.
+    The runs share a background slot of the TranscodeScheduler and at most PREVIEW_WORKERS
+    (capped by the slot's thread budget) run at once. The frames are then tiled into one
+    JPEG saved next to the video, which later requests reuse while the video is unchanged.
+    Concurrent requests for the same video wait for the first one and reuse its sheet.
+    """
+
+    def __init__(self, scheduler: Optional[TranscodeScheduler] = None, frames: Optional[int] = None,
+                 columns: Optional[int] = None, tile_width: Optional[int] = None, workers: Optional[int] = None):
+        self.scheduler = scheduler
+        self.frames = frames or Config.PREVIEW_FRAMES
+        self.columns = columns or Config.PREVIEW_COLUMNS
+        self.tile_width = tile_width or Config.PREVIEW_TILE_WIDTH
+        self.workers = workers or Config.PREVIEW_WORKERS
+        self.locks: Dict[str, list] = {}  # video path -> [lock, holders and waiters]
+        self.logger = Config.get_logger('infrastructure.contact_sheet')
+
+    @staticmethod
+    def preview_path(video_path: str) -> str:
+        return video_path + PREVIEW_SUFFIX
+
+    def get_cached(self, video_path: str) -> Optional[str]:
+        """The cached contact sheet of video_path, if it is at least as recent as the video"""
+        preview_path = self.preview_path(video_path)
+        try:
+            if os.path.getmtime(preview_path) >= os.path.getmtime(video_path):
+                return preview_path
+        except OSError:
+            pass
+        return None
+
+    async def generate(self, video_path: str) -> Optional[str]:
+        """Path of the contact sheet of video_path, built unless cached (None if no frame could be read)"""
+        async with self._single_flight(video_path):
+            cached = self.get_cached(video_path)
+            if cached:
+                self.logger.debug("Reusing cached contact sheet %s", cached)
+                return cached
+            return await self._build(video_path)
+
+    @asynccontextmanager
+    async def _single_flight(self, video_path: str) -> AsyncIterator[None]:
+        """One build per video at a time, so two builds never share the same .tmp output"""
+        flight = self.locks.setdefault(video_path, [asyncio.Lock(), 0])
+        flight[1] += 1
+        try:
+            async with flight[0]:
+                yield
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0:
+                del self.locks[video_path]
+
+    async def _build(self, video_path: str) -> Optional[str]:
+        duration = await self._probe_duration(video_path)
+        if duration <= 0:
+            self.logger.warning("Could not read the duration of %s, no contact sheet", video_path)
+            return None
+        # Centre of each of N equal slices, so the first and last frames aren't black leaders
+        timestamps = [duration * (index + 0.5) / self.frames for index in range(self.frames)]
+
+        preview_path = self.preview_path(video_path)
+        with tempfile.TemporaryDirectory(prefix='preview_') as frames_dir, metrics.timer('preview'):
+            async with self._slot(video_path) as threads:
+                semaphore = asyncio.Semaphore(max(1, min(self.workers, threads or self.workers)))
+
+                async def extract(index: int, timestamp: float) -> Optional[str]:
+                    async with semaphore:
+                        return await self._extract_frame(video_path, timestamp,
+                                                         os.path.join(frames_dir, f"frame_{index:03d}.jpg"))
+
+                frames = [frame for frame in await asyncio.gather(*(extract(index, timestamp)
+                                                                   for index, timestamp in enumerate(timestamps)))
+                          if frame]
+                if not frames:
+                    self.logger.warning("No frame of %s could be decoded, no contact sheet", video_path)
+                    return None
+                await self._tile(frames, frames_dir, preview_path)
+
+        self.logger.info("Contact sheet of %s built from %s/%s frames: %s",
+                         video_path, len(frames), len(timestamps), preview_path)
+        return preview_path
+
+    async def _probe_duration(self, video_path: str) -> float:
+        output = await self._run([
+            "ffprobe", "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "json", video_path
+        ])
+        return float(json.loads(output or b'{}').get('format', {}).get('duration') or 0)
+
+    async def _extract_frame(self, video_path: str, timestamp: float, output_path: str) -> Optional[str]:
+        # Input seeking lands on the keyframe before the timestamp; only keyframes are decoded
+        try:
+            await self._run([
+                "ffmpeg", "-v", "error",
+                "-noaccurate_seek", "-skip_frame", "nokey",
+                "-ss", f"{timestamp:.3f}", "-i", video_path,
+                "-an", "-sn",
+                "-frames:v", "1",
+                "-vf", f"scale={self.tile_width}:-2",
+                "-q:v", "3",
+                "-threads", "1",
+                "-update", "1", output_path, "-y"
+            ])
+        except Exception as e:
+            self.logger.debug("No frame of %s at %.1fs: %s", video_path, timestamp, e)
+            return None
+        return output_path if os.path.exists(output_path) and os.path.getsize(output_path) else None
+
+    async def _tile(self, frames: List[str], frames_dir: str, preview_path: str) -> None:
+        # The image2 demuxer needs a gapless sequence, so frames that failed are skipped over
+        for position, frame in enumerate(frames):
+            os.replace(frame, os.path.join(frames_dir, f"tile_{position:03d}.jpg"))
+        columns = min(self.columns, len(frames))
+        rows = math.ceil(len(frames) / columns)
+        tmp_path = preview_path + '.tmp'
+        try:
+            await self._run([
+                "ffmpeg", "-v", "error",
+                "-framerate", "1", "-i", os.path.join(frames_dir, "tile_%03d.jpg"),
+                "-vf", f"tile={columns}x{rows}:padding={TILE_PADDING}:margin={TILE_PADDING}",
+                "-frames:v", "1",
+                "-q:v", "3",
+                "-f", "image2", "-c:v", "mjpeg", "-update", "1", tmp_path, "-y"
+            ])
+            os.replace(tmp_path, preview_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _slot(self, video_path: str):
+        if self.scheduler is None:
+            return _NoSlot()
+        return self.scheduler.slot(PRIORITY_BACKGROUND, f"preview-{os.path.basename(video_path)}")
+
+    async def _run(self, cmd: List[str]) -> bytes:
+        """Run a command and return its stdout; the process is killed if the caller is cancelled"""
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await process.communicate()
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        if process.returncode != 0:
+            error_msg = stderr.decode(errors='ignore') if stderr else f"Unknown {cmd[0]} error"
+            raise Exception(f"{cmd[0]} failed with return code {process.returncode}: {error_msg}")
+        return stdout
+
+
+class _NoSlot:
+    """Stand-in for a scheduler slot when no TranscodeScheduler is given (0 = no thread budget)"""
+
+    async def __aenter__(self) -> int:
+        return 0
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
@@ -0,0 +1,206 @@
+import bisect
+import struct
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterator, List, Optional, Tuple
+
+# Boxes that only contain other boxes on the path to the sample tables
+CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+ByteRange = Tuple[int, int]  # [start, end)
+RangeReader = Callable[[int, int], Awaitable[bytes]]
+
+
+@dataclass
+class Mp4Track:
+    handler: bytes = b''  # b'vide', b'soun', ...
+    timescale: int = 1
+    sample_sizes: List[int] = field(default_factory=list)
+    chunk_offsets: List[int] = field(default_factory=list)
+    sample_to_chunk: List[Tuple[int, int]] = field(default_factory=list)  # (first_chunk, samples_per_chunk)
+    time_to_sample: List[Tuple[int, int]] = field(default_factory=list)  # (sample_count, sample_delta)
+    sync_samples: Optional[List[int]] = None  # 0-based indexes; None means every sample is a keyframe
+
+    def sample_times(self) -> List[int]:
+        """Decode timestamp of every sample, in track timescale units"""
+        times = []
+        current = 0
+        for count, delta in self.time_to_sample:
+            for _ in range(count):
+                times.append(current)
+                current += delta
+        return times
+
+    def sample_offsets(self) -> List[int]:
+        """Absolute file offset of every sample"""
+        offsets = []
+        sample = 0
+        total_samples = len(self.sample_sizes)
+        for entry_index, (first_chunk, samples_per_chunk) in enumerate(self.sample_to_chunk):
+            if entry_index + 1 < len(self.sample_to_chunk):
+                last_chunk = self.sample_to_chunk[entry_index + 1][0] - 1
+            else:
+                last_chunk = len(self.chunk_offsets)
+            for chunk in range(first_chunk, last_chunk + 1):
+                position = self.chunk_offsets[chunk - 1]
+                for _ in range(samples_per_chunk):
+                    if sample >= total_samples:
+                        return offsets
+                    offsets.append(position)
+                    position += self.sample_sizes[sample]
+                    sample += 1
+        return offsets
+
+    def byte_ranges(self, start_seconds: float, end_seconds: float) -> Tuple[List[ByteRange], float]:
+        """Byte ranges holding the samples needed to decode [start_seconds, end_seconds].
+
+        The window is extended back to the previous keyframe. Also returns the actual
+        start time of the first included sample.
+        """
+        times = self.sample_times()
+        if not times:
+            return [], start_seconds
+        offsets = self.sample_offsets()
+        sample_count = min(len(times), len(offsets), len(self.sample_sizes))
+
+        first = max(0, bisect.bisect_right(times, int(start_seconds * self.timescale)) - 1)
+        if self.sync_samples:
+            sync_index = bisect.bisect_right(self.sync_samples, first) - 1
+            first = self.sync_samples[sync_index] if sync_index >= 0 else 0
+        last = min(sample_count - 1, bisect.bisect_right(times, int(end_seconds * self.timescale)))
+
+        ranges = [(offsets[i], offsets[i] + self.sample_sizes[i]) for i in range(first, last + 1)]
+        return ranges, times[first] / self.timescale
+
+
+def iter_boxes(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload_start, payload_end) for the boxes found in data[start:end]"""
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', data, offset)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            raise ValueError(f"Invalid box size {size} for '{box_type!r}' at offset {offset}")
+        yield box_type, offset + header_size, min(offset + size, end)
+        offset += size
+
+
+def parse_moov(moov: bytes) -> List[Mp4Track]:
+    """Parse the sample tables of every track in a moov box payload"""
+    tracks = []
+    for box_type, start, end in iter_boxes(moov):
+        if box_type == b'trak':
+            track = Mp4Track()
+            _parse_container(moov, start, end, track)
+            if track.sample_sizes and track.chunk_offsets:
+                tracks.append(track)
+    return tracks
+
+
+def _parse_container(data: bytes, start: int, end: int, track: Mp4Track) -> None:
+    for box_type, payload_start, payload_end in iter_boxes(data, start, end):
+        if box_type in CONTAINER_BOXES:
+            _parse_container(data, payload_start, payload_end, track)
+        elif box_type == b'mdhd':
+            version = data[payload_start]
+            timescale_offset = payload_start + (20 if version == 1 else 12)
+            track.timescale = struct.unpack_from('>I', data, timescale_offset)[0] or 1
+        elif box_type == b'hdlr':
+            track.handler = data[payload_start + 8:payload_start + 12]
+        elif box_type == b'stts':
+            track.time_to_sample = list(_read_entries(data, payload_start, '>II'))
+        elif box_type == b'stsc':
+            track.sample_to_chunk = [(first, per_chunk) for first, per_chunk, _ in _read_entries(data, payload_start, '>III')]
+        elif box_type == b'stsz':
+            sample_size, count = struct.unpack_from('>II', data, payload_start + 4)
+            if sample_size:
+                track.sample_sizes = [sample_size] * count
+            else:
+                track.sample_sizes = list(struct.unpack_from(f'>{count}I', data, payload_start + 12))
+        elif box_type == b'stco':
+            track.chunk_offsets = [entry[0] for entry in _read_entries(data, payload_start, '>I')]
+        elif box_type == b'co64':
+            track.chunk_offsets = [entry[0] for entry in _read_entries(data, payload_start, '>Q')]
+        elif box_type == b'stss':
+            track.sync_samples = [entry[0] - 1 for entry in _read_entries(data, payload_start, '>I')]
+
+
+def _read_entries(data: bytes, payload_start: int, entry_format: str) -> Iterator[tuple]:
+    # Full box: version/flags (4 bytes) followed by the entry count
+    count = struct.unpack_from('>I', data, payload_start + 4)[0]
+    entry_size = struct.calcsize(entry_format)
+    offset = payload_start + 8
+    for _ in range(count):
+        yield struct.unpack_from(entry_format, data, offset)
+        offset += entry_size
+
+
+async def scan_top_level_boxes(read: RangeReader, file_size: int, stop_at: bytes) -> List[Tuple[bytes, int, int]]:
+    """Walk the top-level boxes with small header reads until `stop_at` is found.
+
+    Returns (type, offset, size) for every box visited. Works whether the moov sits
+    before the media data (faststart) or at the end of the file.
+    """
+    boxes = []
+    offset = 0
+    while offset + 8 <= file_size:
+        header = await read(offset, 16)
+        size, box_type = struct.unpack_from('>I4s', header, 0)
+        if size == 1:
+            size = struct.unpack_from('>Q', header, 8)[0]
+        elif size == 0:
+            size = file_size - offset
+        if size < 8:
+            raise ValueError(f"Invalid top-level box size {size} at offset {offset}")
+        boxes.append((box_type, offset, size))
+        if box_type == stop_at:
+            return boxes
+        offset += size
+    raise ValueError(f"Box '{stop_at.decode()}' not found")
+
+
+def merge_ranges(ranges: List[ByteRange], max_gap: int = 0) -> List[ByteRange]:
+    """Sort and merge ranges, joining those separated by at most max_gap bytes"""
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + max_gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+async def plan_window_ranges(read: RangeReader, file_size: int, start_seconds: float,
+                             end_seconds: float, max_gap: int = 0) -> List[ByteRange]:
+    """Byte ranges needed to rebuild a playable clip of [start_seconds, end_seconds]:
+    the top-level box headers, ftyp, the moov index and the samples of every track in the window."""
+    boxes = await scan_top_level_boxes(read, file_size, b'moov')
+    _, moov_offset, moov_size = boxes[-1]
+    moov_box = await read(moov_offset, moov_size)
+    _, payload_start, payload_end = next(iter_boxes(moov_box))
+    tracks = parse_moov(moov_box[payload_start:payload_end])
+    if not tracks:
+        raise ValueError("No tracks with sample tables found in moov")
+
+    # The demuxer walks every top-level header and reads ftyp and moov whole
+    ranges: List[ByteRange] = []
+    for box_type, offset, size in boxes:
+        whole_box = box_type in (b'ftyp', b'moov')
+        ranges.append((offset, offset + (size if whole_box else min(size, 16))))
+
+    # Video decides where decoding has to start (previous keyframe); other tracks follow it
+    window_start = start_seconds
+    for track in tracks:
+        if track.handler == b'vide':
+            _, track_start = track.byte_ranges(start_seconds, end_seconds)
+            window_start = min(window_start, track_start)
+
+    for track in tracks:
+        track_ranges, _ = track.byte_ranges(window_start, end_seconds)
+        ranges.extend(track_ranges)
+    return merge_ranges(ranges, max_gap)
@@ -0,0 +1,24 @@
+from typing import List
+import numpy as np
+
+# dHash compares each pixel with its right neighbour on a 9x8 grayscale frame: 64 bits
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+FRAME_BYTES = HASH_WIDTH * HASH_HEIGHT
+# Frames flatter than this (std of gray levels) are fades or black screens; their hash
+# would match every other video starting the same way
+MIN_FRAME_STD = 3.0
+
+
+def dhash_frames(raw: bytes) -> List[int]:
+    """64-bit difference hashes of consecutive 9x8 gray frames (ffmpeg rawvideo, gray)"""
+    count = len(raw) // FRAME_BYTES
+    if not count:
+        return []
+    frames = np.frombuffer(raw, dtype=np.uint8, count=count * FRAME_BYTES).reshape(count, HASH_HEIGHT, HASH_WIDTH)
+    frames = frames[frames.reshape(count, -1).std(axis=1) >= MIN_FRAME_STD]
+    if not len(frames):
+        return []
+    bits = frames[:, :, 1:] > frames[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(frames), 64), axis=1)
+    return [int(value) for value in packed.view('>u8').ravel()]
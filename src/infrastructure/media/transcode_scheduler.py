@@ -0,0 +1,80 @@
+import asyncio
+import heapq
+import itertools
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+from src.config.config import Config
+
+# Lower values run first; jobs with the same priority run in FIFO order
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class TranscodeScheduler:
+    """Admission control shared by every ffmpeg process the bot starts.
+
+    Caps the number of concurrent processes based on the core count and gives each job
+    a fixed thread budget, so several trims don't all try to use every core at once.
+    Excess jobs wait in priority order.
+    """
+
+    def __init__(self, max_processes: Optional[int] = None, threads_per_job: Optional[int] = None):
+        cpu_count = os.cpu_count() or 1
+        self.max_processes = max(1, max_processes or Config.FFMPEG_MAX_PROCESSES or cpu_count // 2)
+        self.threads_per_job = max(1, threads_per_job or Config.FFMPEG_THREADS_PER_JOB
+                                   or cpu_count // self.max_processes)
+        self.running = 0
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.sequence = itertools.count()
+        self.logger = Config.get_logger('infrastructure.transcode_scheduler')
+        self.logger.info("Transcode scheduler: %s concurrent process(es), %s thread(s) per job (%s CPU cores)",
+                         self.max_processes, self.threads_per_job, cpu_count)
+
+    def queue_position(self) -> int:
+        """Position a job submitted now would take in the queue (0 means it starts right away)"""
+        if self.running < self.max_processes and not self.waiters:
+            return 0
+        return len(self.waiters) + 1
+
+    def queue_depth(self) -> int:
+        return len(self.waiters)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE, label: str = '') -> AsyncIterator[int]:
+        """Wait for a free process slot and yield the thread budget for the job"""
+        await self._acquire(priority, label)
+        try:
+            yield self.threads_per_job
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int, label: str) -> None:
+        if self.running < self.max_processes and not self.waiters:
+            self.running += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self.sequence), future)
+        heapq.heappush(self.waiters, entry)
+        self.logger.info("Transcode job %s queued at position %s (%s running)",
+                         label or '(unnamed)', len(self.waiters), self.running)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over right before cancellation; pass it on
+                self._release()
+            elif entry in self.waiters:
+                self.waiters.remove(entry)
+                heapq.heapify(self.waiters)
+            raise
+
+    def _release(self) -> None:
+        # Hand the slot directly to the next waiter so it can't be taken out of order
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from telethon.tl.types import InputDocument
+from src.config.config import Config
+
+
+class TrimCache:
+    """On-disk cache of trimmed clips keyed by (document id, start, duration, encoder settings).
+
+    Stores the clip file (evicted LRU once the size cap is exceeded) and, once the clip
+    has been sent, the Telegram document it became, so repeats don't even re-upload.
+    Entries themselves are capped in number too, so sent clips don't grow the index forever.
+    Concurrent requests for the same key are single-flighted: the second one waits for
+    the first to finish and then reuses its result.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None,
+                 max_entries: Optional[int] = None):
+        self.cache_dir = cache_dir or Config.TRIM_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.TRIM_CACHE_MAX_BYTES
+        self.max_entries = max_entries if max_entries is not None else Config.TRIM_CACHE_MAX_ENTRIES
+        self.index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        self.locks: Dict[str, list] = {}  # key -> [lock, holders and waiters]
+        self.index_lock = asyncio.Lock()
+        self.logger = Config.get_logger('infrastructure.trim_cache')
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.entries: Dict[str, dict] = self._load_index()
+
+    @staticmethod
+    def make_key(document_id: int, start_time: float, duration: float, settings: str) -> str:
+        return hashlib.sha1(f"{document_id}:{start_time}:{duration}:{settings}".encode()).hexdigest()
+
+    @asynccontextmanager
+    async def single_flight(self, key: str) -> AsyncIterator[None]:
+        """Only one holder per key at a time; later callers wait and then see its result"""
+        flight = self.locks.setdefault(key, [asyncio.Lock(), 0])
+        flight[1] += 1
+        try:
+            async with flight[0]:
+                yield
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0:
+                del self.locks[key]
+
+    def get_file(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if not entry or not entry.get('file'):
+            return None
+        path = os.path.join(self.cache_dir, entry['file'])
+        if not os.path.exists(path):
+            entry['file'] = None
+            entry['size'] = 0
+            return None
+        self._touch(entry)
+        return path
+
+    def get_media(self, key: str) -> Optional[InputDocument]:
+        entry = self.entries.get(key)
+        media = entry.get('media') if entry else None
+        if not media:
+            return None
+        self._touch(entry)
+        return InputDocument(media['id'], media['access_hash'], bytes.fromhex(media['file_reference']))
+
+    async def put_file(self, key: str, source_path: str) -> str:
+        """Move a finished clip (MP4, GIF or still frame) into the cache and return its cached path"""
+        file_name = f"{key}{os.path.splitext(source_path)[1] or '.mp4'}"
+        path = os.path.join(self.cache_dir, file_name)
+        await asyncio.to_thread(shutil.move, source_path, path)
+        entry = self.entries.setdefault(key, {})
+        entry.update(file=file_name, size=os.path.getsize(path))
+        self._touch(entry)
+        await self._evict()
+        await self._save_index()
+        return path
+
+    async def put_media(self, key: str, document) -> None:
+        """Remember the Telegram document a clip became once it was sent"""
+        entry = self.entries.setdefault(key, {'file': None, 'size': 0})
+        entry['media'] = {
+            'id': document.id,
+            'access_hash': document.access_hash,
+            'file_reference': (document.file_reference or b'').hex(),
+        }
+        self._touch(entry)
+        await self._evict()
+        await self._save_index()
+
+    async def forget_media(self, key: str) -> None:
+        """Drop a stored document whose file reference no longer works"""
+        entry = self.entries.get(key)
+        if entry and entry.pop('media', None):
+            await self._save_index()
+
+    @staticmethod
+    def _touch(entry: dict) -> None:
+        entry['last_access'] = time.time()
+
+    async def _evict(self) -> None:
+        """Drop least recently used clip files over the size cap and whole entries over the count cap"""
+        total = sum(entry.get('size', 0) for entry in self.entries.values())
+        excess_entries = len(self.entries) - self.max_entries
+        if total <= self.max_bytes and excess_entries <= 0:
+            return
+        for key, entry in sorted(self.entries.items(), key=lambda item: item[1].get('last_access', 0)):
+            over_size = total > self.max_bytes
+            if not over_size and excess_entries <= 0:
+                break
+            file_name = entry.get('file')
+            if key in self.locks or not (excess_entries > 0 or file_name):
+                continue
+            # Claim the entry before awaiting so a concurrent eviction doesn't pick it too
+            size = entry.get('size', 0)
+            entry['file'] = None
+            entry['size'] = 0
+            if excess_entries > 0 or not entry.get('media'):
+                if self.entries.pop(key, None) is not None:
+                    excess_entries -= 1
+            total -= size
+            if file_name:
+                try:
+                    await asyncio.to_thread(os.unlink, os.path.join(self.cache_dir, file_name))
+                except FileNotFoundError:
+                    pass
+                self.logger.debug("Evicted cached clip %s (%s bytes)", file_name, size)
+
+    def _load_index(self) -> Dict[str, dict]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.logger.warning("Ignoring unreadable trim cache index %s: %s", self.index_path, e)
+            return {}
+
+    async def _save_index(self) -> None:
+        def write(data: str) -> None:
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.index_path)
+
+        # Serialize writes and snapshot inside the lock so an older index never replaces a newer one
+        async with self.index_lock:
+            await asyncio.to_thread(write, json.dumps(self.entries))
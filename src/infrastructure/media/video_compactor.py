@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import shutil
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+from src.config.config import Config
+from src.infrastructure.media.mp4_index import scan_top_level_boxes
+from src.infrastructure.media.transcode_scheduler import PRIORITY_BACKGROUND, TranscodeScheduler
+from src.infrastructure.metrics.registry import metrics
+
+COMPACT_MODES = ('off', 'faststart', 'transcode')
+# Only the MP4 family is rewritten, so the stored file keeps its name and container
+MP4_EXTENSIONS = ('.mp4', '.m4v', '.mov')
+# Codec ffprobe reports for the output of each encoder
+ENCODER_CODECS = {'libx265': 'hevc', 'libx264': 'h264', 'libsvtav1': 'av1', 'libaom-av1': 'av1', 'libvpx-vp9': 'vp9'}
+TMP_SUFFIX = '.compact.tmp'
+# Allowed difference between the durations of the original and the rewritten file
+DURATION_TOLERANCE = 1.0
+
+
+class VideoCompactor:
+    """Rewrites a stored video to take less space and play sooner.
+
+    'faststart' only remuxes MP4s whose index sits after the media data, moving it to the
+    front without touching the streams. 'transcode' also re-encodes the video stream with
+    a more efficient codec at the configured CRF, copying the audio. ffmpeg runs at the
+    lowest OS priority, in a background slot of the TranscodeScheduler and within its
+    thread budget, so interactive trims go first. The output is
+    written next to the original, checked (duration, decodable end, enough savings) and
+    only then moved over it, so the stored file is never left half written.
+    """
+
+    def __init__(self, scheduler: Optional[TranscodeScheduler] = None, mode: Optional[str] = None,
+                 encoder: Optional[str] = None, crf: Optional[int] = None, preset: Optional[str] = None,
+                 threads: Optional[int] = None, min_savings: Optional[float] = None):
+        self.scheduler = scheduler
+        self.mode = (mode or Config.COMPACT_MODE).lower()
+        self.encoder = encoder or Config.COMPACT_ENCODER
+        self.crf = crf if crf is not None else Config.COMPACT_CRF
+        self.preset = preset or Config.COMPACT_PRESET
+        self.threads = threads or Config.COMPACT_THREADS
+        self.min_savings = min_savings if min_savings is not None else Config.COMPACT_MIN_SAVINGS
+        if self.mode not in COMPACT_MODES:
+            raise ValueError(f"Invalid compact mode '{self.mode}', expected one of {COMPACT_MODES}")
+        self.logger = Config.get_logger('infrastructure.video_compactor')
+
+    async def compact(self, file_path: str) -> Optional[int]:
+        """Rewrite file_path if it is worth it; returns the bytes saved (0 when left as is),
+        or None when it couldn't be tried now and should be retried later"""
+        if self.mode == 'off' or not file_path.lower().endswith(MP4_EXTENSIONS):
+            return 0
+        original = os.stat(file_path)
+        video_codec, duration = await self.probe(file_path)
+        transcode = (self.mode == 'transcode' and video_codec is not None
+                     and video_codec != ENCODER_CODECS.get(self.encoder, self.encoder))
+        if not transcode and await self._is_faststart(file_path, original.st_size):
+            self.logger.debug("Nothing to compact in %s (%s, faststart)", file_path, video_codec)
+            return 0
+        if shutil.disk_usage(os.path.dirname(file_path) or '.').free - original.st_size < Config.STORAGE_MIN_FREE_BYTES:
+            self.logger.info("Not enough free space to compact %s right now", file_path)
+            return None
+
+        tmp_path = file_path + TMP_SUFFIX
+        try:
+            async with self._slot(file_path) as threads:
+                command = (self._transcode_command(file_path, tmp_path, threads) if transcode
+                           else self._remux_command(file_path, tmp_path))
+                self.logger.info("%s %s (%s bytes, %s)", 'Transcoding' if transcode else 'Remuxing',
+                                 file_path, original.st_size, video_codec)
+                with metrics.timer('compact'):
+                    await self._run(command, niced=True)
+                    await self._verify(tmp_path, duration)
+
+            saved = original.st_size - os.path.getsize(tmp_path)
+            if transcode and saved < original.st_size * self.min_savings:
+                self.logger.info("Transcoding %s would only save %s bytes, keeping the original", file_path, saved)
+                return 0
+            current = os.stat(file_path)
+            if (current.st_size, current.st_mtime_ns) != (original.st_size, original.st_mtime_ns):
+                self.logger.info("%s changed while it was compacted, keeping it", file_path)
+                return None
+            # Keep the timestamps storage eviction orders by
+            os.utime(tmp_path, ns=(original.st_atime_ns, original.st_mtime_ns))
+            os.replace(tmp_path, file_path)
+            self.logger.info("Compacted %s: %s -> %s bytes", file_path, original.st_size, original.st_size - saved)
+            return max(0, saved)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def probe(self, file_path: str) -> Tuple[Optional[str], float]:
+        """Codec of the first video stream and container duration in seconds"""
+        output = await self._run([
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=codec_name:format=duration",
+            "-of", "json", file_path
+        ])
+        info = json.loads(output or b'{}')
+        streams = info.get('streams') or [{}]
+        return streams[0].get('codec_name'), float(info.get('format', {}).get('duration') or 0)
+
+    @asynccontextmanager
+    async def _slot(self, file_path: str) -> AsyncIterator[int]:
+        """Background slot of the scheduler; yields the thread budget, COMPACT_THREADS if set"""
+        if self.scheduler is None:
+            yield self.threads or 1
+            return
+        async with self.scheduler.slot(PRIORITY_BACKGROUND, f"compact-{os.path.basename(file_path)}") as threads:
+            yield min(self.threads, threads) if self.threads else threads
+
+    async def _is_faststart(self, file_path: str, file_size: int) -> bool:
+        def read(offset: int, length: int) -> bytes:
+            with open(file_path, 'rb') as f:
+                f.seek(offset)
+                return f.read(length)
+
+        try:
+            boxes = await scan_top_level_boxes(lambda offset, length: asyncio.to_thread(read, offset, length),
+                                               file_size, b'moov')
+        except Exception as e:
+            self.logger.debug("Could not inspect layout of %s: %s", file_path, e)
+            return True
+        return all(box_type != b'mdat' for box_type, _, _ in boxes)
+
+    async def _verify(self, output_path: str, expected_duration: float) -> None:
+        """Raise unless the output has a video stream of the right length that decodes to the end"""
+        video_codec, duration = await self.probe(output_path)
+        if video_codec is None:
+            raise ValueError(f"{output_path} has no video stream")
+        if abs(duration - expected_duration) > max(DURATION_TOLERANCE, expected_duration * 0.01):
+            raise ValueError(f"{output_path} lasts {duration}s instead of {expected_duration}s")
+        await self._run(["ffmpeg", "-v", "error", "-sseof", "-3", "-i", output_path, "-f", "null", "-"], niced=True)
+
+    def _transcode_command(self, input_path: str, output_path: str, threads: int) -> List[str]:
+        codec_args = ["-c:v", self.encoder, "-crf", str(self.crf), "-preset", self.preset]
+        if self.encoder == 'libx265':
+            # hvc1 lets Apple players open the file; pools caps x265's own thread pool
+            codec_args += ["-tag:v", "hvc1", "-x265-params", f"log-level=error:pools={threads}"]
+        return [
+            "ffmpeg", "-v", "error", "-i", input_path,
+            "-map", "0:v:0", "-map", "0:a?",
+            *codec_args,
+            "-c:a", "copy",
+            "-movflags", "+faststart",
+            "-threads", str(threads),
+            "-f", "mp4", output_path, "-y"
+        ]
+
+    @staticmethod
+    def _remux_command(input_path: str, output_path: str) -> List[str]:
+        return [
+            "ffmpeg", "-v", "error", "-i", input_path,
+            "-map", "0:v", "-map", "0:a?",
+            "-c", "copy",
+            "-movflags", "+faststart",
+            "-f", "mp4", output_path, "-y"
+        ]
+
+    async def _run(self, cmd: List[str], niced: bool = False) -> bytes:
+        """Run a command and return its stdout; the process is killed if the caller is cancelled"""
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            preexec_fn=(lambda: os.nice(19)) if niced and hasattr(os, 'nice') else None
+        )
+        try:
+            stdout, stderr = await process.communicate()
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        if process.returncode != 0:
+            error_msg = stderr.decode(errors='ignore') if stderr else f"Unknown {cmd[0]} error"
+            raise Exception(f"{cmd[0]} failed with return code {process.returncode}: {error_msg}")
+        return stdout
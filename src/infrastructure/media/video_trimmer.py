@@ -0,0 +1,261 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+from src.config.config import Config
+from src.domain.entities.clip_spec import CLIP_GIF, CLIP_THUMBNAIL, CLIP_VIDEO, ClipSpec
+from src.infrastructure.media.transcode_scheduler import PRIORITY_INTERACTIVE, TranscodeScheduler
+from src.infrastructure.metrics.registry import metrics
+
+# Codecs that can be stream-copied into an MP4 container
+COPYABLE_VIDEO_CODECS = {'h264', 'hevc', 'av1', 'vp9', 'mpeg4'}
+COPYABLE_AUDIO_CODECS = {'aac', 'mp3', 'opus', 'ac3', 'eac3', 'alac', 'flac'}
+
+TRIM_MODES = ('copy', 'reencode')
+
+# Animated GIF outputs: frame rate and width (height keeps the aspect ratio)
+GIF_FPS = 10
+GIF_WIDTH = 320
+
+
+class VideoTrimmer:
+    """Cuts clips out of local video files with ffmpeg.
+
+    In 'copy' mode the cut starts on the keyframe nearest to the requested start and the
+    streams are copied without decoding. Videos whose codecs can't be stream-copied into
+    MP4, or the 'reencode' mode, use a fast libx264/aac encode instead.
+    When a TranscodeScheduler is given, every ffmpeg run waits for a slot from it.
+    """
+
+    def __init__(self, mode: Optional[str] = None, scheduler: Optional[TranscodeScheduler] = None):
+        self.mode = (mode or Config.TRIM_MODE).lower()
+        self.scheduler = scheduler
+        if self.mode not in TRIM_MODES:
+            raise ValueError(f"Invalid trim mode '{self.mode}', expected one of {TRIM_MODES}")
+        self.logger = Config.get_logger('infrastructure.video_trimmer')
+
+    def settings_signature(self) -> str:
+        """Identifies the encoder settings, so cached clips are only reused for the same output"""
+        return f"{self.mode}:{self.clip_settings_signature(CLIP_VIDEO)}"
+
+    @staticmethod
+    def clip_settings_signature(kind: str) -> str:
+        """Encoder settings of the outputs rendered by render_clips"""
+        if kind == CLIP_GIF:
+            return f"gif-{GIF_FPS}fps-{GIF_WIDTH}w-palette"
+        if kind == CLIP_THUMBNAIL:
+            return "jpeg-q3"
+        return "libx264-ultrafast-crf28:aac-96k"
+
+    async def render_clips(self, input_path: str, clips: List[Tuple[ClipSpec, float, str]],
+                           priority: int = PRIORITY_INTERACTIVE) -> None:
+        """Write several outputs, given as (spec, start time, output path), from one decode of input_path.
+
+        The decoded frames are split between the outputs inside a single filter graph, so
+        each extra clip, GIF or still frame only adds its own encode, not another decode.
+        """
+        _, audio_codec = await self.probe_codecs(input_path)
+        async with self.transcode_slot(priority, input_path) as threads:
+            await self.run_ffmpeg(self._clips_command(input_path, clips, audio_codec is not None, threads))
+
+    async def trim(self, input_path: str, output_path: str, start_time: float, duration: float,
+                   priority: int = PRIORITY_INTERACTIVE) -> None:
+        """Write a clip of `duration` seconds starting around `start_time` to output_path"""
+        async with self.transcode_slot(priority, input_path) as threads:
+            if self.mode == 'copy':
+                try:
+                    if await self._trim_copy(input_path, output_path, start_time, duration):
+                        return
+                except Exception as e:
+                    # Containers ffmpeg can't remux end up here too
+                    self.logger.warning("Stream-copy trim failed, falling back to re-encoding: %s", e)
+
+            await self.run_ffmpeg(self._reencode_command(input_path, output_path, start_time, duration, threads))
+
+    @asynccontextmanager
+    async def transcode_slot(self, priority: int = PRIORITY_INTERACTIVE, label: str = '') -> AsyncIterator[int]:
+        """Yield the ffmpeg thread budget once the scheduler admits the job (0 = all cores)"""
+        if self.scheduler is None:
+            yield 0
+            return
+        async with self.scheduler.slot(priority, label) as threads:
+            yield threads
+
+    async def _trim_copy(self, input_path: str, output_path: str, start_time: float, duration: float) -> bool:
+        video_codec, audio_codec = await self.probe_codecs(input_path)
+        if video_codec not in COPYABLE_VIDEO_CODECS:
+            self.logger.info("Video codec '%s' can't be stream-copied, falling back to re-encoding", video_codec)
+            return False
+
+        keyframe = await self.find_nearest_keyframe(input_path, start_time)
+        copy_start = keyframe if keyframe is not None else start_time
+        self.logger.debug("Stream-copy trim from keyframe %ss (requested %ss), codecs: %s/%s",
+                          copy_start, start_time, video_codec, audio_codec)
+        await self.run_ffmpeg(self._copy_command(input_path, output_path, copy_start, duration, audio_codec))
+        return True
+
+    async def probe_codecs(self, input_path: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return the codec names of the first video and audio streams"""
+        output = await self.run_process([
+            "ffprobe", "-v", "error",
+            "-show_entries", "stream=codec_type,codec_name",
+            "-of", "json", input_path
+        ])
+        streams = json.loads(output or b'{}').get('streams', [])
+        video_codec = next((s.get('codec_name') for s in streams if s.get('codec_type') == 'video'), None)
+        audio_codec = next((s.get('codec_name') for s in streams if s.get('codec_type') == 'audio'), None)
+        return video_codec, audio_codec
+
+    async def find_nearest_keyframe(self, input_path: str, target: float) -> Optional[float]:
+        """Find the video keyframe closest to target, only reading packets around it"""
+        window = Config.TRIM_KEYFRAME_WINDOW
+        keyframes = await self.probe_keyframes(input_path, max(0.0, target - window), target + window)
+        if not keyframes:
+            return None
+        return min(keyframes, key=lambda pts: abs(pts - target))
+
+    async def probe_keyframes(self, input_path: str, start: float, end: float) -> List[float]:
+        output = await self.run_process([
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-read_intervals", f"{start}%{end}",
+            "-show_entries", "packet=pts_time,flags",
+            "-of", "csv=p=0", input_path
+        ])
+        keyframes = []
+        for line in output.decode(errors='ignore').splitlines():
+            pts_time, _, flags = line.partition(',')
+            if 'K' in flags and pts_time not in ('', 'N/A'):
+                keyframes.append(float(pts_time))
+        return keyframes
+
+    async def run_ffmpeg(self, ffmpeg_cmd: List[str]) -> None:
+        self.logger.debug("Running ffmpeg command: %s", ' '.join(ffmpeg_cmd))
+        with metrics.timer('ffmpeg'):
+            await self.run_process(ffmpeg_cmd)
+
+    async def run_process(self, cmd: List[str]) -> bytes:
+        """Run a command and return its stdout, raising if it exits with an error"""
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate()
+
+        if process.returncode != 0:
+            error_msg = stderr.decode(errors='ignore') if stderr else f"Unknown {cmd[0]} error"
+            self.logger.error("%s failed with return code %s: %s", cmd[0], process.returncode, error_msg)
+            raise Exception(f"Video trimming failed: {error_msg}")
+        return stdout
+
+    @staticmethod
+    def _copy_command(input_path: str, output_path: str, start_time: float, duration: float,
+                      audio_codec: Optional[str]) -> List[str]:
+        # Input seeking on a keyframe timestamp makes the copied cut start exactly there
+        audio_args = ["-c:a", "copy"] if audio_codec in COPYABLE_AUDIO_CODECS else ["-c:a", "aac", "-b:a", "96k"]
+        return [
+            "ffmpeg", "-ss", str(start_time), "-i", input_path,
+            "-t", str(duration),
+            "-map", "0:v:0", "-map", "0:a:0?",
+            "-c:v", "copy",
+            *audio_args,
+            "-movflags", "+faststart",
+            "-avoid_negative_ts", "make_zero",
+            output_path, "-y"
+        ]
+
+    @staticmethod
+    def _input_thread_args(threads: int) -> List[str]:
+        """Decoder and filter graph share of the thread budget; output -threads only limits the encoder"""
+        if not threads:
+            return []  # 0 = all cores, ffmpeg's own default
+        return ["-threads", str(threads), "-filter_complex_threads", str(threads)]
+
+    @staticmethod
+    def _reencode_command(input_path: str, output_path: str, start_time: float, duration: float,
+                          threads: int = 0) -> List[str]:
+        # Input seeking: decoding starts at the keyframe before start_time, so only the
+        # window is read (required for partially downloaded sparse inputs)
+        return [
+            "ffmpeg", *VideoTrimmer._input_thread_args(threads), "-ss", str(start_time), "-i", input_path,
+            "-t", str(duration),
+            "-c:v", "libx264",  # Fast H264 encoding
+            "-preset", "ultrafast",  # Fastest preset
+            "-crf", "28",  # Good quality/speed balance
+            "-c:a", "aac",  # Fast AAC audio
+            "-b:a", "96k",  # Low audio bitrate for speed
+            "-movflags", "+faststart",  # Optimize for web playback
+            "-avoid_negative_ts", "make_zero",
+            "-threads", str(threads),  # Thread budget from the scheduler, 0 = all cores
+            output_path, "-y"
+        ]
+
+    @staticmethod
+    def _clips_command(input_path: str, clips: List[Tuple[ClipSpec, float, str]], has_audio: bool,
+                       threads: int = 0) -> List[str]:
+        window_start = min(start_time for _, start_time, _ in clips)
+        window_length = max(start_time + spec.length for spec, start_time, _ in clips) - window_start
+        with_audio = [index for index, (spec, _, _) in enumerate(clips) if spec.kind not in (CLIP_GIF, CLIP_THUMBNAIL)
+                      and has_audio]
+
+        graph = [f"[0:v]split={len(clips)}" + ''.join(f"[v{index}]" for index in range(len(clips)))]
+        if with_audio:
+            graph.append(f"[0:a]asplit={len(with_audio)}" + ''.join(f"[a{index}]" for index in with_audio))
+        output_args = []
+        for index, (spec, start_time, output_path) in enumerate(clips):
+            # Timestamps restart at the window start because of the input seek
+            offset = start_time - window_start
+            if spec.kind == CLIP_THUMBNAIL:
+                # A bounded trim ends the branch by itself, so split stops feeding it after the frame
+                graph.append(f"[v{index}]trim=start={offset}:duration={spec.length},setpts=PTS-STARTPTS[out{index}]")
+                output_args += ["-map", f"[out{index}]", "-frames:v", "1", "-q:v", "3", "-update", "1",
+                                "-threads", str(threads), output_path]
+            elif spec.kind == CLIP_GIF:
+                # Two-pass palette in one graph: the palette is built from the clip's own frames
+                graph.append(f"[v{index}]trim=start={offset}:duration={spec.duration},setpts=PTS-STARTPTS,"
+                             f"fps={GIF_FPS},scale={GIF_WIDTH}:-1:flags=lanczos,split[g{index}][h{index}];"
+                             f"[g{index}]palettegen[p{index}];[h{index}][p{index}]paletteuse[out{index}]")
+                output_args += ["-map", f"[out{index}]", "-threads", str(threads), output_path]
+            else:
+                graph.append(f"[v{index}]trim=start={offset}:duration={spec.duration},setpts=PTS-STARTPTS[out{index}]")
+                output_args += ["-map", f"[out{index}]"]
+                if index in with_audio:
+                    graph.append(f"[a{index}]atrim=start={offset}:duration={spec.duration},asetpts=PTS-STARTPTS"
+                                 f"[aout{index}]")
+                    output_args += ["-map", f"[aout{index}]", "-c:a", "aac", "-b:a", "96k"]
+                output_args += [
+                    "-c:v", "libx264", "-preset", "ultrafast", "-crf", "28",
+                    "-movflags", "+faststart",
+                    "-threads", str(threads),
+                    output_path
+                ]
+        # Input seeking and an input duration: only the window shared by all outputs is decoded
+        return [
+            "ffmpeg", "-y", *VideoTrimmer._input_thread_args(threads),
+            "-ss", str(window_start), "-t", str(window_length), "-i", input_path,
+            "-filter_complex", ';'.join(graph),
+            *output_args
+        ]
+
+    @staticmethod
+    def streaming_command(start_time: float, duration: float, threads: int = 0) -> List[str]:
+        """Trim from stdin to a fragmented MP4 on stdout.
+
+        Always re-encodes: keyframes can't be probed on a pipe, so a stream copy could
+        start on a frame that isn't decodable.
+        """
+        return [
+            "ffmpeg", *VideoTrimmer._input_thread_args(threads), "-ss", str(start_time), "-i", "pipe:0",
+            "-t", str(duration),
+            "-c:v", "libx264",
+            "-preset", "ultrafast",
+            "-crf", "28",
+            "-c:a", "aac",
+            "-b:a", "96k",
+            # Fragmented MP4 can be written without seeking back, so it can go to a pipe
+            "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+            "-avoid_negative_ts", "make_zero",
+            "-threads", str(threads),
+            "-f", "mp4", "pipe:1"
+        ]
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Optional
+from src.config.config import Config
+from src.infrastructure.metrics.registry import MetricsRegistry
+
+
+class MetricsExpositionServer:
+    """Minimal HTTP endpoint serving the registry at GET /metrics"""
+
+    def __init__(self, registry: MetricsRegistry, host: Optional[str] = None, port: Optional[int] = None):
+        self.registry = registry
+        self.host = host or Config.METRICS_HOST
+        self.port = port or Config.METRICS_PORT
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.logger = Config.get_logger('infrastructure.metrics_server')
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.logger.info("Metrics available at http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Drain the headers; the request has no body
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                body = self.registry.render().encode()
+                status = '200 OK'
+                content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            else:
+                body = b'Not Found\n'
+                status = '404 Not Found'
+                content_type = 'text/plain; charset=utf-8'
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            self.logger.debug("Metrics request failed: %s", e)
+        finally:
+            writer.close()
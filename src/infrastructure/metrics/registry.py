@@ -0,0 +1,169 @@
+import bisect
+import contextlib
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from src.config.config import Config
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+# Seconds; covers quick API calls up to multi-minute downloads
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+# Bytes per second; 64 KB/s up to 128 MB/s
+THROUGHPUT_BUCKETS = tuple(64 * 1024 * 2 ** exponent for exponent in range(12))
+
+_NOOP = contextlib.nullcontext()
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class StageTimer:
+    """Times a block and records it under a stage; an exception also counts as an error"""
+
+    __slots__ = ('registry', 'stage', 'started')
+
+    def __init__(self, registry: 'MetricsRegistry', stage: str):
+        self.registry = registry
+        self.stage = stage
+        self.started = 0.0
+
+    def __enter__(self) -> 'StageTimer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.registry.observe('stage_duration_seconds', time.perf_counter() - self.started, stage=self.stage)
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            self.registry.inc('errors_total', stage=self.stage)
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and histograms rendered in Prometheus text format.
+
+    Disabled by default: every recording call returns right away and timers are a shared
+    no-op context manager, so instrumented code paths cost a single attribute check.
+    Gauges such as queue depths are read through callbacks only when scraped.
+    """
+
+    PREFIX = 'peque_'
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.help: Dict[str, Tuple[str, str]] = {}  # name -> (type, help)
+        self.counters: Dict[Tuple[str, LabelSet], float] = {}
+        self.histograms: Dict[Tuple[str, LabelSet], Histogram] = {}
+        self.gauge_callbacks: Dict[str, Callable[[], Dict[LabelSet, float]]] = {}
+        self.histogram_buckets: Dict[str, Tuple[float, ...]] = {}
+
+        self.describe('stage_duration_seconds', 'histogram', 'Time spent in each processing stage')
+        self.describe('errors_total', 'counter', 'Errors raised per processing stage')
+        self.describe('bytes_total', 'counter', 'Bytes transferred per stage')
+        self.describe('throughput_bytes_per_second', 'histogram', 'Transfer rate of each download or upload',
+                      THROUGHPUT_BUCKETS)
+        self.describe('videos_total', 'counter', 'Videos processed per category and outcome')
+        self.describe('queue_depth', 'gauge', 'Jobs waiting per queue')
+        self.describe('evicted_bytes_total', 'counter', 'Bytes freed by evicting stored videos')
+        self.describe('compacted_bytes_total', 'counter', 'Bytes saved by compacting stored videos')
+
+    def describe(self, name: str, metric_type: str, help_text: str,
+                 buckets: Optional[Tuple[float, ...]] = None) -> None:
+        self.help[name] = (metric_type, help_text)
+        if buckets:
+            self.histogram_buckets[name] = buckets
+
+    def timer(self, stage: str):
+        """Context manager timing a stage (a no-op while metrics are disabled)"""
+        if not self.enabled:
+            return _NOOP
+        return StageTimer(self, stage)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, self._labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, self._labels(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(self.histogram_buckets.get(name, DEFAULT_BUCKETS))
+        histogram.observe(value)
+
+    def record_transfer(self, stage: str, size: int, seconds: float) -> None:
+        """Count transferred bytes and record the transfer rate"""
+        if not self.enabled:
+            return
+        self.inc('bytes_total', size, stage=stage)
+        if seconds > 0:
+            self.observe('throughput_bytes_per_second', size / seconds, stage=stage)
+
+    def register_gauge(self, name: str, callback: Callable[[], Dict[str, float]], label: str) -> None:
+        """Register a gauge whose values are read from `callback` at scrape time"""
+        self.gauge_callbacks[name] = lambda: {((label, str(key)),): value for key, value in callback().items()}
+
+    def render(self) -> str:
+        """Current values in Prometheus text exposition format"""
+        lines: List[str] = []
+        by_name: Dict[str, List[str]] = {}
+
+        for (name, labels), value in sorted(self.counters.items()):
+            by_name.setdefault(name, []).append(f"{self.PREFIX}{name}{self._format(labels)} {self._number(value)}")
+
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            samples = by_name.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                samples.append(f"{self.PREFIX}{name}_bucket{self._format(labels + (('le', self._number(bound)),))} {cumulative}")
+            samples.append(f"{self.PREFIX}{name}_bucket{self._format(labels + (('le', '+Inf'),))} {histogram.count}")
+            samples.append(f"{self.PREFIX}{name}_sum{self._format(labels)} {self._number(histogram.total)}")
+            samples.append(f"{self.PREFIX}{name}_count{self._format(labels)} {histogram.count}")
+
+        for name, callback in self.gauge_callbacks.items():
+            try:
+                values = callback()
+            except Exception:
+                continue
+            samples = by_name.setdefault(name, [])
+            for labels, value in sorted(values.items()):
+                samples.append(f"{self.PREFIX}{name}{self._format(labels)} {self._number(value)}")
+
+        for name, samples in by_name.items():
+            metric_type, help_text = self.help.get(name, ('untyped', name))
+            lines.append(f"# HELP {self.PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {self.PREFIX}{name} {metric_type}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _number(value: float) -> str:
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> LabelSet:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    @staticmethod
+    def _format(labels: LabelSet) -> str:
+        if not labels:
+            return ''
+        escaped = (key + '="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+                   for key, value in labels)
+        return '{' + ','.join(escaped) + '}'
+
+
+# Shared registry; enabled from configuration so every module records into the same place
+metrics = MetricsRegistry(enabled=Config.METRICS_ENABLED)
@@ -0,0 +1,26 @@
+import contextlib
+import logging
+import time
+from typing import Iterator, List, Tuple
+
+
+class StartupReport:
+    """Times each startup phase and logs a summary once the bot is ready"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def log(self, logger: logging.Logger) -> None:
+        logger.info("=== Startup Timing ===")
+        for name, seconds in self.phases:
+            logger.info("%s: %.3fs", name, seconds)
+        logger.info("Ready in %.3fs", time.perf_counter() - self.started)
@@ -0,0 +1,103 @@
+from itertools import combinations
+from typing import Dict, List, Optional, Set, Tuple
+
+HASH_BITS = 64
+
+
+class MultiIndexHammingIndex:
+    """In-memory index of 64-bit perceptual hashes answering "which hashes are within r bits".
+
+    Each hash is split into `bands` chunks and stored in one bucket table per band. Two
+    hashes differing in at most r bits must agree on some chunk up to r // bands bits
+    (pigeonhole), so a query only probes the buckets of its own chunks and their few
+    neighbours instead of scanning every entry. With 16-bit chunks and 100k+ videos the
+    buckets hold a handful of hashes each and a lookup stays well under a millisecond.
+    """
+
+    def __init__(self, max_distance: int, bands: int = 4):
+        self.max_distance = max_distance
+        # Bits per band, spread as evenly as possible
+        widths = [HASH_BITS // bands + (1 if band < HASH_BITS % bands else 0) for band in range(bands)]
+        self.bands = [(sum(widths[:band]), (1 << width) - 1) for band, width in enumerate(widths)]  # (shift, mask)
+        # Every chunk value within r // bands bits of a chunk, as XOR masks per band
+        radius = max_distance // bands
+        self.probes = [[sum(1 << bit for bit in flipped)
+                        for distance in range(min(radius, width) + 1)
+                        for flipped in combinations(range(width), distance)]
+                       for width in widths]
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self.owners: Dict[int, Set[int]] = {}  # hash -> keys having it
+        self.hashes: Dict[int, List[int]] = {}  # key -> its hashes
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def add(self, key: int, hashes: List[int]) -> None:
+        self.remove(key)
+        hashes = list(dict.fromkeys(hashes))
+        self.hashes[key] = hashes
+        for value in hashes:
+            owners = self.owners.get(value)
+            if owners is not None:
+                owners.add(key)
+                continue
+            self.owners[value] = {key}
+            for (shift, mask), table in zip(self.bands, self.tables):
+                table.setdefault((value >> shift) & mask, []).append(value)
+
+    def remove(self, key: int) -> None:
+        for value in self.hashes.pop(key, ()):
+            owners = self.owners.get(value)
+            if owners is None:
+                continue
+            owners.discard(key)
+            if owners:
+                continue
+            del self.owners[value]
+            for (shift, mask), table in zip(self.bands, self.tables):
+                chunk = (value >> shift) & mask
+                bucket = table[chunk]
+                bucket.remove(value)
+                if not bucket:
+                    del table[chunk]
+
+    def query(self, value: int) -> Dict[int, int]:
+        """Keys with a hash within max_distance of value, mapped to their closest distance"""
+        limit = self.max_distance
+        close = {candidate
+                 for (shift, mask), table, probes in zip(self.bands, self.tables, self.probes)
+                 for chunk in ((value >> shift) & mask,)
+                 for probe in probes
+                 for candidate in table.get(chunk ^ probe, ())
+                 if (candidate ^ value).bit_count() <= limit}
+
+        found: Dict[int, int] = {}
+        for candidate in close:
+            distance = (candidate ^ value).bit_count()
+            for key in self.owners[candidate]:
+                if distance < found.get(key, HASH_BITS + 1):
+                    found[key] = distance
+        return found
+
+    def match(self, hashes: List[int]) -> Optional[Tuple[int, int]]:
+        """Closest key matching at least half of the frames both fingerprints could share.
+
+        Returns (key, distance) or None. A fingerprint may be a single thumbnail hash or
+        several sampled frames, so the vote is relative to the smaller of the two.
+        """
+        votes: Dict[int, List[int]] = {}
+        for value in hashes:
+            for key, distance in self.query(value).items():
+                votes.setdefault(key, []).append(distance)
+
+        best = None
+        for key, distances in votes.items():
+            required = (min(len(hashes), len(self.hashes[key])) + 1) // 2
+            if len(distances) < required:
+                continue
+            score = (-len(distances), min(distances))
+            if best is None or score < best[0]:
+                best = (score, key)
+        if best is None:
+            return None
+        return best[1], best[0][1]
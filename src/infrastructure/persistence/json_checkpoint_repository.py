@@ -0,0 +1,43 @@
+import asyncio
+import json
+import os
+from typing import Dict, Optional
+from src.domain.repositories.checkpoint_repository import CheckpointRepository
+from src.config.config import Config
+
+
+class JsonCheckpointRepository(CheckpointRepository):
+    """Per-chat message checkpoints kept in a small JSON file, rewritten atomically"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = asyncio.Lock()
+        self.logger = Config.get_logger('infrastructure.json_checkpoint_repository')
+        self.checkpoints: Dict[str, int] = self._load()
+
+    async def get(self, chat_id: int) -> Optional[int]:
+        return self.checkpoints.get(str(chat_id))
+
+    async def set(self, chat_id: int, message_id: int) -> None:
+        self.checkpoints[str(chat_id)] = message_id
+
+        def write(data: str) -> None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+
+        # Serialize writes and snapshot inside the lock so an older state never replaces a newer one
+        async with self.lock:
+            await asyncio.to_thread(write, json.dumps(self.checkpoints))
+
+    def _load(self) -> Dict[str, int]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.logger.warning("Ignoring unreadable checkpoint file %s: %s", self.path, e)
+            return {}
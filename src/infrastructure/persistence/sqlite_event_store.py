@@ -0,0 +1,110 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from src.domain.entities.video_event import EVENT_CLASSIFIED, EVENT_COMPACTED, EVENT_DOWNLOADED, VideoEvent
+from src.domain.entities.video_stats import VideoStats
+from src.domain.repositories.event_store_repository import EventStoreRepository
+from src.config.config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp REAL NOT NULL,
+    event_type TEXT NOT NULL,
+    category TEXT,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    document_id INTEGER,
+    chat_id INTEGER,
+    message_id INTEGER,
+    detail TEXT
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    bucket TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    category TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, event_type, category)
+);
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO rollups (bucket, event_type, category, count, bytes) VALUES (?, ?, ?, 1, ?)
+ON CONFLICT (bucket, event_type, category) DO UPDATE SET count = count + 1, bytes = bytes + excluded.bytes
+"""
+
+TOTAL_BUCKET = 'total'
+
+
+class SqliteEventStore(EventStoreRepository):
+    """Append-only event log with incremental rollups, stored in SQLite.
+
+    Each append updates the all-time, daily and hourly rollup rows in the same
+    transaction, so reading statistics touches a handful of rows regardless of how
+    much history has been recorded.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.logger = Config.get_logger('infrastructure.sqlite_event_store')
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        self.logger.info("Event store opened at %s", db_path)
+
+    @staticmethod
+    def day_bucket(timestamp: float) -> str:
+        return time.strftime('d:%Y-%m-%d', time.localtime(timestamp))
+
+    @staticmethod
+    def hour_bucket(timestamp: float) -> str:
+        return time.strftime('h:%Y-%m-%dT%H', time.localtime(timestamp))
+
+    async def append(self, event: VideoEvent) -> None:
+        await asyncio.to_thread(self._append, event)
+
+    async def get_stats(self) -> VideoStats:
+        return await asyncio.to_thread(self._get_stats)
+
+    def _append(self, event: VideoEvent) -> None:
+        category = event.category or ''
+        with self.lock:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT INTO events (timestamp, event_type, category, size_bytes, document_id, chat_id, message_id, detail) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (event.timestamp, event.event_type, event.category, event.size_bytes, event.document_id,
+                     event.chat_id, event.message_id, event.detail)
+                )
+                for bucket in (TOTAL_BUCKET, self.day_bucket(event.timestamp), self.hour_bucket(event.timestamp)):
+                    self.connection.execute(UPSERT_ROLLUP, (bucket, event.event_type, category, event.size_bytes))
+
+    def _get_stats(self) -> VideoStats:
+        now = time.time()
+        buckets = {TOTAL_BUCKET: 'totals', self.day_bucket(now): 'today', self.hour_bucket(now): 'this_hour'}
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT bucket, event_type, category, count, bytes FROM rollups WHERE bucket IN (?, ?, ?)",
+                tuple(buckets)
+            ).fetchall()
+
+        stats = VideoStats()
+        for bucket, event_type, category, count, size in rows:
+            counts = getattr(stats, buckets[bucket])
+            counts[event_type] = counts.get(event_type, 0) + count
+            if bucket == TOTAL_BUCKET:
+                if event_type == EVENT_CLASSIFIED and category:
+                    stats.by_category[category] = stats.by_category.get(category, 0) + count
+                elif event_type == EVENT_DOWNLOADED:
+                    stats.bytes_downloaded += size
+                elif event_type == EVENT_COMPACTED:
+                    stats.bytes_saved += size
+        return stats
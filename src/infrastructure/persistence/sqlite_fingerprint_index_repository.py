@@ -0,0 +1,74 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+from src.domain.repositories.fingerprint_index_repository import FingerprintIndexRepository
+from src.infrastructure.persistence.hamming_index import MultiIndexHammingIndex
+from src.config.config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    document_id INTEGER NOT NULL,
+    hash INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_document_id ON fingerprints (document_id);
+"""
+
+# SQLite integers are signed 64-bit
+SIGN_BIT = 1 << 63
+UNSIGNED_RANGE = 1 << 64
+
+
+class SqliteFingerprintIndexRepository(FingerprintIndexRepository):
+    """Perceptual hashes of known videos, stored in SQLite and searched in memory.
+
+    The whole table is loaded into a MultiIndexHammingIndex at startup, so lookups never
+    touch the database; writes go to a worker thread.
+    """
+
+    def __init__(self, db_path: str, max_distance: Optional[int] = None):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.index = MultiIndexHammingIndex(Config.FINGERPRINT_MAX_DISTANCE if max_distance is None else max_distance)
+        self.logger = Config.get_logger('infrastructure.sqlite_fingerprint_index_repository')
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        self._load()
+
+    async def find_similar(self, hashes: List[int]) -> Optional[Tuple[int, int]]:
+        return self.index.match(hashes)
+
+    async def add(self, document_id: int, hashes: List[int]) -> None:
+        self.index.add(document_id, hashes)
+        await asyncio.to_thread(self._replace, document_id, hashes)
+
+    async def remove(self, document_id: int) -> None:
+        self.index.remove(document_id)
+        await asyncio.to_thread(self._replace, document_id, [])
+
+    def _replace(self, document_id: int, hashes: List[int]) -> None:
+        with self.lock:
+            self.connection.execute("DELETE FROM fingerprints WHERE document_id = ?", (document_id,))
+            self.connection.executemany(
+                "INSERT INTO fingerprints (document_id, hash) VALUES (?, ?)",
+                [(document_id, value - UNSIGNED_RANGE if value & SIGN_BIT else value) for value in hashes]
+            )
+            self.connection.commit()
+
+    def _load(self) -> None:
+        started = time.perf_counter()
+        documents = {}
+        for document_id, value in self.connection.execute("SELECT document_id, hash FROM fingerprints"):
+            documents.setdefault(document_id, []).append(value % UNSIGNED_RANGE)
+        for document_id, hashes in documents.items():
+            self.index.add(document_id, hashes)
+        self.logger.info("Fingerprint index opened at %s: %s video(s) loaded in %.3fs",
+                         self.db_path, len(self.index), time.perf_counter() - started)
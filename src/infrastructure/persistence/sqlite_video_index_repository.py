@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from src.domain.entities.indexed_video import IndexedVideo
+from src.domain.entities.video_message import VideoMessage
+from src.domain.repositories.video_index_repository import VideoIndexRepository
+from src.config.config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    document_id INTEGER PRIMARY KEY,
+    content_key TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    category TEXT,
+    first_seen REAL NOT NULL,
+    seen_count INTEGER NOT NULL DEFAULT 1,
+    file_name TEXT,
+    file_path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_videos_content_key ON videos (content_key);
+"""
+
+COLUMNS = "document_id, content_key, chat_id, message_id, category, first_seen, seen_count, file_name, file_path"
+
+
+class SqliteVideoIndexRepository(VideoIndexRepository):
+    """Persistent index of already processed videos stored in SQLite.
+
+    Queries run in a worker thread so the event loop never waits on disk.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.logger = Config.get_logger('infrastructure.sqlite_video_index_repository')
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        self.logger.info("Video index opened at %s", db_path)
+
+    async def find(self, video_message: VideoMessage) -> Optional[IndexedVideo]:
+        row = await asyncio.to_thread(
+            self._fetch_one,
+            f"SELECT {COLUMNS} FROM videos WHERE document_id = ? "
+            f"UNION ALL SELECT {COLUMNS} FROM videos WHERE content_key = ? LIMIT 1",
+            (video_message.document.id, video_message.content_key)
+        )
+        return IndexedVideo(*row) if row else None
+
+    async def get(self, document_id: int) -> Optional[IndexedVideo]:
+        row = await asyncio.to_thread(
+            self._fetch_one, f"SELECT {COLUMNS} FROM videos WHERE document_id = ?", (document_id,)
+        )
+        return IndexedVideo(*row) if row else None
+
+    async def register(self, video_message: VideoMessage, category: str) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            f"INSERT OR IGNORE INTO videos ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, 1, ?, NULL)",
+            (video_message.document.id, video_message.content_key, video_message.chat_id,
+             video_message.message_id, category, time.time(), video_message.file_name)
+        )
+
+    async def mark_seen(self, document_id: int) -> None:
+        await asyncio.to_thread(
+            self._execute, "UPDATE videos SET seen_count = seen_count + 1 WHERE document_id = ?", (document_id,)
+        )
+
+    async def set_file_path(self, document_id: int, file_path: str) -> None:
+        await asyncio.to_thread(
+            self._execute, "UPDATE videos SET file_path = ? WHERE document_id = ?", (file_path, document_id)
+        )
+
+    async def forget_file(self, file_path: str) -> None:
+        await asyncio.to_thread(
+            self._execute, "UPDATE videos SET file_path = NULL WHERE file_path = ?", (file_path,)
+        )
+
+    async def remove(self, document_id: int) -> None:
+        await asyncio.to_thread(self._execute, "DELETE FROM videos WHERE document_id = ?", (document_id,))
+
+    def _fetch_one(self, query: str, params: tuple):
+        with self.lock:
+            return self.connection.execute(query, params).fetchone()
+
+    def _execute(self, query: str, params: tuple) -> None:
+        with self.lock:
+            self.connection.execute(query, params)
+            self.connection.commit()
@@ -0,0 +1,40 @@
+from typing import Optional
+from telethon.tl.types import Document, DocumentAttributeFilename, DocumentAttributeVideo
+
+
+def document_to_handle(document, duration: Optional[int] = None, file_name: Optional[str] = None) -> dict:
+    """Compact, JSON-serializable reference to a Telegram document"""
+    video_attr = next((attr for attr in getattr(document, 'attributes', None) or []
+                       if isinstance(attr, DocumentAttributeVideo)), None)
+    return {
+        'id': document.id,
+        'access_hash': document.access_hash,
+        'file_reference': (document.file_reference or b'').hex(),
+        'dc_id': document.dc_id,
+        'size': document.size,
+        'mime_type': getattr(document, 'mime_type', None),
+        'duration': duration if duration is not None else (video_attr.duration if video_attr else None),
+        'w': video_attr.w if video_attr else 0,
+        'h': video_attr.h if video_attr else 0,
+        'file_name': file_name,
+    }
+
+
+def handle_to_document(handle: dict) -> Document:
+    """Rebuild a Document usable for downloads and sends from a handle"""
+    attributes = []
+    if handle.get('duration') is not None:
+        attributes.append(DocumentAttributeVideo(duration=handle['duration'], w=handle.get('w') or 0,
+                                                 h=handle.get('h') or 0, supports_streaming=True))
+    if handle.get('file_name'):
+        attributes.append(DocumentAttributeFilename(handle['file_name']))
+    return Document(
+        id=handle['id'],
+        access_hash=handle['access_hash'],
+        file_reference=bytes.fromhex(handle['file_reference']),
+        date=None,
+        mime_type=handle.get('mime_type') or 'video/mp4',
+        size=handle['size'],
+        dc_id=handle['dc_id'],
+        attributes=attributes
+    )
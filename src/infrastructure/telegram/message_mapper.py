@@ -0,0 +1,25 @@
+from typing import Optional
+from telethon.tl.types import DocumentAttributeFilename, DocumentAttributeVideo
+from src.domain.entities.video_message import VideoMessage
+
+
+def to_video_message(message) -> Optional[VideoMessage]:
+    """Build the VideoMessage for a Telegram message, or None if it isn't a video with a duration"""
+    if not message.video or not message.document:
+        return None
+    video_attr = next((attr for attr in message.document.attributes if isinstance(attr, DocumentAttributeVideo)), None)
+    if not video_attr:
+        return None
+
+    # Extraer el nombre del archivo del documento
+    file_name_attr = next((attr for attr in message.document.attributes if isinstance(attr, DocumentAttributeFilename)), None)
+    return VideoMessage(
+        message_id=message.id,
+        chat_id=message.chat_id,
+        video_duration=video_attr.duration,
+        video_size=message.document.size,
+        document=message.document,
+        caption=message.text,
+        file_name=file_name_attr.file_name if file_name_attr else None,
+        grouped_id=message.grouped_id
+    )
@@ -0,0 +1,176 @@
+import asyncio
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from telethon import errors
+from src.config.config import Config
+
+# Lower values are served first; requests with the same priority keep FIFO order
+PRIORITY_INTERACTIVE = 0  # callback answers, command replies
+PRIORITY_BULK = 10  # approvals, fan-out sends, status replies
+
+T = TypeVar('T')
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second up to `capacity`, pausable by FloodWait"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class OutboundScheduler:
+    """Single gate for every request that sends, edits, deletes or forwards messages.
+
+    Each request takes a token from the global bucket and, when it targets a chat, from
+    that chat's bucket (groups and channels are limited per minute, private chats per
+    second). Waiting requests are granted in priority order, so interactive traffic
+    jumps ahead of bulk sends. A FloodWait pauses the affected bucket and the request is
+    rescheduled instead of failing the job.
+    """
+
+    MAX_CHAT_BUCKETS = 1000
+
+    def __init__(self, global_rate: Optional[float] = None, chat_rate: Optional[float] = None,
+                 group_rate_per_min: Optional[float] = None, chat_burst: Optional[int] = None,
+                 max_flood_wait: Optional[int] = None):
+        self.global_rate = global_rate or Config.OUTBOUND_GLOBAL_RATE
+        self.chat_rate = chat_rate or Config.OUTBOUND_CHAT_RATE
+        self.group_rate = (group_rate_per_min or Config.OUTBOUND_GROUP_RATE_PER_MIN) / 60
+        self.chat_burst = chat_burst or Config.OUTBOUND_CHAT_BURST
+        self.max_flood_wait = max_flood_wait if max_flood_wait is not None else Config.OUTBOUND_MAX_FLOOD_WAIT
+        self.global_bucket = TokenBucket(self.global_rate, self.global_rate)
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        self.waiters: List[Tuple[int, int, Optional[int], asyncio.Future]] = []
+        self.sequence = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.logger = Config.get_logger('infrastructure.outbound_scheduler')
+
+    async def call(self, chat_id: Optional[int], request: Callable[[], Awaitable[T]],
+                   priority: int = PRIORITY_BULK, label: str = '') -> T:
+        """Run `request` once tokens are available, retrying it after any FloodWait.
+
+        `chat_id` selects the per-chat bucket; None only counts against the global limit.
+        """
+        while True:
+            await self._acquire(chat_id, priority)
+            try:
+                return await request()
+            except (errors.FloodWaitError, errors.SlowModeWaitError) as e:
+                if e.seconds > self.max_flood_wait:
+                    self.logger.error("%s to chat %s hit a %ss flood wait, above the %ss limit",
+                                      label or 'Request', chat_id, e.seconds, self.max_flood_wait)
+                    raise
+                self.logger.warning("%s to chat %s hit a %ss flood wait, rescheduling",
+                                    label or 'Request', chat_id, e.seconds)
+                bucket = self._bucket(chat_id) if chat_id is not None else self.global_bucket
+                bucket.pause(e.seconds)
+                self.wakeup.set()
+
+    def queue_depth(self) -> int:
+        return len(self.waiters)
+
+    async def _acquire(self, chat_id: Optional[int], priority: int) -> None:
+        now = time.monotonic()
+        if not self.waiters and self._wait_time(chat_id, now) <= 0:
+            self._take(chat_id, now)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self.sequence), chat_id, future)
+        self.waiters.append(entry)
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.create_task(self._dispatch())
+        self.wakeup.set()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if entry in self.waiters:
+                self.waiters.remove(entry)
+            raise
+
+    async def _dispatch(self) -> None:
+        while self.waiters:
+            self.wakeup.clear()
+            now = time.monotonic()
+            next_wait = None
+            self.waiters.sort(key=lambda entry: entry[:2])
+            for entry in list(self.waiters):
+                _, _, chat_id, future = entry
+                if future.done():
+                    self.waiters.remove(entry)
+                    continue
+                wait = self._wait_time(chat_id, now)
+                if wait <= 0:
+                    # A request blocked on its own chat doesn't hold back other chats
+                    self._take(chat_id, now)
+                    self.waiters.remove(entry)
+                    future.set_result(None)
+                elif next_wait is None or wait < next_wait:
+                    next_wait = wait
+
+            if self.waiters:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=next_wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _wait_time(self, chat_id: Optional[int], now: float) -> float:
+        wait = self.global_bucket.wait_time(now)
+        if chat_id is not None:
+            wait = max(wait, self._bucket(chat_id).wait_time(now))
+        return wait
+
+    def _take(self, chat_id: Optional[int], now: float) -> None:
+        self.global_bucket.take(now)
+        if chat_id is not None:
+            self._bucket(chat_id).take(now)
+
+    def _bucket(self, chat_id) -> TokenBucket:
+        chat_id = self._chat_key(chat_id)
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= self.MAX_CHAT_BUCKETS:
+                now = time.monotonic()
+                for idle_chat in [key for key, value in self.chat_buckets.items() if value.idle(now)]:
+                    del self.chat_buckets[idle_chat]
+            # Negative ids are groups and channels, which have a per-minute limit
+            rate = self.group_rate if isinstance(chat_id, int) and chat_id < 0 else self.chat_rate
+            bucket = self.chat_buckets[chat_id] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    @staticmethod
+    def _chat_key(chat_id):
+        # Chat ids may come from configuration as strings
+        try:
+            return int(chat_id)
+        except (TypeError, ValueError):
+            return chat_id
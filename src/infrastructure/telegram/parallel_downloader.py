@@ -0,0 +1,189 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, List, Optional
+from telethon import TelegramClient, utils
+from telethon.errors import FileReferenceExpiredError
+from telethon.network import MTProtoSender
+from telethon.tl.alltlobjects import LAYER
+from telethon.tl.functions import InvokeWithLayerRequest
+from telethon.tl.functions.auth import ExportAuthorizationRequest, ImportAuthorizationRequest
+from telethon.tl.functions.upload import GetFileRequest
+from telethon.tl.types.upload import File as UploadFile
+from src.config.config import Config
+from src.infrastructure.filesystem.download_journal import DownloadJournal
+
+# Telegram requires the request limit to be a multiple of 4 KB that divides 1 MB
+MIN_PART_SIZE = 4 * 1024
+MAX_PART_SIZE = 512 * 1024
+
+
+class _FileSource:
+    """Input location shared by the workers of one download, renewed once when its file reference expires"""
+
+    def __init__(self, location, refresh: Optional[Callable[[], Awaitable]]):
+        self.location = location
+        self.refresh = refresh
+        self.generation = 0
+        self.lock = asyncio.Lock()
+
+    async def renew(self, seen_generation: int) -> None:
+        async with self.lock:
+            # Another worker may have renewed it while this one waited
+            if self.generation == seen_generation:
+                document = await self.refresh()
+                _, self.location = utils.get_input_location(document)
+                self.generation += 1
+
+
+class ParallelDownloader:
+    """Downloads a Telegram document over several connections to the file's DC.
+
+    The document is split into aligned parts that are fetched concurrently, one worker
+    per connection, and each part is written at its offset in a preallocated file.
+    """
+
+    def __init__(self, client: TelegramClient, connections: Optional[int] = None, part_size: Optional[int] = None):
+        self.client = client
+        self.connections = max(1, connections if connections is not None else Config.DOWNLOAD_CONNECTIONS)
+        self.part_size = self.normalize_part_size(part_size if part_size is not None else Config.DOWNLOAD_PART_SIZE)
+        self.logger = Config.get_logger('infrastructure.parallel_downloader')
+
+    @staticmethod
+    def normalize_part_size(part_size: int) -> int:
+        """Round down to the closest power of two accepted by upload.getFile"""
+        size = MIN_PART_SIZE
+        while size * 2 <= min(part_size, MAX_PART_SIZE):
+            size *= 2
+        return size
+
+    async def download(self, document, file_path: str, journal: Optional[DownloadJournal] = None,
+                       refresh_document: Optional[Callable[[], Awaitable]] = None) -> None:
+        """Download the document into file_path.
+
+        When a journal is given, parts it already records as completed are skipped and
+        every newly written part is recorded in it. refresh_document fetches the document
+        again when its file reference expires mid-download.
+        """
+        file_size = document.size
+        part_count = (file_size + self.part_size - 1) // self.part_size
+        done_parts = journal.completed_parts if journal else set()
+        missing_parts = [part for part in range(part_count) if part not in done_parts]
+        if not missing_parts:
+            self.logger.info("Document %s already fully downloaded according to journal", document.id)
+            return
+        connections = min(self.connections, len(missing_parts))
+
+        if part_count <= 1:
+            self.logger.debug("Document %s fits in a single part, using sequential download", document.id)
+            await self._download_sequential(document, file_path, journal)
+            return
+
+        dc_id, location = utils.get_input_location(document)
+        try:
+            senders = await self._create_senders(dc_id, connections)
+        except Exception as e:
+            self.logger.warning("Could not open parallel connections to DC %s, falling back to sequential download: %s",
+                                dc_id, e)
+            await self._download_sequential(document, file_path, journal)
+            return
+
+        self.logger.info("Downloading document %s (%s bytes): %s/%s parts of %s bytes over %s connection(s) to DC %s",
+                         document.id, file_size, len(missing_parts), part_count, self.part_size, len(senders), dc_id)
+
+        source = _FileSource(location, refresh_document)
+        queue: asyncio.Queue = asyncio.Queue()
+        for part in missing_parts:
+            queue.put_nowait(part)
+
+        fd = os.open(file_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, file_size)
+            tasks = [
+                asyncio.create_task(self._worker(sender, source, queue, fd, journal))
+                for sender in senders
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        finally:
+            os.close(fd)
+            if journal:
+                # Persist progress even when the download was interrupted
+                await journal.save()
+            await asyncio.gather(*(sender.disconnect() for sender in senders), return_exceptions=True)
+
+    async def _download_sequential(self, document, file_path: str, journal: Optional[DownloadJournal]) -> None:
+        if journal and journal.completed_parts:
+            # download_media rewrites the file from byte zero, so recorded progress no longer holds
+            journal.completed_parts.clear()
+            await journal.save()
+        await self.client.download_media(document, file_path)
+
+    async def _worker(self, sender: MTProtoSender, source: _FileSource, queue: asyncio.Queue, fd: int,
+                      journal: Optional[DownloadJournal]) -> None:
+        while True:
+            try:
+                part = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            offset = part * self.part_size
+            data = await self._fetch_part(sender, source, offset)
+            await asyncio.to_thread(os.pwrite, fd, data, offset)
+            if journal and journal.mark_done(part):
+                await journal.save()
+
+    async def _fetch_part(self, sender: MTProtoSender, source: _FileSource, offset: int, retries: int = 3) -> bytes:
+        for attempt in range(1, retries + 1):
+            generation = source.generation
+            try:
+                result = await sender.send(GetFileRequest(source.location, offset, self.part_size))
+                if not isinstance(result, UploadFile):
+                    raise RuntimeError(f"Unexpected getFile result {type(result).__name__}")
+                return result.bytes
+            except FileReferenceExpiredError:
+                if source.refresh is None or attempt == retries:
+                    raise
+                self.logger.info("File reference expired at offset %s, refreshing document (attempt %s/%s)",
+                                 offset, attempt, retries)
+                await source.renew(generation)
+            except (ConnectionError, asyncio.TimeoutError) as e:
+                if attempt == retries:
+                    raise
+                self.logger.warning("Part at offset %s failed (attempt %s/%s): %s", offset, attempt, retries, e)
+                await asyncio.sleep(attempt)
+
+    async def _create_senders(self, dc_id: int, count: int) -> List[MTProtoSender]:
+        # The session's own DC can reuse its auth key; other DCs need an exported authorization
+        auth_key = self.client.session.auth_key if dc_id == self.client.session.dc_id else None
+        senders = []
+        try:
+            for _ in range(count):
+                sender = await self._create_sender(dc_id, auth_key)
+                auth_key = sender.auth_key
+                senders.append(sender)
+        except Exception:
+            await asyncio.gather(*(sender.disconnect() for sender in senders), return_exceptions=True)
+            raise
+        return senders
+
+    async def _create_sender(self, dc_id: int, auth_key) -> MTProtoSender:
+        dc = await self.client._get_dc(dc_id)
+        sender = MTProtoSender(auth_key, loggers=self.client._log)
+        await sender.connect(self.client._connection(
+            dc.ip_address,
+            dc.port,
+            dc.id,
+            loggers=self.client._log,
+            proxy=self.client._proxy,
+            local_addr=self.client._local_addr
+        ))
+        if auth_key is None:
+            self.logger.debug("Exporting authorization for DC %s", dc_id)
+            auth = await self.client(ExportAuthorizationRequest(dc_id))
+            self.client._init_request.query = ImportAuthorizationRequest(id=auth.id, bytes=auth.bytes)
+            await sender.send(InvokeWithLayerRequest(LAYER, self.client._init_request))
+        return sender
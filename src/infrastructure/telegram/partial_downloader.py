@@ -0,0 +1,95 @@
+import asyncio
+import os
+from typing import List
+from telethon import TelegramClient
+from src.config.config import Config
+from src.infrastructure.media.mp4_index import ByteRange, plan_window_ranges
+
+MP4_MIME_TYPES = {'video/mp4', 'video/quicktime', 'video/x-m4v'}
+MIN_REQUEST_SIZE = 4 * 1024
+MAX_REQUEST_SIZE = 512 * 1024
+
+
+class PartialVideoDownloader:
+    """Downloads only the parts of an MP4 document needed to cut a time window.
+
+    The moov index is located with small offset-based requests (at the start or the end
+    of the file), the byte ranges covering the window are computed from the sample
+    tables, and just those ranges plus the header are written at their original offsets
+    into a sparse file that ffmpeg can read as if it were the whole video.
+    """
+
+    def __init__(self, client: TelegramClient):
+        self.client = client
+        self.logger = Config.get_logger('infrastructure.partial_downloader')
+
+    async def download_window(self, document, file_path: str, start_seconds: float, end_seconds: float) -> bool:
+        """Write the ranges for [start_seconds, end_seconds] into file_path.
+
+        Returns False, without touching the file, when the document can't be fetched
+        partially and a full download is needed instead.
+        """
+        mime_type = getattr(document, 'mime_type', None)
+        if mime_type not in MP4_MIME_TYPES:
+            self.logger.debug("Document %s has mime type %s, partial download not supported", document.id, mime_type)
+            return False
+
+        try:
+            ranges = await plan_window_ranges(
+                lambda offset, length: self.read(document, offset, length),
+                document.size, start_seconds, end_seconds, Config.TRIM_RANGE_MERGE_GAP
+            )
+        except Exception as e:
+            self.logger.info("Could not index document %s for partial download: %s", document.id, e)
+            return False
+
+        total_bytes = sum(end - start for start, end in ranges)
+        if total_bytes > document.size * Config.TRIM_RANGE_MAX_RATIO:
+            self.logger.debug("Window needs %s/%s bytes of document %s, downloading it whole",
+                              total_bytes, document.size, document.id)
+            return False
+
+        self.logger.info("Downloading %s of %s bytes (%s range(s)) of document %s for window %s-%ss",
+                         total_bytes, document.size, len(ranges), document.id, start_seconds, end_seconds)
+        await self._write_ranges(document, file_path, ranges)
+        return True
+
+    async def read(self, document, offset: int, length: int) -> bytes:
+        """Read `length` bytes at `offset`, issuing requests aligned as getFile requires"""
+        request_size = self._request_size(length)
+        aligned_offset = offset - offset % request_size
+        chunk_count = (offset + length - aligned_offset + request_size - 1) // request_size
+        data = bytearray()
+        async for chunk in self.client.iter_download(document, offset=aligned_offset,
+                                                     request_size=request_size, limit=chunk_count):
+            data += chunk
+        start = offset - aligned_offset
+        return bytes(data[start:start + length])
+
+    async def _write_ranges(self, document, file_path: str, ranges: List[ByteRange]) -> None:
+        fd = os.open(file_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        semaphore = asyncio.Semaphore(Config.DOWNLOAD_CONNECTIONS)
+        try:
+            # Unwritten regions stay as holes, so the file only takes the space of the ranges
+            os.ftruncate(fd, document.size)
+
+            async def write_range(start: int, end: int) -> None:
+                async with semaphore:
+                    aligned_start = start - start % MAX_REQUEST_SIZE
+                    chunk_count = (end - aligned_start + MAX_REQUEST_SIZE - 1) // MAX_REQUEST_SIZE
+                    position = aligned_start
+                    async for chunk in self.client.iter_download(document, offset=aligned_start,
+                                                                 request_size=MAX_REQUEST_SIZE, limit=chunk_count):
+                        await asyncio.to_thread(os.pwrite, fd, chunk, position)
+                        position += len(chunk)
+
+            await asyncio.gather(*(write_range(start, end) for start, end in ranges))
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _request_size(length: int) -> int:
+        size = MIN_REQUEST_SIZE
+        while size < length and size < MAX_REQUEST_SIZE:
+            size *= 2
+        return size
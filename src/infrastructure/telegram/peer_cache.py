@@ -0,0 +1,128 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterable, Optional
+from telethon import TelegramClient, utils
+from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser
+from src.config.config import Config
+
+
+class PeerCache:
+    """Persisted map from configured chat ids to the input peers Telegram expects.
+
+    Telethon has to turn a bare id or username into an input peer (with its access hash)
+    before every request, which after a restart can mean extra API calls or failures.
+    Resolved peers are kept here and on disk, so requests to known chats never need a
+    lookup and the first message after a restart is as fast as any other.
+    """
+
+    SAVE_DELAY = 2.0  # seconds to batch writes after a new peer is resolved
+
+    def __init__(self, client: TelegramClient, persist_path: Optional[str] = None):
+        self.client = client
+        self.persist_path = persist_path
+        self.peers: Dict[str, dict] = {}
+        self.save_task: Optional[asyncio.Task] = None
+        self.logger = Config.get_logger('infrastructure.peer_cache')
+
+        if self.persist_path:
+            self._load()
+
+    @staticmethod
+    def _key(chat_id) -> str:
+        # Chat ids may come from configuration as strings
+        try:
+            return str(int(chat_id))
+        except (TypeError, ValueError):
+            return str(chat_id).strip().lower()
+
+    def get(self, chat_id):
+        """Return the cached input peer for a chat, or None when it hasn't been resolved"""
+        entry = self.peers.get(self._key(chat_id))
+        if entry is None:
+            return None
+        if entry['type'] == 'channel':
+            return InputPeerChannel(entry['id'], entry['access_hash'])
+        if entry['type'] == 'user':
+            return InputPeerUser(entry['id'], entry['access_hash'])
+        return InputPeerChat(entry['id'])
+
+    async def resolve(self, chat_id):
+        """Return the input peer for a chat, asking Telegram only on a cache miss"""
+        peer = self.get(chat_id)
+        if peer is not None:
+            return peer
+        key = self._key(chat_id)
+        target = int(key) if key.lstrip('-').isdigit() else chat_id
+        peer = utils.get_input_peer(await self.client.get_input_entity(target))
+        self._store(key, peer)
+        return peer
+
+    async def warm_up(self, chat_ids: Iterable) -> Dict[str, float]:
+        """Resolve every configured chat once; returns the seconds each one took"""
+        timings = {}
+        for chat_id in dict.fromkeys(chat_id for chat_id in chat_ids if chat_id):
+            started = time.perf_counter()
+            try:
+                await self.resolve(chat_id)
+            except Exception as e:
+                self.logger.warning("Could not resolve chat %s during warm-up: %s", chat_id, e)
+                continue
+            timings[self._key(chat_id)] = time.perf_counter() - started
+        return timings
+
+    async def close(self) -> None:
+        """Write any pending changes to disk"""
+        if self.save_task and not self.save_task.done():
+            self.save_task.cancel()
+            await asyncio.gather(self.save_task, return_exceptions=True)
+            await self._save()
+
+    def _store(self, key: str, peer) -> None:
+        if isinstance(peer, InputPeerChannel):
+            entry = {'type': 'channel', 'id': peer.channel_id, 'access_hash': peer.access_hash}
+        elif isinstance(peer, InputPeerUser):
+            entry = {'type': 'user', 'id': peer.user_id, 'access_hash': peer.access_hash}
+        elif isinstance(peer, InputPeerChat):
+            entry = {'type': 'chat', 'id': peer.chat_id}
+        else:
+            # e.g. InputPeerSelf; nothing worth persisting
+            return
+        self.peers[key] = entry
+        self.logger.debug("Cached peer for chat %s (%s)", key, entry['type'])
+        self._schedule_save()
+
+    def _schedule_save(self) -> None:
+        if not self.persist_path or (self.save_task and not self.save_task.done()):
+            return
+        self.save_task = asyncio.get_running_loop().create_task(self._delayed_save())
+
+    async def _delayed_save(self) -> None:
+        await asyncio.sleep(self.SAVE_DELAY)
+        await self._save()
+
+    async def _save(self) -> None:
+        data = json.dumps(self.peers)
+
+        def write() -> None:
+            os.makedirs(os.path.dirname(self.persist_path) or '.', exist_ok=True)
+            tmp_path = self.persist_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.persist_path)
+
+        try:
+            await asyncio.to_thread(write)
+        except OSError as e:
+            self.logger.warning("Could not persist peer cache to %s: %s", self.persist_path, e)
+
+    def _load(self) -> None:
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                self.peers = json.load(f)
+            self.logger.info("Loaded %s cached peer(s) from %s", len(self.peers), self.persist_path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            self.logger.warning("Ignoring unreadable peer cache file %s: %s", self.persist_path, e)
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+from src.config.config import Config
+from src.domain.entities.video_message import VideoMessage
+from src.infrastructure.telegram.document_handles import document_to_handle, handle_to_document
+
+
+@dataclass
+class PendingApproval:
+    """A message the bot posted with approval buttons, waiting for a button press"""
+    chat_id: int
+    message_id: int
+    document: dict  # compact handle, see document_handles
+    video_duration: int
+    caption: Optional[str]
+    file_name: Optional[str]
+    created_at: float
+    album_message_ids: Optional[List[int]] = None  # album posted together with the buttons
+    album_documents: Optional[List[dict]] = None
+    category: Optional[str] = None  # route of the video, kept for the events recorded on approval
+
+    @property
+    def is_album(self) -> bool:
+        return bool(self.album_message_ids)
+
+    def album_documents_list(self) -> list:
+        return [handle_to_document(handle) for handle in self.album_documents or []]
+
+    def to_video_message(self) -> VideoMessage:
+        return VideoMessage(
+            message_id=self.message_id,
+            chat_id=self.chat_id,
+            video_duration=self.video_duration,
+            video_size=self.document['size'],
+            document=handle_to_document(self.document),
+            caption=self.caption,
+            file_name=self.file_name,
+            category=self.category
+        )
+
+
+class PendingApprovalStore:
+    """Index of the bot's own approval messages, keyed by (chat id, message id).
+
+    Filled when the buttons are posted so callbacks can resolve the video locally instead
+    of fetching the message back from Telegram. Entries expire after a TTL and the oldest
+    are dropped beyond a size cap. Optionally persisted so pending buttons survive restarts.
+    """
+
+    SAVE_DELAY = 2.0  # seconds; batches the writes of a burst of approvals
+
+    def __init__(self, ttl: Optional[int] = None, max_entries: Optional[int] = None,
+                 persist_path: Optional[str] = None):
+        self.ttl = ttl if ttl is not None else Config.PENDING_APPROVAL_TTL
+        self.max_entries = max_entries or Config.PENDING_APPROVAL_MAX_ENTRIES
+        self.persist_path = persist_path
+        self.entries: 'OrderedDict[str, PendingApproval]' = OrderedDict()
+        self.save_task: Optional[asyncio.Task] = None
+        self.logger = Config.get_logger('infrastructure.pending_approval_store')
+
+        if self.persist_path:
+            self._load()
+
+    @staticmethod
+    def _key(chat_id: int, message_id: int) -> str:
+        return f"{chat_id}:{message_id}"
+
+    def add(self, chat_id: int, message_id: int, document, video_message: VideoMessage) -> None:
+        key = self._key(chat_id, message_id)
+        self.entries[key] = PendingApproval(
+            chat_id=chat_id,
+            message_id=message_id,
+            document=document_to_handle(document, video_message.video_duration, video_message.file_name),
+            video_duration=video_message.video_duration,
+            caption=video_message.caption,
+            file_name=video_message.file_name,
+            created_at=time.time(),
+            category=video_message.category
+        )
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self.logger.debug("Tracking pending approval %s (%s pending)", key, len(self.entries))
+        self._schedule_save()
+
+    def add_album(self, chat_id: int, message_id: int, album_message_ids: List[int], documents: list,
+                  video_messages: List[VideoMessage]) -> None:
+        """Track an album approval: the buttons message plus the album messages it refers to"""
+        self.add(chat_id, message_id, documents[0], video_messages[0])
+        entry = self.entries[self._key(chat_id, message_id)]
+        entry.album_message_ids = list(album_message_ids)
+        entry.album_documents = [
+            document_to_handle(document, video_message.video_duration, video_message.file_name)
+            for document, video_message in zip(documents, video_messages)
+        ]
+
+    def get(self, chat_id: int, message_id: int) -> Optional[PendingApproval]:
+        key = self._key(chat_id, message_id)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry):
+            del self.entries[key]
+            self._schedule_save()
+            return None
+        return entry
+
+    def remove(self, chat_id: int, message_id: int) -> None:
+        if self.entries.pop(self._key(chat_id, message_id), None) is not None:
+            self._schedule_save()
+
+    async def close(self) -> None:
+        """Write any pending changes to disk"""
+        if self.save_task and not self.save_task.done():
+            self.save_task.cancel()
+            await asyncio.gather(self.save_task, return_exceptions=True)
+        if self.persist_path:
+            await self._save()
+
+    def _expired(self, entry: PendingApproval) -> bool:
+        return self.ttl > 0 and time.time() - entry.created_at > self.ttl
+
+    def _schedule_save(self) -> None:
+        if not self.persist_path or (self.save_task and not self.save_task.done()):
+            return
+        try:
+            self.save_task = asyncio.get_running_loop().create_task(self._delayed_save())
+        except RuntimeError:
+            # No running loop (e.g. during shutdown); close() writes the final state
+            pass
+
+    async def _delayed_save(self) -> None:
+        await asyncio.sleep(self.SAVE_DELAY)
+        await self._save()
+
+    async def _save(self) -> None:
+        data = json.dumps([asdict(entry) for entry in self.entries.values() if not self._expired(entry)])
+
+        def write() -> None:
+            os.makedirs(os.path.dirname(self.persist_path) or '.', exist_ok=True)
+            tmp_path = self.persist_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.persist_path)
+
+        try:
+            await asyncio.to_thread(write)
+        except OSError as e:
+            self.logger.warning("Could not persist pending approvals to %s: %s", self.persist_path, e)
+
+    def _load(self) -> None:
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+            for item in items:
+                entry = PendingApproval(**item)
+                if not self._expired(entry):
+                    self.entries[self._key(entry.chat_id, entry.message_id)] = entry
+            self.logger.info("Loaded %s pending approval(s) from %s", len(self.entries), self.persist_path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            self.logger.warning("Ignoring unreadable pending approvals file %s: %s", self.persist_path, e)
@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import tempfile
+from telethon import TelegramClient, helpers
+from telethon.tl.functions.upload import SaveFilePartRequest
+from telethon.tl.types import InputFile
+from src.config.config import Config
+from src.infrastructure.metrics.registry import metrics
+from src.infrastructure.media.mp4_index import scan_top_level_boxes
+from src.infrastructure.media.video_trimmer import VideoTrimmer
+from src.infrastructure.telegram.partial_downloader import MP4_MIME_TYPES, PartialVideoDownloader
+
+STREAMABLE_MIME_TYPES = {'video/x-matroska', 'video/webm'}
+DOWNLOAD_CHUNK_SIZE = 512 * 1024
+UPLOAD_PART_SIZE = 512 * 1024
+# Telegram only accepts upload.saveFilePart uploads up to 10 MB
+SMALL_FILE_LIMIT = 10 * 1024 * 1024
+
+
+class StreamingTrimPipeline:
+    """Trims a video while it is still downloading and uploads the clip while it is encoded.
+
+    Downloaded chunks are piped into ffmpeg's stdin, ffmpeg writes a fragmented MP4 to
+    stdout, and each output part is uploaded as soon as it is complete. ffmpeg stops
+    reading once the window is encoded, so the rest of the video is never downloaded.
+    """
+
+    def __init__(self, client: TelegramClient, partial_downloader: PartialVideoDownloader, trimmer: VideoTrimmer):
+        self.client = client
+        self.partial_downloader = partial_downloader
+        self.trimmer = trimmer
+        self.logger = Config.get_logger('infrastructure.streaming_trim_pipeline')
+
+    async def is_streamable(self, document) -> bool:
+        """Whether ffmpeg can demux the document from a pipe (MP4 needs its moov before mdat)"""
+        mime_type = getattr(document, 'mime_type', None)
+        if mime_type in STREAMABLE_MIME_TYPES:
+            return True
+        if mime_type not in MP4_MIME_TYPES:
+            return False
+        try:
+            boxes = await scan_top_level_boxes(
+                lambda offset, length: self.partial_downloader.read(document, offset, length),
+                document.size, b'moov'
+            )
+        except Exception as e:
+            self.logger.debug("Could not inspect layout of document %s: %s", document.id, e)
+            return False
+        return all(box_type != b'mdat' for box_type, _, _ in boxes)
+
+    async def run(self, document, start_time: float, duration: float, file_name: str):
+        """Run the pipeline and return the uploaded clip as an input file ready to send"""
+        async with self.trimmer.transcode_slot(label=f"stream-{document.id}") as threads:
+            ffmpeg_cmd = VideoTrimmer.streaming_command(start_time, duration, threads)
+            self.logger.debug("Running streaming ffmpeg command: %s", ' '.join(ffmpeg_cmd))
+            process = await asyncio.create_subprocess_exec(
+                *ffmpeg_cmd,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+
+            feed_task = asyncio.create_task(self._feed(document, process.stdin))
+            stderr_task = asyncio.create_task(process.stderr.read())
+            try:
+                # Download, encode and upload overlap, so they are timed as one stage
+                with metrics.timer('stream_trim'):
+                    uploaded_file = await self._upload(process.stdout, file_name)
+                    returncode = await process.wait()
+            except BaseException:
+                if process.returncode is None:
+                    process.kill()
+                raise
+            finally:
+                # ffmpeg exits once the window is encoded; the rest of the video isn't needed
+                feed_task.cancel()
+                await asyncio.gather(feed_task, return_exceptions=True)
+                stderr = await stderr_task
+
+        if returncode != 0:
+            error_msg = stderr.decode(errors='ignore') if stderr else "Unknown ffmpeg error"
+            self.logger.error("Streaming ffmpeg failed with return code %s: %s", returncode, error_msg)
+            raise Exception(f"Video trimming failed: {error_msg}")
+        return uploaded_file
+
+    async def _feed(self, document, stdin: asyncio.StreamWriter) -> None:
+        fed_bytes = 0
+        try:
+            async for chunk in self.client.iter_download(document, request_size=DOWNLOAD_CHUNK_SIZE):
+                stdin.write(chunk)
+                await stdin.drain()
+                fed_bytes += len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.logger.debug("Fed %s/%s bytes of document %s to ffmpeg", fed_bytes, document.size, document.id)
+            if not stdin.is_closing():
+                stdin.close()
+
+    async def _upload(self, stdout: asyncio.StreamReader, file_name: str):
+        """Upload ffmpeg's output in parts as it is produced.
+
+        Clips beyond the small-file limit can't be streamed with saveFilePart; they are
+        spooled and uploaded whole once ffmpeg finishes.
+        """
+        file_id = helpers.generate_random_long()
+        md5 = hashlib.md5()
+        part_index = 0
+        total_bytes = 0
+        streaming = True
+
+        with tempfile.SpooledTemporaryFile(max_size=SMALL_FILE_LIMIT) as spool:
+            while True:
+                try:
+                    part = await stdout.readexactly(UPLOAD_PART_SIZE)
+                except asyncio.IncompleteReadError as e:
+                    part = e.partial
+                if not part:
+                    break
+
+                total_bytes += len(part)
+                spool.write(part)
+                if streaming and total_bytes > SMALL_FILE_LIMIT:
+                    self.logger.info("Clip exceeds %s bytes, finishing upload after encoding", SMALL_FILE_LIMIT)
+                    streaming = False
+                if streaming:
+                    md5.update(part)
+                    await self.client(SaveFilePartRequest(file_id, part_index, part))
+                    part_index += 1
+                if len(part) < UPLOAD_PART_SIZE:
+                    break
+
+            if streaming:
+                self.logger.debug("Streamed %s bytes in %s part(s)", total_bytes, part_index)
+                return InputFile(file_id, part_index, file_name, md5.hexdigest())
+
+            spool.seek(0)
+            return await self.client.upload_file(spool, file_name=file_name, file_size=total_bytes)
@@ -1,211 +1,568 @@
-from typing import List
+from typing import AsyncIterator, List, Optional, Tuple
 from telethon import TelegramClient
-from telethon.tl.types import Message as TLMessage, DocumentAttributeVideo
+from telethon.tl.functions.channels import GetFullChannelRequest
+from telethon.tl.types import Message as TLMessage, DocumentAttributeVideo, InputPeerChannel
 from telethon.tl.custom import Button
 import asyncio
+import contextlib
 import os
 import tempfile
+import time
+from src.domain.entities.clip_spec import CLIP_GIF, CLIP_THUMBNAIL, CLIP_VIDEO, ClipSpec
 from src.domain.entities.video_message import VideoMessage
 from src.domain.repositories.message_repository import MessageRepository
+from src.infrastructure.media.video_trimmer import VideoTrimmer
+from src.infrastructure.media.transcode_scheduler import TranscodeScheduler
+from src.infrastructure.media.trim_cache import TrimCache
+from src.infrastructure.metrics.registry import metrics
+from src.infrastructure.telegram.outbound_scheduler import OutboundScheduler, PRIORITY_BULK
+from src.infrastructure.telegram.message_mapper import to_video_message
+from src.infrastructure.telegram.partial_downloader import PartialVideoDownloader
+from src.infrastructure.telegram.peer_cache import PeerCache
+from src.infrastructure.telegram.pending_approval_store import PendingApprovalStore
+from src.infrastructure.telegram.streaming_trim_pipeline import StreamingTrimPipeline
 from src.config.config import Config
 
 class TelegramMessageRepository(MessageRepository):
-    def __init__(self, client: TelegramClient):
+    def __init__(self, client: TelegramClient, transcode_scheduler: Optional[TranscodeScheduler] = None,
+                 trim_cache: Optional[TrimCache] = None, pending_approvals: Optional[PendingApprovalStore] = None,
+                 outbound: Optional[OutboundScheduler] = None, peer_cache: Optional[PeerCache] = None):
         self.client = client
+        self.peer_cache = peer_cache
+        self.outbound = outbound or OutboundScheduler()
+        self.trim_cache = trim_cache
+        self.pending_approvals = pending_approvals
+        self.trimmer = VideoTrimmer(scheduler=transcode_scheduler)
+        self.partial_downloader = PartialVideoDownloader(client)
+        self.streaming_pipeline = StreamingTrimPipeline(client, self.partial_downloader, self.trimmer)
         self.logger = Config.get_logger('infrastructure.telegram_message_repository')
 
+    async def _peer(self, chat_id):
+        """Input peer for a chat from the peer cache, so Telethon doesn't have to resolve it"""
+        if self.peer_cache is None:
+            return chat_id
+        return await self.peer_cache.resolve(chat_id)
+
     async def get_messages_from_group(self, group_id: int) -> List[VideoMessage]:
-        self.logger.debug(f"Retrieving messages from group {group_id}")
+        self.logger.debug("Retrieving messages from group %s", group_id)
         messages = []
         try:
-            async for message in self.client.iter_messages(group_id, limit=10):  # adjust limit
-                if message.video:
-                    video_attr = next((attr for attr in message.document.attributes if isinstance(attr, DocumentAttributeVideo)), None)
-                    if video_attr:
-                        video_message = VideoMessage(
-                            message_id=message.id,
-                            chat_id=message.chat_id,
-                            video_duration=video_attr.duration,
-                            video_size=message.document.size,
-                            document=message.document,
-                            caption=message.text
-                        )
-                        messages.append(video_message)
-                        self.logger.debug(f"Found video message {message.id} with duration {video_attr.duration}s")
-            self.logger.info(f"Retrieved {len(messages)} video messages from group {group_id}")
+            async for message in self.client.iter_messages(await self._peer(group_id), limit=10):  # adjust limit
+                video_message = to_video_message(message)
+                if video_message:
+                    messages.append(video_message)
+                    self.logger.debug("Found video message %s with duration %ss",
+                                      message.id, video_message.video_duration)
+            self.logger.info("Retrieved %s video messages from group %s", len(messages), group_id)
         except Exception as e:
-            self.logger.error(f"Error retrieving messages from group {group_id}: {str(e)}", exc_info=True)
+            self.logger.error("Error retrieving messages from group %s: %s", group_id, e, exc_info=True)
             raise
         return messages
 
+    async def iter_messages_since(self, group_id: int, min_id: int, batch_size: int) -> AsyncIterator[list]:
+        """Stream every message after min_id, oldest first, in batches.
+
+        Bot accounts can't read the chat history (messages.getHistory), only fetch messages by
+        id, so the ids after min_id are requested in windows of batch_size. Deleted ids come back
+        empty; the walk goes on up to the latest id known and stops at the first empty window past it.
+        """
+        peer = await self._peer(group_id)
+        latest_id = await self._latest_message_id(peer)
+        self.logger.debug("Streaming messages from group %s after message %s (latest known %s)",
+                          group_id, min_id, latest_id)
+        next_id = min_id + 1
+        while True:
+            window = list(range(next_id, next_id + batch_size))
+            next_id += batch_size
+            batch = [message for message in await self.client.get_messages(peer, ids=window) if message]
+            if batch:
+                yield batch
+            elif next_id > latest_id:
+                return
+
+    async def _latest_message_id(self, peer) -> int:
+        """Highest message id the chat reports as read, 0 when unknown (only channels report one)"""
+        if not isinstance(peer, InputPeerChannel):
+            return 0
+        try:
+            full = await self.client(GetFullChannelRequest(peer))
+        except Exception as e:
+            self.logger.debug("Could not read the latest message id of %s: %s", peer.channel_id, e)
+            return 0
+        return max(full.full_chat.read_inbox_max_id or 0, full.full_chat.read_outbox_max_id or 0)
+
     async def forward_message(self, message: VideoMessage, destination_chat_id: str) -> None:
-        self.logger.debug(f"Forwarding message {message.message_id} from chat {message.chat_id} to {destination_chat_id}")
+        self.logger.debug("Forwarding message %s from chat %s to %s",
+                          message.message_id, message.chat_id, destination_chat_id)
         try:
             # Enviar el archivo sin caption en lugar de reenviar
-            await self.client.send_message(destination_chat_id, file=message.document)
-            self.logger.info(f"Message {message.message_id} sent successfully to {destination_chat_id} without caption")
+            peer = await self._peer(destination_chat_id)
+            await self.outbound.call(destination_chat_id,
+                                     lambda: self.client.send_message(peer, file=message.document),
+                                     PRIORITY_BULK, 'forward')
+            self.logger.info("Message %s sent successfully to %s without caption",
+                             message.message_id, destination_chat_id)
         except Exception as e:
-            self.logger.error(f"Failed to send message {message.message_id} to {destination_chat_id}: {str(e)}", exc_info=True)
+            self.logger.error("Failed to send message %s to %s: %s",
+                              message.message_id, destination_chat_id, e, exc_info=True)
             raise
 
     async def send_message_with_buttons(self, message: VideoMessage, destination_chat_id: str, alert_text: str) -> None:
-        self.logger.debug(f"Sending message with buttons for video {message.message_id} to {destination_chat_id}")
+        self.logger.debug("Sending message with buttons for video %s to %s", message.message_id, destination_chat_id)
         try:
             buttons = [
                 [Button.inline('Enviar', 'send'), Button.inline('Borrar', 'delete')]
             ]
-            await self.client.send_message(destination_chat_id, message.caption or alert_text, buttons=buttons, file=message.document)
-            self.logger.info(f"Message with buttons sent successfully for video {message.message_id} to {destination_chat_id}")
+            with metrics.timer('send_buttons'):
+                peer = await self._peer(destination_chat_id)
+                sent = await self.outbound.call(
+                    destination_chat_id,
+                    lambda: self.client.send_message(peer, self._approval_text(message, alert_text), buttons=buttons,
+                                                     file=message.document),
+                    PRIORITY_BULK, 'approval'
+                )
+            self._track_pending_approval(sent, message)
+            self.logger.info("Message with buttons sent successfully for video %s to %s",
+                             message.message_id, destination_chat_id)
         except Exception as e:
-            self.logger.error(f"Failed to send message with buttons for video {message.message_id} to {destination_chat_id}: {str(e)}", exc_info=True)
+            self.logger.error("Failed to send message with buttons for video %s to %s: %s",
+                              message.message_id, destination_chat_id, e, exc_info=True)
             raise
 
     async def send_medium_video_with_buttons(self, message: VideoMessage, destination_chat_id: str, alert_text: str) -> None:
-        self.logger.debug(f"Sending medium video with buttons for video {message.message_id} to {destination_chat_id}")
+        self.logger.debug("Sending medium video with buttons for video %s to %s",
+                          message.message_id, destination_chat_id)
         try:
             buttons = [
                 [Button.inline('Enviar', 'send'), Button.inline('Borrar', 'delete')],
                 [Button.inline('✂️ Recortar 10s', 'trim_10s')]
             ]
-            await self.client.send_message(destination_chat_id, message.caption or alert_text, buttons=buttons, file=message.document)
-            self.logger.info(f"Medium video message with buttons sent successfully for video {message.message_id} to {destination_chat_id}")
+            with metrics.timer('send_buttons'):
+                peer = await self._peer(destination_chat_id)
+                sent = await self.outbound.call(
+                    destination_chat_id,
+                    lambda: self.client.send_message(peer, self._approval_text(message, alert_text), buttons=buttons,
+                                                     file=message.document),
+                    PRIORITY_BULK, 'approval'
+                )
+            self._track_pending_approval(sent, message)
+            self.logger.info("Medium video message with buttons sent successfully for video %s to %s",
+                             message.message_id, destination_chat_id)
+        except Exception as e:
+            self.logger.error("Failed to send medium video message with buttons for video %s to %s: %s",
+                              message.message_id, destination_chat_id, e, exc_info=True)
+            raise
+
+    @staticmethod
+    def _approval_text(message: VideoMessage, alert_text: str) -> str:
+        """Text of an approval message, led by the possible-duplicate warning if there is one"""
+        text = message.caption or alert_text
+        return f"{message.duplicate_warning}\n\n{text}" if message.duplicate_warning else text
+
+    async def send_album_with_buttons(self, messages: List[VideoMessage], destination_chat_id: str, alert_text: str) -> None:
+        """Post the videos as one album plus a single approval message replying to it.
+        Telegram albums can't carry inline buttons, so the buttons go on the reply."""
+        album_id = messages[0].grouped_id
+        self.logger.debug("Sending album %s (%s videos) with buttons to %s",
+                          album_id, len(messages), destination_chat_id)
+        try:
+            peer = await self._peer(destination_chat_id)
+            with metrics.timer('send_buttons'):
+                sent = await self.outbound.call(destination_chat_id, lambda: self.client.send_file(
+                    peer,
+                    [message.document for message in messages],
+                    caption=[message.caption or '' for message in messages]
+                ), PRIORITY_BULK, 'album')
+                buttons = [
+                    [Button.inline('Enviar álbum', 'send_album'), Button.inline('Borrar álbum', 'delete_album')]
+                ]
+                warnings = [message.duplicate_warning for message in messages if message.duplicate_warning]
+                prompt_text = "\n".join([*warnings, alert_text]) if warnings else alert_text
+                prompt = await self.outbound.call(
+                    destination_chat_id,
+                    lambda: self.client.send_message(peer, prompt_text, buttons=buttons, reply_to=sent[0].id),
+                    PRIORITY_BULK, 'album approval'
+                )
+            if self.pending_approvals is not None:
+                self.pending_approvals.add_album(
+                    prompt.chat_id, prompt.id, [item.id for item in sent],
+                    [item.document or message.document for item, message in zip(sent, messages)], messages
+                )
+            self.logger.info("Album %s with buttons sent successfully to %s", album_id, destination_chat_id)
         except Exception as e:
-            self.logger.error(f"Failed to send medium video message with buttons for video {message.message_id} to {destination_chat_id}: {str(e)}", exc_info=True)
+            self.logger.error("Failed to send album %s with buttons to %s: %s",
+                              album_id, destination_chat_id, e, exc_info=True)
             raise
 
+    def _track_pending_approval(self, sent: TLMessage, message: VideoMessage) -> None:
+        """Remember the approval message so its button callbacks can resolve the video locally"""
+        if self.pending_approvals is None or sent is None:
+            return
+        self.pending_approvals.add(sent.chat_id, sent.id, sent.document or message.document, message)
+
     async def delete_message(self, message: VideoMessage) -> None:
-        self.logger.debug(f"Deleting message {message.message_id} from chat {message.chat_id}")
+        self.logger.debug("Deleting message %s from chat %s", message.message_id, message.chat_id)
         try:
-            await self.client.delete_messages(message.chat_id, message.message_id)
-            self.logger.info(f"Message {message.message_id} deleted successfully from chat {message.chat_id}")
+            # Deletes don't post messages, so they only count against the global limit
+            peer = await self._peer(message.chat_id)
+            with metrics.timer('delete'):
+                await self.outbound.call(None, lambda: self.client.delete_messages(peer, message.message_id),
+                                         PRIORITY_BULK, 'delete')
+            self.logger.info("Message %s deleted successfully from chat %s", message.message_id, message.chat_id)
         except Exception as e:
-            self.logger.error(f"Failed to delete message {message.message_id} from chat {message.chat_id}: {str(e)}", exc_info=True)
+            self.logger.error("Failed to delete message %s from chat %s: %s",
+                              message.message_id, message.chat_id, e, exc_info=True)
             raise
 
+    async def delete_messages(self, messages: List[VideoMessage]) -> None:
+        """Delete several messages with one request per chat"""
+        message_ids_by_chat = {}
+        for message in messages:
+            message_ids_by_chat.setdefault(message.chat_id, []).append(message.message_id)
+        for chat_id, message_ids in message_ids_by_chat.items():
+            self.logger.debug("Deleting %s message(s) from chat %s", len(message_ids), chat_id)
+            try:
+                peer = await self._peer(chat_id)
+                with metrics.timer('delete'):
+                    await self.outbound.call(None, lambda: self.client.delete_messages(peer, message_ids),
+                                             PRIORITY_BULK, 'delete')
+                self.logger.info("Messages %s deleted successfully from chat %s", message_ids, chat_id)
+            except Exception as e:
+                self.logger.error("Failed to delete messages %s from chat %s: %s",
+                                  message_ids, chat_id, e, exc_info=True)
+                raise
+
     async def send_message(self, chat_id: int, text: str, file=None) -> None:
-        self.logger.debug(f"Sending message to chat {chat_id}")
+        self.logger.debug("Sending message to chat %s", chat_id)
         try:
-            await self.client.send_message(chat_id, text, file=file)
-            self.logger.debug(f"Message sent successfully to chat {chat_id}")
+            peer = await self._peer(chat_id)
+            await self.outbound.call(chat_id, lambda: self.client.send_message(peer, text, file=file),
+                                     PRIORITY_BULK, 'message')
+            self.logger.debug("Message sent successfully to chat %s", chat_id)
         except Exception as e:
-            self.logger.error(f"Failed to send message to chat {chat_id}: {str(e)}", exc_info=True)
+            self.logger.error("Failed to send message to chat %s: %s", chat_id, e, exc_info=True)
             raise
 
-    async def send_reply(self, chat_id: int, text: str, reply_to_message_id: int) -> None:
-        self.logger.debug(f"Sending reply to message {reply_to_message_id} in chat {chat_id}")
+    async def send_reply(self, chat_id: int, text: str, reply_to_message_id: int, file=None) -> None:
+        self.logger.debug("Sending reply to message %s in chat %s", reply_to_message_id, chat_id)
         try:
-            await self.client.send_message(chat_id, text, reply_to=reply_to_message_id)
-            self.logger.debug(f"Reply sent successfully to chat {chat_id}")
+            peer = await self._peer(chat_id)
+            await self.outbound.call(chat_id, lambda: self.client.send_message(peer, text, reply_to=reply_to_message_id, file=file),
+                                     PRIORITY_BULK, 'reply')
+            self.logger.debug("Reply sent successfully to chat %s", chat_id)
         except Exception as e:
-            self.logger.error(f"Failed to send reply to chat {chat_id}: {str(e)}", exc_info=True)
+            self.logger.error("Failed to send reply to chat %s: %s", chat_id, e, exc_info=True)
             raise
 
     async def edit_message_caption(self, message: VideoMessage, new_caption: str) -> None:
-        self.logger.debug(f"Editing caption of message {message.message_id} in chat {message.chat_id}")
+        self.logger.debug("Editing caption of message %s in chat %s", message.message_id, message.chat_id)
         try:
-            await self.client.edit_message(message.chat_id, message.message_id, text=new_caption)
-            self.logger.info(f"Caption of message {message.message_id} edited successfully")
+            peer = await self._peer(message.chat_id)
+            await self.outbound.call(None, lambda: self.client.edit_message(peer, message.message_id, text=new_caption),
+                                     PRIORITY_BULK, 'edit')
+            self.logger.info("Caption of message %s edited successfully", message.message_id)
         except Exception as e:
-            self.logger.error(f"Failed to edit caption of message {message.message_id}: {str(e)}", exc_info=True)
+            self.logger.error("Failed to edit caption of message %s: %s", message.message_id, e, exc_info=True)
             raise
 
     async def trim_and_send_video(self, message: VideoMessage, destination_chat_id: list[int], trim_duration: int = 10) -> None:
         """Trim video to specified duration from the center and send to destination"""
-        self.logger.debug(f"Trimming video {message.message_id} to {trim_duration} seconds and sending to {destination_chat_id}")
-        
-        temp_input_path = None
-        temp_output_path = None
-        
+        await self.send_clips(message, destination_chat_id, [ClipSpec(CLIP_VIDEO, trim_duration)])
+
+    async def send_clips(self, message: VideoMessage, destination_chat_id: list[int], specs: List[ClipSpec]) -> None:
+        """Produce every output in specs (clips, GIFs, still frames) and send each one to the destinations.
+
+        Outputs already sent or cached are reused. The rest come out of a single ffmpeg
+        decode of the window they span; a lone video clip keeps the stream-copy and
+        streaming paths. The outputs are then uploaded and sent concurrently.
+        """
+        self.logger.debug("Producing %s clip(s) of video %s for %s", len(specs), message.message_id, destination_chat_id)
+
+        temp_paths = []
+        trim_started = time.perf_counter()
+
         try:
-            # Create temporary files
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_input:
-                temp_input_path = temp_input.name
-            with tempfile.NamedTemporaryFile(delete=False, suffix="_trimmed.mp4") as temp_output:
-                temp_output_path = temp_output.name
-
-            # Download the video
-            self.logger.debug(f"Downloading video {message.message_id} to {temp_input_path}")
-            await self.client.download_file(message.document, temp_input_path)
-            
-            # Calculate start time from center
-            start_time = max(0, (message.video_duration - trim_duration) // 2)
-            
-            # Use ffmpeg to trim the video - optimized for speed
-            ffmpeg_cmd = [
-                "ffmpeg", "-i", temp_input_path,
-                "-ss", str(start_time),
-                "-t", str(trim_duration),
-                "-c:v", "libx264",  # Fast H264 encoding
-                "-preset", "ultrafast",  # Fastest preset
-                "-crf", "28",  # Good quality/speed balance
-                "-c:a", "aac",  # Fast AAC audio
-                "-b:a", "96k",  # Low audio bitrate for speed
-                "-movflags", "+faststart",  # Optimize for web playback
-                "-avoid_negative_ts", "make_zero",
-                "-threads", "0",  # Use all available CPU threads
-                temp_output_path, "-y"
-            ]
-            
-            self.logger.debug(f"Running ffmpeg command: {' '.join(ffmpeg_cmd)}")
-            process = await asyncio.create_subprocess_exec(
-                *ffmpeg_cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode != 0:
-                error_msg = stderr.decode() if stderr else "Unknown ffmpeg error"
-                self.logger.error(f"FFmpeg failed with return code {process.returncode}: {error_msg}")
-                raise Exception(f"Video trimming failed: {error_msg}")
-                
-            # Send the trimmed video to multiple chats with error handling
-            caption = f"🎬 Video recortado ({trim_duration}s desde el centro)"
-            
-            send_results = []
-            successful_sends = 0
-            
-            for i, destination in enumerate(destination_chat_id, 1):
-                try:
-                    self.logger.debug(f"Sending trimmed video to chat {i}/{len(destination_chat_id)}: {destination}")
-                    
-                    # Validate chat ID format
-                    try:
-                        chat_id_int = int(destination)
-                    except ValueError:
-                        raise Exception(f"Invalid chat ID format: {destination}")
-                    
-                    await self.client.send_file(chat_id_int, temp_output_path, caption=caption)
-                    send_results.append(f"✅ Chat {destination}: OK")
-                    successful_sends += 1
-                    self.logger.debug(f"Sent to chat {destination} successfully")
-                    
-                except Exception as e:
-                    error_type = type(e).__name__
-                    self.logger.error(f"Failed to send to chat {destination}: {error_type} - {str(e)}")
-                    send_results.append(f"❌ Chat {destination}: {error_type}")
-                    
+            clips = [(spec, spec.start_time(message.video_duration)) for spec in specs]
+            single_clip = len(specs) == 1 and specs[0].kind == CLIP_VIDEO
+            keys = [TrimCache.make_key(message.document.id, start_time, spec.duration,
+                                       self._clip_signature(spec, single_clip))
+                    for spec, start_time in clips]
+
+            # A second request for the same clips waits here and then reuses the first one's results
+            async with self._trim_flights(keys):
+                outcomes = [None] * len(clips)  # index -> (send results, successful sends)
+
+                # Reuse the Telegram media of clips that were already sent
+                async def reuse_media(index: int) -> None:
+                    spec, _ = clips[index]
+                    cached_media = self.trim_cache.get_media(keys[index])
+                    if cached_media is None:
+                        return
+                    self.logger.info("Reusing already uploaded %s for video %s", spec.kind, message.message_id)
+                    send_results, successful_sends, _ = await self._fan_out(
+                        cached_media, destination_chat_id, spec.caption(), self._clip_file_options(message, spec)
+                    )
+                    if successful_sends:
+                        outcomes[index] = (send_results, successful_sends)
+                    else:
+                        await self.trim_cache.forget_media(keys[index])
+
+                if self.trim_cache:
+                    await asyncio.gather(*(reuse_media(index) for index in range(len(clips))))
+
+                media_files = {}
+                for index, outcome in enumerate(outcomes):
+                    if outcome is None and self.trim_cache:
+                        cached_file = self.trim_cache.get_file(keys[index])
+                        if cached_file:
+                            self.logger.info("Reusing cached clip %s for video %s", cached_file, message.message_id)
+                            media_files[index] = cached_file
+
+                missing = [index for index, outcome in enumerate(outcomes) if outcome is None and index not in media_files]
+                if missing:
+                    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_input:
+                        temp_input_path = temp_input.name
+                    temp_paths.append(temp_input_path)
+                    outputs = []
+                    for index in missing:
+                        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_trimmed{clips[index][0].suffix}") as temp_output:
+                            outputs.append(temp_output.name)
+                    temp_paths.extend(outputs)
+
+                    if single_clip:
+                        spec, start_time = clips[missing[0]]
+                        produced = [await self._produce_clip(message, start_time, spec.duration, temp_input_path, outputs[0])]
+                    else:
+                        produced = await self._produce_clips(
+                            message, [clips[index] + (output,) for index, output in zip(missing, outputs)], temp_input_path
+                        )
+                    for index, media_file in zip(missing, produced):
+                        if isinstance(media_file, str) and self.trim_cache:
+                            media_file = await self.trim_cache.put_file(keys[index], media_file)
+                        media_files[index] = media_file
+
+                # Upload each output once; every destination reuses the same uploaded file
+                async def deliver(index: int) -> None:
+                    spec, _ = clips[index]
+                    media_file = media_files[index]
+                    if isinstance(media_file, str):
+                        self.logger.debug("Uploading %s %s", spec.kind, media_file)
+                        upload_size = os.path.getsize(media_file)
+                        upload_started = time.perf_counter()
+                        with metrics.timer('upload'):
+                            media_file = await self.client.upload_file(
+                                media_file, file_name=f"{message.document.id}_trimmed{spec.suffix}"
+                            )
+                        metrics.record_transfer('upload', upload_size, time.perf_counter() - upload_started)
+
+                    with metrics.timer('send_clip'):
+                        send_results, successful_sends, sent_media = await self._fan_out(
+                            media_file, destination_chat_id, spec.caption(), self._clip_file_options(message, spec)
+                        )
+                    outcomes[index] = (send_results, successful_sends)
+                    # Photos can't be resent as documents, so only documents are remembered
+                    if getattr(sent_media, 'document', None) is not None:
+                        sent_documents[index] = sent_media.document
+
+                sent_documents = {}
+                # Every delivery runs to the end, even after one fails, so none is still reading its
+                # temp clip when the files are removed and the ones that went through get cached
+                delivered = await asyncio.gather(*(deliver(index) for index in media_files), return_exceptions=True)
+
+                # Cache updates one at a time once everything is sent; a failure here doesn't undo a send
+                if self.trim_cache:
+                    for index, document in sent_documents.items():
+                        try:
+                            await self.trim_cache.put_media(keys[index], document)
+                        except Exception as e:
+                            self.logger.warning("Could not cache sent %s of video %s: %s",
+                                                clips[index][0].kind, message.message_id, e)
+                for result in delivered:
+                    if isinstance(result, BaseException):
+                        raise result
+
             # Log results
-            self.logger.info(f"Send results: {successful_sends}/{len(destination_chat_id)} chats successful")
-            for result in send_results:
-                self.logger.info(f"  {result}")
-            
+            successful_sends = 0
+            for (spec, _), (send_results, sends) in zip(clips, outcomes):
+                self.logger.info("Send results for %s: %s/%s chats successful",
+                                 spec.caption(), sends, len(destination_chat_id))
+                for result in send_results:
+                    self.logger.info("  %s", result)
+                successful_sends += sends
+
             # Warn if no sends were successful
             if successful_sends == 0:
                 raise Exception(f"Failed to send video to any of the {len(destination_chat_id)} destination chats")
 
-            self.logger.info(f"Trimmed video sent successfully to {successful_sends} chat(s)")
-            
+            self.logger.info("%s clip(s) sent successfully to %s chat(s)", len(clips), len(destination_chat_id))
+
         except Exception as e:
-            self.logger.error(f"Failed to trim and send video {message.message_id}: {str(e)}", exc_info=True)
+            metrics.inc('errors_total', stage='trim_total')
+            self.logger.error("Failed to trim and send video %s: %s", message.message_id, e, exc_info=True)
             raise
         finally:
+            metrics.observe('stage_duration_seconds', time.perf_counter() - trim_started, stage='trim_total')
             # Clean up temporary files
-            for temp_path in [temp_input_path, temp_output_path]:
+            for temp_path in temp_paths:
                 if temp_path and os.path.exists(temp_path):
                     try:
                         os.unlink(temp_path)
-                        self.logger.debug(f"Cleaned up temporary file: {temp_path}")
+                        self.logger.debug("Cleaned up temporary file: %s", temp_path)
                     except Exception as e:
-                        self.logger.warning(f"Failed to clean up temporary file {temp_path}: {str(e)}")
\ No newline at end of file
+                        self.logger.warning("Failed to clean up temporary file %s: %s", temp_path, e)
+
+    async def _produce_clip(self, message: VideoMessage, start_time: float, trim_duration: int,
+                            temp_input_path: str, temp_output_path: str):
+        """Cut the clip and return either the local output path or an already uploaded input file"""
+        # Download only the byte ranges covering the window when the MP4 index allows it
+        window_downloaded = False
+        if Config.TRIM_RANGE_DOWNLOAD:
+            window_end = start_time + trim_duration + Config.TRIM_KEYFRAME_WINDOW
+            with metrics.timer('range_download'):
+                window_downloaded = await self.partial_downloader.download_window(
+                    message.document, temp_input_path, start_time, window_end
+                )
+
+        # Otherwise stream the download through ffmpeg and upload while encoding,
+        # falling back to a full download when the container can't be read from a pipe
+        if window_downloaded:
+            await self.trimmer.trim(temp_input_path, temp_output_path, start_time, trim_duration)
+        elif Config.TRIM_STREAMING and await self.streaming_pipeline.is_streamable(message.document):
+            self.logger.debug("Streaming video %s through ffmpeg", message.message_id)
+            return await self.streaming_pipeline.run(
+                message.document, start_time, trim_duration, f"{message.document.id}_trimmed.mp4"
+            )
+        else:
+            self.logger.debug("Downloading video %s to %s", message.message_id, temp_input_path)
+            download_started = time.perf_counter()
+            with metrics.timer('download'):
+                await self.client.download_file(message.document, temp_input_path)
+            metrics.record_transfer('download', message.document.size, time.perf_counter() - download_started)
+            # Trim with ffmpeg: keyframe stream copy or fast re-encode depending on TRIM_MODE
+            await self.trimmer.trim(temp_input_path, temp_output_path, start_time, trim_duration)
+        return temp_output_path
+
+    async def _produce_clips(self, message: VideoMessage, clips: List[Tuple[ClipSpec, float, str]],
+                             temp_input_path: str) -> List[str]:
+        """Render several outputs from one decode of the window they span; returns their paths"""
+        window_start = min(start_time for _, start_time, _ in clips)
+        window_end = max(start_time + spec.length for spec, start_time, _ in clips)
+
+        # Only the window is needed: download its byte ranges when the MP4 index allows it
+        window_downloaded = False
+        if Config.TRIM_RANGE_DOWNLOAD:
+            with metrics.timer('range_download'):
+                window_downloaded = await self.partial_downloader.download_window(
+                    message.document, temp_input_path, window_start, window_end + Config.TRIM_KEYFRAME_WINDOW
+                )
+        if not window_downloaded:
+            # ffmpeg has to probe the audio and write several files, so the input can't be a pipe
+            self.logger.debug("Downloading video %s to %s", message.message_id, temp_input_path)
+            download_started = time.perf_counter()
+            with metrics.timer('download'):
+                await self.client.download_file(message.document, temp_input_path)
+            metrics.record_transfer('download', message.document.size, time.perf_counter() - download_started)
+
+        await self.trimmer.render_clips(temp_input_path, clips)
+        return [output_path for _, _, output_path in clips]
+
+    def _clip_signature(self, spec: ClipSpec, single_clip: bool) -> str:
+        """Encoder settings of an output, so cached outputs are only reused for the same settings.
+        A lone clip follows TRIM_MODE; clips rendered together with other outputs are always re-encoded."""
+        if single_clip:
+            return self.trimmer.settings_signature()
+        if spec.kind == CLIP_VIDEO:
+            return f"reencode:{self.trimmer.clip_settings_signature(spec.kind)}"
+        return f"{spec.kind}:{self.trimmer.clip_settings_signature(spec.kind)}"
+
+    @contextlib.asynccontextmanager
+    async def _trim_flights(self, cache_keys: List[str]) -> AsyncIterator[None]:
+        """Single-flight every output at once; keys are taken in order so overlapping requests can't deadlock"""
+        async with contextlib.AsyncExitStack() as stack:
+            if self.trim_cache:
+                for cache_key in sorted(set(cache_keys)):
+                    await stack.enter_async_context(self.trim_cache.single_flight(cache_key))
+            yield
+
+    @staticmethod
+    def _clip_file_options(message: VideoMessage, spec: ClipSpec) -> dict:
+        """send_file options for an output; uploads from a pipe can't be inspected for video attributes"""
+        if spec.kind == CLIP_THUMBNAIL:
+            return {}
+        if spec.kind == CLIP_GIF:
+            # Telegram turns uploaded GIFs into looping animations
+            return {'mime_type': 'image/gif'}
+        source_attr = next((attr for attr in message.document.attributes if isinstance(attr, DocumentAttributeVideo)), None)
+        width = source_attr.w if source_attr else 0
+        height = source_attr.h if source_attr else 0
+        return {
+            'attributes': [DocumentAttributeVideo(duration=spec.duration, w=width, h=height, supports_streaming=True)],
+            'mime_type': 'video/mp4',
+            'supports_streaming': True,
+        }
+
+    async def _fan_out(self, uploaded_file, destination_chat_id: list[int], caption: str, file_options: dict):
+        """Send an uploaded file (or existing media) to every destination.
+
+        The first successful send turns the upload into Telegram media; the remaining
+        destinations get that media concurrently (capped) without uploading again.
+        Returns the results, the number of successful sends and the media.
+        """
+        send_results = []
+        successful_sends = 0
+        media = None
+        pending = []
+
+        for i, destination in enumerate(destination_chat_id, 1):
+            try:
+                # Validate chat ID format
+                try:
+                    chat_id_int = int(destination)
+                except ValueError:
+                    raise Exception(f"Invalid chat ID format: {destination}")
+            except Exception as e:
+                error_type = type(e).__name__
+                self.logger.error("Failed to send to chat %s: %s - %s", destination, error_type, e)
+                send_results.append(f"❌ Chat {destination}: {error_type}")
+                continue
+
+            if media is not None:
+                pending.append((destination, chat_id_int))
+                continue
+
+            try:
+                self.logger.debug("Sending trimmed video to chat %s/%s: %s", i, len(destination_chat_id), destination)
+                peer = await self._peer(chat_id_int)
+                sent = await self.outbound.call(
+                    chat_id_int,
+                    lambda: self.client.send_file(peer, uploaded_file, caption=caption, **file_options),
+                    PRIORITY_BULK, 'clip'
+                )
+                media = sent.media
+                send_results.append(f"✅ Chat {destination}: OK")
+                successful_sends += 1
+                self.logger.debug("Sent to chat %s successfully", destination)
+            except Exception as e:
+                error_type = type(e).__name__
+                self.logger.error("Failed to send to chat %s: %s - %s", destination, error_type, e)
+                send_results.append(f"❌ Chat {destination}: {error_type}")
+
+        semaphore = asyncio.Semaphore(Config.FANOUT_CONCURRENCY)
+
+        async def send_media(destination, chat_id_int) -> str:
+            async with semaphore:
+                try:
+                    peer = await self._peer(chat_id_int)
+                    await self.outbound.call(chat_id_int, lambda: self.client.send_file(peer, media, caption=caption),
+                                             PRIORITY_BULK, 'clip fan-out')
+                    self.logger.debug("Sent to chat %s successfully", destination)
+                    return f"✅ Chat {destination}: OK"
+                except Exception as e:
+                    error_type = type(e).__name__
+                    self.logger.error("Failed to send to chat %s: %s - %s", destination, error_type, e)
+                    return f"❌ Chat {destination}: {error_type}"
+
+        results = await asyncio.gather(*(send_media(destination, chat_id_int) for destination, chat_id_int in pending))
+        send_results.extend(results)
+        successful_sends += sum(1 for result in results if result.startswith("✅"))
+        return send_results, successful_sends, media
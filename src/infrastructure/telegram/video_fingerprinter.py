@@ -0,0 +1,89 @@
+import asyncio
+from typing import List, Optional
+from telethon import TelegramClient
+from src.config.config import Config
+from src.domain.entities.video_message import VideoMessage
+from src.infrastructure.media.perceptual_hash import HASH_HEIGHT, HASH_WIDTH, dhash_frames
+from src.infrastructure.media.transcode_scheduler import PRIORITY_BACKGROUND, TranscodeScheduler
+
+DOWNLOAD_CHUNK_SIZE = 512 * 1024
+SAMPLE_INTERVAL = 1  # seconds between sampled frames
+# ffmpeg output: tiny gray frames, already the size dHash works on
+HASH_FILTER = f"scale={HASH_WIDTH}:{HASH_HEIGHT}:flags=area,format=gray"
+
+
+class VideoFingerprinter:
+    """Computes the perceptual hashes of a Telegram video without downloading it.
+
+    Most videos come with a thumbnail, which is hashed on its own. Otherwise the start of
+    the video (up to FINGERPRINT_MAX_MB) is fetched into memory and piped into ffmpeg, which
+    decodes one frame per second of its first seconds straight to 9x8 gray; MP4s with their
+    index at the end can't be decoded that way and get no fingerprint. Only the decoding
+    takes a background slot of the TranscodeScheduler, never the download before it.
+    """
+
+    def __init__(self, client: TelegramClient, scheduler: Optional[TranscodeScheduler] = None,
+                 frames: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.client = client
+        self.scheduler = scheduler
+        self.frames = frames or Config.FINGERPRINT_FRAMES
+        self.max_bytes = max_bytes or Config.FINGERPRINT_MAX_BYTES
+        self.logger = Config.get_logger('infrastructure.video_fingerprinter')
+
+    async def fingerprint(self, video_message: VideoMessage) -> List[int]:
+        """64-bit hashes of the video's thumbnail or sampled frames (empty if none could be read)"""
+        document = video_message.document
+        if getattr(document, 'thumbs', None):
+            thumbnail = await self.client.download_media(document, bytes, thumb=-1)
+            if thumbnail:
+                hashes = dhash_frames(await self._decode(["-i", "pipe:0", "-vf", HASH_FILTER, "-frames:v", "1"],
+                                                         thumbnail))
+                if hashes:
+                    self.logger.debug("Fingerprinted document %s from its thumbnail", document.id)
+                    return hashes
+
+        return await self._sample_frames(video_message)
+
+    async def _sample_frames(self, video_message: VideoMessage) -> List[int]:
+        document = video_message.document
+        head = await self._download_head(document)
+        if not head:
+            return []
+        # Fixed timestamps, so copies with another bitrate or resolution sample the same frames
+        args = ["-i", "pipe:0", "-vf", f"fps=1/{SAMPLE_INTERVAL},{HASH_FILTER}", "-frames:v", str(self.frames)]
+        if self.scheduler is None:
+            raw = await self._decode(args, head)
+        else:
+            # Fingerprinting is part of ingest, so it waits behind the trims users are waiting for
+            async with self.scheduler.slot(PRIORITY_BACKGROUND, f"fingerprint-{document.id}"):
+                raw = await self._decode(args, head)
+        hashes = dhash_frames(raw)
+        self.logger.debug("Fingerprinted document %s from %s sampled frame(s) of its first %s bytes",
+                          document.id, len(hashes), len(head))
+        return hashes
+
+    async def _download_head(self, document) -> bytes:
+        """The first FINGERPRINT_MAX_MB of the document"""
+        limit = -(-self.max_bytes // DOWNLOAD_CHUNK_SIZE)
+        chunks = []
+        async for chunk in self.client.iter_download(document, request_size=DOWNLOAD_CHUNK_SIZE, limit=limit):
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    async def _decode(self, args: List[str], data: bytes) -> bytes:
+        """Run ffmpeg on an image or the start of a video and return its raw frames"""
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-v", "error", *args, "-threads", "1", "-f", "rawvideo", "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            # ffmpeg may stop reading once it has its frames; what it decoded is still usable
+            stdout, _ = await process.communicate(data)
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        return stdout
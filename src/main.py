@@ -2,15 +2,43 @@ import asyncio
 import logging
 from telethon import TelegramClient, events
 from telethon.tl.custom import Button
-from telethon.tl.types import DocumentAttributeFilename, DocumentAttributeVideo
+from telethon.tl.types import DocumentAttributeVideo
 from src.config.config import Config
+from src.domain.entities.clip_spec import ClipSpec
 from src.domain.entities.video_message import VideoMessage
 from src.infrastructure.telegram.telegram_message_repository import TelegramMessageRepository
 from src.infrastructure.filesystem.filesystem_video_repository import FilesystemVideoRepository
+from src.infrastructure.filesystem.storage_manager import StorageManager
+from src.infrastructure.media.transcode_scheduler import TranscodeScheduler
+from src.infrastructure.media.contact_sheet import ContactSheetGenerator
+from src.infrastructure.media.trim_cache import TrimCache
+from src.infrastructure.media.video_compactor import VideoCompactor
+from src.infrastructure.telegram.pending_approval_store import PendingApprovalStore
+from src.infrastructure.telegram.peer_cache import PeerCache
+from src.infrastructure.telegram.message_mapper import to_video_message
+from src.infrastructure.persistence.json_checkpoint_repository import JsonCheckpointRepository
+from src.infrastructure.telegram.outbound_scheduler import OutboundScheduler, PRIORITY_INTERACTIVE
+from src.infrastructure.metrics.registry import metrics
+from src.infrastructure.metrics.exposition_server import MetricsExpositionServer
+from src.infrastructure.metrics.startup_report import StartupReport
 from src.domain.use_cases.handle_short_video import HandleShortVideoUseCase
 from src.domain.use_cases.handle_medium_video import HandleMediumVideoUseCase
 from src.domain.use_cases.handle_long_video import HandleLongVideoUseCase
+from src.domain.use_cases.handle_duplicate_video import HandleDuplicateVideoUseCase
+from src.domain.use_cases.handle_video_album import HandleVideoAlbumUseCase
+from src.infrastructure.persistence.sqlite_video_index_repository import SqliteVideoIndexRepository
+from src.infrastructure.persistence.sqlite_event_store import SqliteEventStore
+from src.infrastructure.persistence.sqlite_fingerprint_index_repository import SqliteFingerprintIndexRepository
+from src.infrastructure.telegram.video_fingerprinter import VideoFingerprinter
+from src.domain.entities.video_event import EVENT_APPROVED, EVENT_DELETED, EVENT_TRIMMED
 from src.application.services.video_message_handler import VideoMessageHandlerService
+from src.application.services.video_job_scheduler import VideoJobScheduler
+from src.application.services.album_collector import AlbumCollector
+from src.application.services.activity_tracker import ActivityTracker
+from src.application.services.backlog_catch_up import BacklogCatchUpService
+from src.application.services.near_duplicate_detector import NearDuplicateDetector
+from src.application.services.video_router import VideoRouter
+from src.application.services.background_compaction import BackgroundCompactionService
 from src.application.services.command_handler import CommandHandler, TelegramMessageSender
 
 # Setup logging
@@ -25,6 +53,7 @@ Config.log_chat_configuration(logger)
 
 async def main():
     logger.info("Initializing Peque Bot...")
+    startup = StartupReport()
 
     # Helper function to safely convert chat ID to int
     def safe_chat_id(chat_id_str):
@@ -37,20 +66,47 @@ async def main():
             try:
                 return int(chat_id_str)
             except ValueError:
-                logger.warning(f"Invalid chat ID format: {chat_id_str}")
+                logger.warning("Invalid chat ID format: %s", chat_id_str)
                 return None
         return None
 
     # Initialize Telegram client
     logger.debug("Initializing Telegram client")
-    client = TelegramClient('bot_session', Config.API_ID, Config.API_HASH)
-    await client.start(bot_token=Config.BOT_TOKEN)
+    with startup.phase('Telegram connection'):
+        client = TelegramClient('bot_session', Config.API_ID, Config.API_HASH)
+        await client.start(bot_token=Config.BOT_TOKEN)
     logger.info("Telegram client initialized and connected successfully")
 
+    # Resolve every configured chat once so the first sends don't pay for the lookup
+    peer_cache = PeerCache(client, Config.PEER_CACHE_FILE)
+    with startup.phase('Chat warm-up'):
+        warm_up_timings = await peer_cache.warm_up(
+            [Config.VIDEO_INPUT_GROUP_ID, Config.DESTINATION_CHAT_ID, *Config.TRIM_DESTINATION_CHAT_IDS]
+        )
+    for chat_id, seconds in warm_up_timings.items():
+        logger.debug("Resolved chat %s in %.3fs", chat_id, seconds)
+
     # Initialize repositories
     logger.debug("Initializing repositories")
-    message_repo = TelegramMessageRepository(client)
-    video_repo = FilesystemVideoRepository(client)
+    # Shared admission control for every ffmpeg process
+    transcode_scheduler = TranscodeScheduler()
+    trim_cache = TrimCache() if Config.TRIM_CACHE_ENABLED else None
+    # Approval messages posted by the bot, so button callbacks don't fetch them back
+    pending_approvals = PendingApprovalStore(
+        persist_path=Config.PENDING_APPROVAL_FILE if Config.PENDING_APPROVAL_PERSIST else None
+    )
+    # Every send/edit/delete goes through one rate-limited, FloodWait-aware gate
+    outbound = OutboundScheduler()
+    message_repo = TelegramMessageRepository(client, transcode_scheduler, trim_cache, pending_approvals, outbound,
+                                             peer_cache)
+    video_index_repo = SqliteVideoIndexRepository(Config.VIDEO_INDEX_DB) if Config.VIDEO_INDEX_ENABLED else None
+    # Evicted videos drop out of the index so duplicates aren't answered with a deleted path
+    storage = StorageManager(on_evicted=video_index_repo.forget_file if video_index_repo else None)
+    video_repo = FilesystemVideoRepository(
+        client, storage,
+        preview_generator=ContactSheetGenerator(transcode_scheduler) if Config.PREVIEW_ENABLED else None
+    )
+    event_store = SqliteEventStore(Config.EVENT_STORE_DB) if Config.EVENT_STORE_ENABLED else None
     logger.info("Repositories initialized")
 
     # Initialize use cases
@@ -58,15 +114,67 @@ async def main():
     handle_short = HandleShortVideoUseCase(message_repo, Config.DESTINATION_CHAT_ID)
     handle_medium = HandleMediumVideoUseCase(message_repo, Config.DESTINATION_CHAT_ID)
     handle_long = HandleLongVideoUseCase(message_repo, video_repo)
+    handle_duplicate = HandleDuplicateVideoUseCase(message_repo, video_repo)
+    handle_album = HandleVideoAlbumUseCase(message_repo)
     logger.info("Use cases initialized")
 
     # Initialize application service
     logger.debug("Initializing application services")
-    handler_service = VideoMessageHandlerService(handle_short, handle_medium, handle_long)
+    video_router = VideoRouter()
+    # Outputs of the trim button, all produced from a single decode
+    clip_specs = ClipSpec.parse_list(Config.CLIP_OUTPUTS)
+    activity_tracker = ActivityTracker(event_store)
+    # Near-duplicates are reported like exact ones, so they need the video index too
+    near_duplicate_detector = None
+    if Config.FINGERPRINT_ENABLED and video_index_repo:
+        near_duplicate_detector = NearDuplicateDetector(
+            VideoFingerprinter(client, transcode_scheduler),
+            SqliteFingerprintIndexRepository(Config.FINGERPRINT_DB)
+        )
+    # Stored long videos are compacted only while nothing else is going on
+    background_compaction = None
+    if Config.COMPACT_MODE != 'off':
+        background_compaction = BackgroundCompactionService(
+            VideoCompactor(transcode_scheduler),
+            lambda: bool(activity_tracker.downloads_in_flight or sum(job_scheduler.queue_depths().values())
+                         or transcode_scheduler.queue_depth()),
+            handle_long.videos_dir,
+            activity_tracker
+        )
+    handler_service = VideoMessageHandlerService(handle_short, handle_medium, handle_long,
+                                                 video_index_repo, handle_duplicate, handle_album,
+                                                 activity_tracker, near_duplicate_detector, background_compaction)
+
+    # Startup catch-up of the input group, created once the input handler exists
+    catch_up = None
+
+    async def on_job_done(video_message):
+        if video_message.chat_id == input_group_id:
+            await mark_input_done(video_message.message_id)
+
+    # Initialize background job scheduler (short/medium/long lanes)
+    job_scheduler = VideoJobScheduler(handler_service, on_job_done=on_job_done)
+    with startup.phase('Job scheduler'):
+        await job_scheduler.start()
+
+    # Metrics endpoint; queue depths are read only when scraped
+    metrics_server = None
+    if Config.METRICS_ENABLED:
+        metrics.register_gauge('queue_depth', lambda: {
+            **job_scheduler.queue_depths(),
+            'transcode': transcode_scheduler.queue_depth(),
+            'outbound': outbound.queue_depth(),
+        }, label='queue')
+        metrics_server = MetricsExpositionServer(metrics)
+        await metrics_server.start()
+
+    # Videos posted as an album are collected and queued as a single job
+    album_collector = AlbumCollector(job_scheduler.enqueue_album)
 
     # Initialize command handler
-    message_sender = TelegramMessageSender(client)
-    command_handler = CommandHandler(message_sender)
+    message_sender = TelegramMessageSender(client, outbound, peer_cache)
+    command_handler = CommandHandler(message_sender, activity_tracker, job_scheduler.queue_depths, handle_long.videos_dir,
+                                     video_router.describe())
     logger.info("Application services initialized")
 
     logger.info("Setting up event handlers...")
@@ -77,62 +185,77 @@ async def main():
         logger.error("VIDEO_INPUT_GROUP_ID is not configured or invalid!")
         raise ValueError("VIDEO_INPUT_GROUP_ID must be configured")
 
-    logger.info(f"Video input group configured: {input_group_id}")
+    logger.info("Video input group configured: %s", input_group_id)
+
+    async def mark_input_done(message_id):
+        """Let the catch-up checkpoint move past a message of the input group"""
+        if catch_up:
+            await catch_up.complete(message_id)
+
+    async def ingest_input_message(message):
+        """Classify a message from the input group and queue it.
+        Shared by live updates and the startup catch-up so both follow the same path."""
+        if message.out:
+            # Messages posted by the bot itself (approvals) only show up when replaying history
+            await mark_input_done(message.id)
+            return
+        if catch_up:
+            if catch_up.is_resumed(message.id):
+                # Interrupted download already re-queued at startup; its job marks it done
+                logger.info("Message %s is already being resumed, not queuing it again", message.id)
+                return
+            catch_up.begin(message.id)
+
+        if message.video:
+            video_message = to_video_message(message)
+            if video_message:
+                # The route is decided here, once, and travels with the message
+                video_router.classify(video_message)
+                logger.debug("Processing video: size=%s bytes", message.document.size)
+
+                if video_message.grouped_id and Config.ALBUM_BATCHING_ENABLED:
+                    logger.info("Video belongs to album %s: collecting it with the rest of the album",
+                                video_message.grouped_id)
+                    await album_collector.add(video_message)
+                    return
+
+                # Queue the video in the lane of its route; workers process it in the background
+                if video_message.category:
+                    logger.info("Classified as %s video: queuing in %s video lane",
+                                video_message.category.upper(), video_message.category)
+                    await job_scheduler.enqueue(video_message)
+                else:
+                    logger.warning("Video of %s bytes and %ss doesn't match any routing rule",
+                                   message.document.size, video_message.video_duration)
+                    await mark_input_done(message.id)
+                return
+            logger.warning("Video message %s without duration attribute", message.id)
+        else:
+            logger.debug("Non-video message %s in input group (ignored)", message.id)
+        await mark_input_done(message.id)
 
     @client.on(events.NewMessage(chats=[input_group_id]))
     async def handle_video_input_group(event):
         """Unified handler for all video messages from the input group.
         Automatically classifies videos by size and routes to appropriate use case."""
-        message = event.message
-        logger.info(f"Received message in video input group {input_group_id}")
+        logger.info("Received message in video input group %s", input_group_id)
+        await ingest_input_message(event.message)
+
+    if Config.CATCHUP_ENABLED:
+        catch_up = BacklogCatchUpService(message_repo, JsonCheckpointRepository(Config.CATCHUP_CHECKPOINT_FILE),
+                                         input_group_id, ingest_input_message)
+        with startup.phase('Catch-up checkpoint'):
+            await catch_up.load()
 
-        if message.video:
-            video_attr = next((attr for attr in message.document.attributes if hasattr(attr, 'duration')), None)
-            if video_attr:
-                logger.debug(f"Processing video: size={message.document.size} bytes")
-
-                # Extraer el nombre del archivo del documento
-                file_name_attr = next((attr for attr in message.document.attributes if isinstance(attr, DocumentAttributeFilename)), None)
-                file_name = file_name_attr.file_name if file_name_attr else None
-
-
-                # Create video message entity
-                video_message = VideoMessage(
-                    message_id=message.id,
-                    chat_id=message.chat_id,
-                    video_duration=video_attr.duration,
-                    video_size=message.document.size,
-                    document=message.document,
-                    caption=message.text,
-                    file_name=file_name # ← NUEVO: Extraer el nombre del archivo
-                )
-
-                # Classify and route video based on size
-                if video_message.is_short_video:
-                    logger.info(f"Classified as SHORT video (<50MB): routing to short video handler")
-                    await handler_service.handle_video_message(video_message)
-                elif video_message.is_medium_video:
-                    logger.info(f"Classified as MEDIUM video (50-500MB): routing to medium video handler")
-                    await handler_service.handle_video_message(video_message)
-                elif video_message.is_long_video:
-                    logger.info(f"Classified as LONG video (>500MB): routing to long video handler")
-                    await handler_service.handle_video_message(video_message)
-                else:
-                    logger.warning(f"Video size {message.document.size} bytes doesn't match any category")
-            else:
-                logger.warning(f"Video message {message.id} without duration attribute")
-        else:
-            logger.debug(f"Non-video message {message.id} in input group (ignored)")
-    
     @client.on(events.NewMessage)
     async def handle_message(event):
         message = event.message
-        logger.debug(f"Received message from chat {message.chat_id}, sender {message.sender_id}")
+        logger.debug("Received message from chat %s, sender %s", message.chat_id, message.sender_id)
 
         # Handle commands
         if message.text and message.text.startswith('/'):
             command = message.text.split()[0].lower()
-            logger.info(f"Processing command '{command}' from user {message.sender_id} in chat {message.chat_id}")
+            logger.info("Processing command '%s' from user %s in chat %s", command, message.sender_id, message.chat_id)
 
             if command == '/start':
                 await command_handler.handle_start_command(message)
@@ -146,70 +269,161 @@ async def main():
                 await command_handler.handle_unknown_command(message)
             return
     
+    async def answer(event, text):
+        """Answer a button press ahead of any queued bulk traffic"""
+        await outbound.call(None, lambda: event.answer(text), PRIORITY_INTERACTIVE, 'callback answer')
+
+    async def resolve_pending_video(event):
+        """VideoMessage behind an approval message, from the local store or fetched as a fallback"""
+        pending = pending_approvals.get(event.chat_id, event.message_id)
+        if pending:
+            return pending.to_video_message()
+
+        logger.debug("Approval message %s not in pending store, fetching it", event.message_id)
+        msg = await event.get_message()
+        if msg is None or msg.document is None:
+            return None
+        video_attr = next((attr for attr in msg.document.attributes if isinstance(attr, DocumentAttributeVideo)), None)
+        if not video_attr:
+            return None
+        video_message = VideoMessage(
+            message_id=msg.id,
+            chat_id=msg.chat_id,
+            video_duration=video_attr.duration,
+            video_size=msg.document.size,
+            document=msg.document,
+            caption=msg.text
+        )
+        video_router.classify(video_message)
+        return video_message
+
     @client.on(events.CallbackQuery)
     async def handle_callback(event):
         data = event.data.decode('utf-8')
-        logger.info(f"Received callback query: '{data}' from user {event.sender_id}")
+        logger.info("Received callback query: '%s' from user %s", data, event.sender_id)
 
         if data == 'send':
-            logger.info(f"User {event.sender_id} approved video sending")
-            await event.answer('Video enviado!')
+            logger.info("User %s approved video sending", event.sender_id)
+            await answer(event, 'Video enviado!')
             # enviar el video al chat de destino sin caption
-            msg = await event.get_message()
-            await client.send_message(Config.DESTINATION_CHAT_ID, file=msg.document)
+            video_message = await resolve_pending_video(event)
+            if video_message is None:
+                logger.error("No video found for approval message %s", event.message_id)
+                return
+            destination = await peer_cache.resolve(Config.DESTINATION_CHAT_ID)
+            await outbound.call(Config.DESTINATION_CHAT_ID,
+                                lambda: client.send_message(destination, file=video_message.document),
+                                PRIORITY_INTERACTIVE, 'approved video')
             ## borrar el mensaje original
-            await client.delete_messages(event.chat_id, msg.id)
-            await event.answer('Video enviado al chat de destino!')
+            approval_chat = await peer_cache.resolve(event.chat_id)
+            await outbound.call(None, lambda: client.delete_messages(approval_chat, event.message_id),
+                                PRIORITY_INTERACTIVE, 'delete')
+            pending_approvals.remove(event.chat_id, event.message_id)
+            await activity_tracker.record(EVENT_APPROVED, video_message)
+            await answer(event, 'Video enviado al chat de destino!')
 
         elif data == 'delete':
-            logger.info(f"User {event.sender_id} requested video deletion")
-            msg = await event.get_message()
-            await client.delete_messages(event.chat_id, msg.id)
-            await event.answer('Video borrado!')
+            logger.info("User %s requested video deletion", event.sender_id)
+            approval_chat = await peer_cache.resolve(event.chat_id)
+            await outbound.call(None, lambda: client.delete_messages(approval_chat, event.message_id),
+                                PRIORITY_INTERACTIVE, 'delete')
+            pending = pending_approvals.get(event.chat_id, event.message_id)
+            pending_approvals.remove(event.chat_id, event.message_id)
+            await activity_tracker.record(EVENT_DELETED, pending.to_video_message() if pending else None)
+            await answer(event, 'Video borrado!')
             
         elif data == 'trim_10s':
-            logger.info(f"User {event.sender_id} requested video trimming to 10 seconds")
-            await event.answer('Procesando video... ⏳')
+            logger.info("User %s requested video trimming to 10 seconds", event.sender_id)
+            queue_position = transcode_scheduler.queue_position()
+            if queue_position:
+                await answer(event, f'En cola, posición {queue_position} ⏳')
+            else:
+                await answer(event, 'Procesando video... ⏳')
             
             try:
-                msg = await event.get_message()
-                
-                # Create VideoMessage entity from the message
-                video_attr = next((attr for attr in msg.document.attributes if isinstance(attr, DocumentAttributeVideo)), None)
-                if video_attr:
-                    video_message = VideoMessage(
-                        message_id=msg.id,
-                        chat_id=msg.chat_id,
-                        video_duration=video_attr.duration,
-                        video_size=msg.document.size,
-                        document=msg.document,
-                        caption=msg.text
-                    )
-                    
-                    lanochequepasamos = "-1002834323493"
-
-                    # Trim and send the video to the ORIGINAL chat (where the video is)
-                    # await message_repo.trim_and_send_video(video_message, [video_message.chat_id, int(lanochequepasamos)], 10)
-                    await message_repo.trim_and_send_video(video_message, [int(lanochequepasamos)], 10)
+                video_message = await resolve_pending_video(event)
+                if video_message:
+                    # Cut the configured clips and send them to the trim destinations
+                    await message_repo.send_clips(video_message, Config.TRIM_DESTINATION_CHAT_IDS, clip_specs)
+                    await activity_tracker.record(EVENT_TRIMMED, video_message)
 
                     # Delete the original message with buttons
                     # await client.delete_messages(event.chat_id, msg.id)
-                    await event.answer('✅ Video recortado enviado!')
+                    await answer(event, '✅ Video recortado enviado!')
                 else:
-                    await event.answer('❌ Error: No se pudo procesar el video')
+                    await answer(event, '❌ Error: No se pudo procesar el video')
                     logger.error("No video attributes found in document")
                     
             except Exception as e:
-                logger.error(f"Error trimming video: {str(e)}", exc_info=True)
-                await event.answer('❌ Error al procesar el video')
+                logger.error("Error trimming video: %s", e, exc_info=True)
+                activity_tracker.record_error("Recorte", e)
+                await answer(event, '❌ Error al procesar el video')
+        elif data in ('send_album', 'delete_album'):
+            pending = pending_approvals.get(event.chat_id, event.message_id)
+            if pending is None or not pending.is_album:
+                logger.error("No album found for approval message %s", event.message_id)
+                await answer(event, '❌ Error: El álbum ya no está disponible')
+                return
+
+            if data == 'send_album':
+                logger.info("User %s approved album sending (%s videos)",
+                            event.sender_id, len(pending.album_message_ids))
+                # Todo el álbum en una sola llamada
+                destination = await peer_cache.resolve(Config.DESTINATION_CHAT_ID)
+                await outbound.call(Config.DESTINATION_CHAT_ID,
+                                    lambda: client.send_file(destination, pending.album_documents_list()),
+                                    PRIORITY_INTERACTIVE, 'approved album')
+            else:
+                logger.info("User %s requested album deletion (%s videos)",
+                            event.sender_id, len(pending.album_message_ids))
+            ## borrar el álbum y el mensaje con botones en una sola llamada
+            approval_chat = await peer_cache.resolve(event.chat_id)
+            await outbound.call(None, lambda: client.delete_messages(approval_chat, pending.album_message_ids + [event.message_id]),
+                                PRIORITY_INTERACTIVE, 'delete album')
+            pending_approvals.remove(event.chat_id, event.message_id)
+            for document in pending.album_documents or []:
+                await activity_tracker.record(EVENT_APPROVED if data == 'send_album' else EVENT_DELETED,
+                                              category='album', size_bytes=document['size'])
+            await answer(event, 'Álbum enviado!' if data == 'send_album' else 'Álbum borrado!')
         else:
-            logger.warning(f"Unknown callback data '{data}' from user {event.sender_id}")
-            await event.answer('❌ Acción no reconocida')
+            logger.warning("Unknown callback data '%s' from user %s", data, event.sender_id)
+            await answer(event, '❌ Acción no reconocida')
+
+    # Resume long video downloads interrupted by a previous shutdown
+    with startup.phase('Interrupted downloads'):
+        interrupted_downloads = await video_repo.get_interrupted_downloads(handle_long.videos_dir)
+        for video_message in interrupted_downloads:
+            logger.info("Re-queuing interrupted download for message %s", video_message.message_id)
+            if catch_up and video_message.chat_id == input_group_id:
+                catch_up.resume(video_message.message_id)
+            await job_scheduler.enqueue(video_message)
+
+    if background_compaction:
+        with startup.phase('Compaction scan'):
+            await background_compaction.start()
+
+    # Replay what was posted to the input group while the bot was down
+    catch_up_task = asyncio.create_task(catch_up.run()) if catch_up else None
 
     logger.info("All event handlers configured. Bot is ready to receive messages.")
+    startup.log(logger)
     logger.info("Starting message polling...")
 
-    await client.run_until_disconnected()
+    try:
+        await client.run_until_disconnected()
+    finally:
+        if catch_up_task:
+            catch_up_task.cancel()
+            await asyncio.gather(catch_up_task, return_exceptions=True)
+        await album_collector.stop()
+        await job_scheduler.stop()
+        if background_compaction:
+            await background_compaction.stop()
+        if metrics_server:
+            await metrics_server.stop()
+        await pending_approvals.close()
+        await peer_cache.close()
+        Config.shutdown_logging()
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file